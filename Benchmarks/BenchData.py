@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:        BenchData.py
+#
+# Purpose:     Builds synthetic LRM and mobile datasets, config files and
+#              Survey123 form items for the offline benchmarks. Requires the
+#              stand-in modules in Benchmarks\stubs to be first on sys.path.
+#
+# Author:      Dylan Harwell - Resource Data Inc
+#
+# Created:     10/18/2026
+# -----------------------------------------------------------------------------
+
+import json
+import os
+import random
+import arcpy
+from arcgis import gis
+
+# Dataset names used in the generated config.json
+datasets = {'activity_mobile_script': 'TFM_OP_ACTIVITY_MOBILE_SCRIPT',
+            'chem_app_mobile_script': 'TFM_ACT_CHEMICAL_APPLICATION_SCRIPT',
+            'activity_fc': 'TFM_OP_ACTIVITY',
+            'chem_app_table': 'TFM_ACT_CHEMICAL_APPLICATION',
+            'stand_fc': 'TFM_CMN_STAND',
+            'property_fc': 'TFM_CMN_PROPERTY'}
+mobile_datasets = {'activity_mobile_copy': 'TFM_OP_ACTIVITY_MOBILE',
+                   'chem_app_mobile_copy':
+                       'TFM_ACT_CHEMICAL_APPLICATION_MOBILE'}
+
+activity_fields = ['Parent_GUID', 'PropertyOID', 'Category', 'Type',
+                   'SubType', 'Status', 'PlannedDate', 'ActualDate',
+                   'Acres', 'Comments', 'standOID']
+chem_fields = ['Child_GUID', 'PropertyOID', 'MasterChemOID',
+               'Activity_ContextID', 'Rate', 'RateUOM', 'ActivityOID',
+               'TFM_OP_ACTIVITY_GlobalID']
+
+
+def _guid(rnd):
+    return '{' + '{0:032X}'.format(rnd.getrandbits(128))[:8] + '-' + \
+        '-'.join(['{0:04X}'.format(rnd.getrandbits(16)) for i in range(3)]) \
+        + '-' + '{0:012X}'.format(rnd.getrandbits(48)) + '}'
+
+
+def _polygon(rnd, size=64):
+    return arcpy.Geometry(bytes(rnd.getrandbits(8) for i in range(size)))
+
+
+def buildSyncData(activity_count, chem_ratio=0.5, property_count=50,
+                  stand_count=None, seed=1):
+    """Creates the LRM and mobile datasets MobileSyncLRM reads and writes,
+       with activity_count new mobile activities of which roughly 40% are
+       property activities, and chem_ratio chemicals per activity"""
+    rnd = random.Random(seed)
+    arcpy.reset()
+    stand_count = stand_count or max(10, activity_count // 10)
+
+    properties = arcpy.addTable(arcpy.Table(datasets['property_fc'],
+                                            ['Name'], spatial=True))
+    for i in range(property_count):
+        properties.insert({'Name': 'Property {0}'.format(i + 1),
+                           'SHAPE': _polygon(rnd)})
+    stands = arcpy.addTable(arcpy.Table(datasets['stand_fc'],
+                                        ['PropertyOID', 'StandNo'],
+                                        spatial=True))
+    for i in range(stand_count):
+        stands.insert({'PropertyOID': rnd.randint(1, property_count),
+                       'StandNo': i + 1, 'SHAPE': _polygon(rnd)})
+
+    mobile_fields = activity_fields + ['prop_or_stand', 'last_edited_date']
+    mobile_act = arcpy.addTable(arcpy.Table(
+                     mobile_datasets['activity_mobile_copy'], mobile_fields,
+                     spatial=True, globalid=False))
+    arcpy.addTable(arcpy.Table(datasets['activity_mobile_script'],
+                               mobile_fields + ['Parent_OID',
+                                                'TFM_CMN_PROPERTY_GlobalID'],
+                               spatial=True, globalid=False))
+    arcpy.addTable(arcpy.Table(datasets['activity_fc'],
+                               activity_fields + ['Parent_OID',
+                                                  'TFM_CMN_PROPERTY_GlobalID'],
+                               spatial=True))
+    mobile_che = arcpy.addTable(arcpy.Table(
+                     mobile_datasets['chem_app_mobile_copy'],
+                     chem_fields + ['last_edited_date'], globalid=False))
+    arcpy.addTable(arcpy.Table(datasets['chem_app_mobile_script'],
+                               chem_fields + ['last_edited_date'],
+                               globalid=False))
+    arcpy.addTable(arcpy.Table(datasets['chem_app_table'], chem_fields))
+
+    guids = []
+    for i in range(activity_count):
+        guid = _guid(rnd)
+        guids.append(guid)
+        is_prop = rnd.random() < 0.4
+        mobile_act.insert({
+            'Parent_GUID': guid,
+            'PropertyOID': rnd.randint(1, property_count),
+            'Category': rnd.choice(['Property', 'PropertyE', 'PropertyH',
+                                    'PropertyM']) if is_prop else 'Stand',
+            'Type': rnd.randint(1, 40), 'SubType': rnd.randint(1, 200),
+            'Status': 'Planned', 'PlannedDate': '2020-03-01',
+            'ActualDate': None, 'Acres': round(rnd.uniform(1, 500), 2),
+            'Comments': 'Synthetic activity {0}'.format(i),
+            'standOID': None if is_prop else rnd.randint(1, stand_count),
+            'prop_or_stand': 'prop' if is_prop else 'stand',
+            'last_edited_date': '2020-03-01 {0:02d}:{1:02d}:{2:02d}'.format(
+                                i // 3600 % 24, i // 60 % 60, i % 60)})
+    for i in range(int(activity_count * chem_ratio)):
+        mobile_che.insert({
+            'Child_GUID': rnd.choice(guids),
+            'PropertyOID': rnd.randint(1, property_count),
+            'MasterChemOID': rnd.randint(1, 300), 'Activity_ContextID': 1430,
+            'Rate': round(rnd.uniform(0.1, 10), 2), 'RateUOM': 'oz/ac',
+            'last_edited_date': '2020-03-01 00:00:00'})
+    return guids
+
+
+def writeConfig(out_dir, **sections):
+    """Writes a config.json for the generated datasets to out_dir, keyword
+       arguments add or replace config sections. Returns its path"""
+    config = {
+        'sde_connection': os.path.join(out_dir, 'LRM.sde'),
+        'cnxn_info': {'driver': 'ODBC Driver 17 for SQL Server',
+                      'server': 'benchmark', 'database': 'LRM',
+                      'username': 'benchmark', 'password': 'benchmark'},
+        'portal_info': {'url': 'https://benchmark/arcgis',
+                        'username': 'benchmark', 'password': 'benchmark'},
+        'sql_procs': {'stand_overlay_proc': 'LRM_StandOverlay'},
+        'datasets': dict(datasets),
+        'mobile_datasets': dict(mobile_datasets)}
+    config.update(sections)
+    config_path = os.path.join(out_dir, 'config.json')
+    with open(config_path, 'w') as config_file:
+        json.dump(config, config_file, indent=4)
+    return config_path
+
+
+def buildFormItems(form_count, itemset_rows=200, seed=1):
+    """Creates form_count Survey123 form items in the stand-in Portal, one
+       per property. Property OIDs all have four digits so no OID is a
+       suffix of another. Returns [propertyOID, itemID] pairs"""
+    rnd = random.Random(seed)
+    gis.reset()
+    header = '"list_name","name","label"\n'
+    itemIDs = []
+    for oid in range(1001, 1001 + form_count):
+        itemsets = header + ''.join(
+            '"type","{0}","Type {0}"\n'.format(rnd.randint(1, 999))
+            for i in range(itemset_rows))
+        item_id = '{0:032x}'.format(rnd.getrandbits(128))
+        gis.addFormItem(item_id, 'LRM Activity {0}'.format(oid),
+                        {'itemsets.csv': itemsets,
+                         'chemdefaults.csv': header})
+        itemIDs.append([oid, item_id])
+    return itemIDs
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:        BenchmarkDomains.py
+#
+# Purpose:     Offline load test of UpdateSurvey123Domains.py and
+#              UpdateCollectorDomains.py. The MOBILE_* procedures are served
+#              by MobileProcEmulator over a synthetic SQLite fixture, arcpy
+#              and arcgis by the stand-ins in Benchmarks\stubs.
+#
+# Usage Notes: python BenchmarkDomains.py [--properties 100,1000,5000]
+#                  [--out RESULTS.json]
+#
+# Author:      Dylan Harwell - Resource Data Inc
+#
+# Created:     10/18/2026
+# -----------------------------------------------------------------------------
+
+import argparse
+import builtins
+import contextlib
+import glob
+import json
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import time
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+scripts_dir = os.path.dirname(bench_dir)
+sys.path.insert(0, os.path.join(bench_dir, 'stubs'))
+sys.path.insert(1, scripts_dir)
+
+import BenchData
+import GWRutils
+import MobileProcEmulator
+
+domain_procs = {'compartment_proc': 'MOBILE_GET_CompartmentOIDs_propertyOID',
+                'supervisor_proc': 'MOBILE_GET_SupervisorOIDs_propertyOID',
+                'contractor_proc': 'MOBILE_GET_ContractorOIDs_propertyOID',
+                'chemOIDs_proc': 'MOBILE_GET_ChemicalOIDs_propertyOID',
+                'species_proc': 'MOBILE_GET_PlantingSpecies_propertyOID',
+                'itemsets_proc': 'MOBILE_Update_itemsets_propertyOID',
+                'chem_defaults_proc':
+                    'MOBILE_Update_chemdefaults_propertyOID'}
+
+
+def runScript(script_name, work_dir, config_sections):
+    """Runs a domain script unattended against the emulator and returns
+       its stage metrics"""
+    config_path = BenchData.writeConfig(work_dir, **config_sections)
+    working_dir = os.path.join(work_dir, 'Working')
+    log_dir = os.path.join(work_dir, 'Logs')
+    for path in (working_dir, log_dir):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+    os.environ['GWR_CONFIG'] = config_path
+    os.environ['GWR_WORKING_DIR'] = working_dir
+    os.environ['GWR_DOMAINS_DIR'] = working_dir
+    os.environ['GWR_LOG_DIR'] = log_dir
+
+    prompt = builtins.input
+    builtins.input = lambda *args: ''
+    cwd = os.getcwd()
+    start = time.time()
+    try:
+        with open(os.devnull, 'w') as devnull:
+            with contextlib.redirect_stdout(devnull):
+                runpy.run_path(os.path.join(scripts_dir, script_name),
+                               run_name='__main__')
+    except SystemExit:
+        pass
+    finally:
+        builtins.input = prompt
+        os.chdir(cwd)
+    elapsed = time.time() - start
+    GWRutils.writeMetrics()
+    GWRutils.flushLogs()
+    metrics_path = glob.glob(os.path.join(log_dir, script_name[:-3] +
+                                          '_METRICS_*.json'))[0]
+    with open(metrics_path) as metrics_file:
+        metrics = json.load(metrics_file)
+    os.remove(metrics_path)
+    return {'seconds': round(elapsed, 3), 'stages': metrics['stages'],
+            'calls': metrics['calls']}
+
+
+def benchDomains(property_count):
+    """Builds a fixture and form items for property_count properties and
+       runs both domain scripts for all of them"""
+    work_dir = tempfile.mkdtemp(prefix='gwr_bench_')
+    itemIDs = BenchData.buildFormItems(property_count)
+    propertyOIDs = [oid for oid, item_id in itemIDs]
+    fixture_path = os.path.join(work_dir, 'fixture.sqlite')
+    start = time.time()
+    MobileProcEmulator.buildFixture(fixture_path, propertyOIDs)
+    fixture_seconds = round(time.time() - start, 3)
+
+    config_sections = {
+        'cnxn_info': {'emulator': fixture_path},
+        'sql_procs': dict(domain_procs),
+        'properties': {'{0} - Property {0}'.format(oid): True
+                       for oid in propertyOIDs},
+        'ax_properties': ['000']}
+    results = {'properties': property_count,
+               'fixture_seconds': fixture_seconds}
+    try:
+        for script_name in ('UpdateSurvey123Domains.py',
+                            'UpdateCollectorDomains.py'):
+            results[script_name[:-3]] = runScript(script_name, work_dir,
+                                                  config_sections)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def printResults(results):
+    for result in results:
+        count = result['properties']
+        print('\n{0} properties (fixture built in {1:.2f}s)'.format(
+              count, result['fixture_seconds']))
+        for script_name in ('UpdateSurvey123Domains',
+                            'UpdateCollectorDomains'):
+            script = result[script_name]
+            print('  {0}: {1:.2f}s, {2:.1f} properties/sec, {3} SQL and {4} '
+                  'Portal call(s)'.format(script_name, script['seconds'],
+                                          count / script['seconds'],
+                                          script['calls']['sql'],
+                                          script['calls']['portal']))
+            for stage, stats in script['stages'].items():
+                print('    {0:<20}{1:>10.3f}s  {2}'.format(
+                      stage, stats['seconds'], stats['status']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline load test of the '
+                                     'domain and itemsets pipelines')
+    parser.add_argument('--properties', default='100,1000,5000',
+                        help='comma separated property counts')
+    parser.add_argument('--out', default=None,
+                        help='write results as json to this path')
+    args = parser.parse_args()
+
+    results = []
+    for count in [int(c) for c in args.properties.split(',')]:
+        print('...Load testing domain scripts with {0} properties'.format(
+              count))
+        results.append(benchDomains(count))
+    printResults(results)
+    if args.out:
+        with open(args.out, 'w') as out_file:
+            json.dump(results, out_file, indent=4)
+        print('\n...Results written to ' + args.out)
+
+
+if __name__ == '__main__':
+    main()
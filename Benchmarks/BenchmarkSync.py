@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:        BenchmarkSync.py
+#
+# Purpose:     Offline benchmark of MobileSyncLRM.py and the GWRutils field
+#              mapping, CSV and Portal form helpers. arcpy, pyodbc and
+#              arcgis are replaced by the in-process stand-ins in
+#              Benchmarks\stubs, so it runs on any machine with pandas.
+#
+# Usage Notes: python BenchmarkSync.py [--sizes 1000,10000,100000]
+#                  [--sql-latency SECONDS] [--sync-options JSON]
+#                  [--out RESULTS.json]
+#              Per-stage throughput comes from the metrics file each sync
+#              run writes. Save results with --out to compare runs.
+#
+# Author:      Dylan Harwell - Resource Data Inc
+#
+# Created:     10/18/2026
+# -----------------------------------------------------------------------------
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import time
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+scripts_dir = os.path.dirname(bench_dir)
+sys.path.insert(0, os.path.join(bench_dir, 'stubs'))
+sys.path.insert(1, scripts_dir)
+
+import arcpy
+import pyodbc
+import pandas as pd
+from arcgis import gis
+import BenchData
+import GWRutils
+
+
+def benchSync(size, sql_latency=0.0, sync_options=None):
+    """Runs MobileSyncLRM.py over size synthetic activities and returns the
+       stage metrics it recorded"""
+    BenchData.buildSyncData(size)
+    pyodbc.reset()
+    pyodbc.LATENCY = sql_latency
+    work_dir = tempfile.mkdtemp(prefix='gwr_bench_')
+    sections = {'sync_options': sync_options} if sync_options else {}
+    config_path = BenchData.writeConfig(work_dir, **sections)
+    os.environ['GWR_CONFIG'] = config_path
+    os.environ['GWR_LOG_DIR'] = work_dir
+    start = time.time()
+    try:
+        with open(os.devnull, 'w') as devnull:
+            with contextlib.redirect_stdout(devnull):
+                runpy.run_path(os.path.join(scripts_dir, 'MobileSyncLRM.py'),
+                               run_name='__main__')
+    except SystemExit:
+        pass
+    elapsed = time.time() - start
+    GWRutils.writeMetrics()
+    GWRutils.flushLogs()
+    metrics_files = glob.glob(os.path.join(work_dir, '*_METRICS_*.json'))
+    with open(metrics_files[0]) as metrics_file:
+        metrics = json.load(metrics_file)
+    synced = len(arcpy.TABLES[BenchData.datasets['activity_fc']].rows)
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return {'rows': size, 'synced': synced, 'seconds': round(elapsed, 3),
+            'sql_statements': len(pyodbc.CALLS),
+            'stages': metrics['stages'], 'calls': metrics['calls']}
+
+
+def benchFieldMapper(size):
+    """Times customFieldMapper between two 80 field tables, with the schema
+       cache cleared before every call and with it warm"""
+    fields = ['Field{0}'.format(i) for i in range(80)]
+    arcpy.addTable(arcpy.Table('MAP_TARGET', fields, spatial=True))
+    arcpy.addTable(arcpy.Table('MAP_SOURCE', [f.upper() for f in fields],
+                               spatial=True, globalid=False))
+    calls = max(10, size // 100)
+    start = time.time()
+    for i in range(calls):
+        GWRutils.resetSchemaCache()
+        GWRutils.customFieldMapper('MAP_TARGET', 'MAP_SOURCE')
+    seconds = round(time.time() - start, 3)
+    start = time.time()
+    for i in range(calls):
+        GWRutils.customFieldMapper('MAP_TARGET', 'MAP_SOURCE')
+    return {'calls': calls, 'seconds': seconds,
+            'cached_seconds': round(time.time() - start, 3)}
+
+
+def benchCSV(size):
+    """Times generateUpdatedCSV for a DataFrame of size rows"""
+    frame = pd.DataFrame({'list_name': ['type'] * size,
+                          'name': list(range(size)),
+                          'label': ['Type {0}'.format(i) for i in range(size)],
+                          'propertyOID': [i % 50 for i in range(size)]})
+    work_dir = tempfile.mkdtemp(prefix='gwr_bench_')
+    start = time.time()
+    try:
+        GWRutils.generateUpdatedCSV(frame, os.path.join(work_dir,
+                                                        'itemsets.csv'))
+        result = {'rows': size, 'seconds': round(time.time() - start, 3)}
+    except Exception as e:
+        result = {'rows': size, 'error': str(e)}
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return result
+
+
+def benchForms(size):
+    """Times downloading, swapping and uploading one form per 100 rows,
+       capped at 200 forms"""
+    form_count = min(200, max(5, size // 100))
+    itemIDs = BenchData.buildFormItems(form_count)
+    portal = gis.GIS('https://benchmark/arcgis', 'benchmark', 'benchmark')
+    work_dir = tempfile.mkdtemp(prefix='gwr_bench_')
+    cwd = os.getcwd()
+    result = {'forms': form_count}
+    try:
+        with open(os.devnull, 'w') as devnull:
+            with contextlib.redirect_stdout(devnull):
+                start = time.time()
+                GWRutils.downloadAndExtractFormItems(portal, itemIDs,
+                                                     work_dir)
+                result['download_seconds'] = round(time.time() - start, 3)
+                for oid, item_id in itemIDs:
+                    for name in ('itemsets', 'chemdefaults'):
+                        with open(os.path.join(work_dir, '{0}{1}.csv'.format(
+                                  oid, name)), 'w') as csv_file:
+                            csv_file.write('"list_name","name","label"\n')
+                start = time.time()
+                GWRutils.swapCSVandUploadToPortal(portal, itemIDs, work_dir)
+                result['upload_seconds'] = round(time.time() - start, 3)
+                result['uploads'] = len(gis.UPLOADS)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return result
+
+
+def rate(count, seconds):
+    return count / seconds if seconds else float('inf')
+
+
+def printResults(results):
+    for size, result in sorted(results.items(), key=lambda r: int(r[0])):
+        sync = result['sync']
+        print('\n{0} mobile activities: sync {1:.2f}s, {2} synced, {3} SQL '
+              'statement(s)'.format(size, sync['seconds'], sync['synced'],
+                                    sync['sql_statements']))
+        print('  {0:<14}{1:>10}{2:>10}{3:>10}{4:>14}'.format(
+              'stage', 'seconds', 'rows in', 'rows out', 'rows/sec'))
+        for stage, stats in sync['stages'].items():
+            print('  {0:<14}{1:>10.3f}{2:>10}{3:>10}{4:>14.1f}'.format(
+                  stage, stats['seconds'], stats['rows_in'],
+                  stats['rows_out'], rate(stats['rows_in'],
+                                          stats['seconds'])))
+        mapper = result['field_mapper']
+        print('  customFieldMapper: {0:.1f} calls/sec, {1:.1f} calls/sec '
+              'cached'.format(rate(mapper['calls'], mapper['seconds']),
+                              rate(mapper['calls'],
+                                   mapper['cached_seconds'])))
+        csv_result = result['csv']
+        if 'error' in csv_result:
+            print('  generateUpdatedCSV: failed ({0})'.format(
+                  csv_result['error']))
+        else:
+            print('  generateUpdatedCSV: {0:.1f} rows/sec'.format(
+                  rate(csv_result['rows'], csv_result['seconds'])))
+        forms = result['forms']
+        print('  Form download: {0:.1f} forms/sec, swap and upload: {1:.1f} '
+              'forms/sec ({2} upload(s))'.format(
+              rate(forms['forms'], forms['download_seconds']),
+              rate(forms['forms'], forms['upload_seconds']),
+              forms['uploads']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark of the '
+                                     'LRM mobile sync and domain helpers')
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='comma separated mobile activity counts')
+    parser.add_argument('--sql-latency', type=float, default=0.0,
+                        help='simulated SQL Server round trip in seconds')
+    parser.add_argument('--sync-options', default=None,
+                        help='json sync_options section for the sync run')
+    parser.add_argument('--out', default=None,
+                        help='write results as json to this path')
+    args = parser.parse_args()
+    sync_options = json.loads(args.sync_options) if args.sync_options \
+        else None
+
+    results = {}
+    for size in [int(s) for s in args.sizes.split(',')]:
+        print('...Benchmarking {0} mobile activities'.format(size))
+        results[size] = {
+            'sync': benchSync(size, args.sql_latency, sync_options),
+            'field_mapper': benchFieldMapper(size),
+            'csv': benchCSV(size),
+            'forms': benchForms(size)}
+    printResults(results)
+    if args.out:
+        with open(args.out, 'w') as out_file:
+            json.dump(results, out_file, indent=4)
+        print('\n...Results written to ' + args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:        gis.py
+#
+# Purpose:     In-process stand-in for arcgis.gis.GIS used by the benchmarks.
+#              Survey form items are kept in ITEMS and serve a zipped
+#              esriinfo folder on download, uploads are recorded in UPLOADS.
+#
+# Author:      Dylan Harwell - Resource Data Inc
+#
+# Created:     10/18/2026
+# -----------------------------------------------------------------------------
+
+import io
+import os
+import types
+from zipfile import ZipFile
+
+ITEMS = {}
+UPLOADS = []
+SERVICES = {}
+
+
+def reset():
+    """Drops all form items, uploads and services"""
+    ITEMS.clear()
+    del UPLOADS[:]
+    SERVICES.clear()
+
+
+def addFormItem(item_id, title, media_files):
+    """Adds a Survey123 form item whose esriinfo/media folder holds
+       media_files, a dict of file name to text content"""
+    buffer = io.BytesIO()
+    with ZipFile(buffer, 'w') as zip_file:
+        zip_file.writestr('esriinfo/' + title + '.xml', '<form/>')
+        for name, content in media_files.items():
+            zip_file.writestr('esriinfo/media/' + name, content)
+    ITEMS[item_id] = Item(item_id, title, buffer.getvalue())
+    return ITEMS[item_id]
+
+
+def addService(name, folder=None):
+    """Adds a GIS service to the default or a named server folder"""
+    service = Service(name)
+    SERVICES.setdefault(folder, []).append(service)
+    return service
+
+
+class Item(object):
+    def __init__(self, item_id, title, data):
+        self.id = item_id
+        self.title = title
+        self.type = 'Form'
+        self.data = data
+
+    def __repr__(self):
+        return '<Item title:"{0}" type:{1}>'.format(self.title, self.type)
+
+    def download(self, save_path=None, file_name=None):
+        out_path = os.path.join(save_path or os.getcwd(),
+                                file_name or self.id + '.zip')
+        with open(out_path, 'wb') as out_file:
+            out_file.write(self.data)
+        return out_path
+
+    def update(self, item_properties=None, data=None, thumbnail=None,
+               metadata=None):
+        with open(data, 'rb') as in_file:
+            self.data = in_file.read()
+        UPLOADS.append((self.id, len(self.data)))
+        return True
+
+
+class Service(object):
+    def __init__(self, name):
+        self.properties = types.SimpleNamespace(serviceName=name)
+        self.status = 'STARTED'
+
+    def start(self):
+        self.status = 'STARTED'
+        return True
+
+    def stop(self):
+        self.status = 'STOPPED'
+        return True
+
+
+class _Content(object):
+    def get(self, itemid):
+        return ITEMS.get(itemid)
+
+    def search(self, query='', item_type=None, max_items=10000, **kwargs):
+        return [item for item in ITEMS.values()
+                if item_type is None or item.type == item_type][:max_items]
+
+
+class _Services(object):
+    def list(self, folder=None, **kwargs):
+        return list(SERVICES.get(folder, []))
+
+
+class GIS(object):
+    def __init__(self, url=None, username=None, password=None, **kwargs):
+        self.url = url
+        self.properties = types.SimpleNamespace(
+                user=types.SimpleNamespace(username=username))
+        self.content = _Content()
+        server = types.SimpleNamespace(services=_Services())
+        self.admin = types.SimpleNamespace(
+                servers=types.SimpleNamespace(list=lambda: [server]))
@@ -0,0 +1,474 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:        arcpy.py
+#
+# Purpose:     In-process stand-in for the parts of arcpy used by the LRM
+#              mobile scripts, so they can be benchmarked without SDE.
+#              Tables live in memory in TABLES, keyed by dataset name.
+#
+# Author:      Dylan Harwell - Resource Data Inc
+#
+# Created:     10/18/2026
+# -----------------------------------------------------------------------------
+
+import json
+import re
+import types
+import uuid
+
+TABLES = {}
+LAYERS = {}
+STATS = {'search': 0, 'insert': 0, 'update': 0, 'layers': 0, 'rows_read': 0,
+         'rows_written': 0, 'gp_tools': 0}
+
+
+class Table(object):
+    """An in-memory table or feature class"""
+    def __init__(self, name, fields, spatial=False, globalid=True):
+        self.name = name
+        self.oid = 'OBJECTID'
+        self.fields = [self.oid] + (['GlobalID'] if globalid else []) + \
+            list(fields)
+        if spatial:
+            self.fields.append('SHAPE')
+        self.spatial = spatial
+        self.globalid = globalid
+        self.rows = []
+        self.next_oid = 1
+        self._lower = {f.lower(): f for f in self.fields}
+
+    def canon(self, field):
+        """Returns the stored name of a field or cursor token"""
+        if field == 'OID@':
+            return self.oid
+        if field.upper().startswith('SHAPE@'):
+            return 'SHAPE'
+        try:
+            return self._lower[field.lower()]
+        except KeyError:
+            raise RuntimeError('Field {0} not in {1}'.format(field, self.name))
+
+    def insert(self, values):
+        """Adds a row, assigning ObjectID and GlobalID. Returns the ObjectID"""
+        row = dict.fromkeys(self.fields)
+        row.update(values)
+        row[self.oid] = self.next_oid
+        self.next_oid += 1
+        if self.globalid:
+            row['GlobalID'] = '{' + str(uuid.uuid4()).upper() + '}'
+        self.rows.append(row)
+        STATS['rows_written'] += 1
+        return row[self.oid]
+
+
+def addTable(table, name=None):
+    """Registers an in-memory table under name (default table.name)"""
+    TABLES[name or table.name] = table
+    return table
+
+
+def reset():
+    """Drops all tables, layers and counters"""
+    TABLES.clear()
+    LAYERS.clear()
+    for key in STATS:
+        STATS[key] = 0
+
+
+# ------------------------------ Where clauses -------------------------------#
+_token = re.compile(r"\s*(?:(?P<str>'(?:[^']|'')*')|"
+                    r"(?P<num>-?\d+(?:\.\d+)?)|"
+                    r"(?P<op><>|>=|<=|!=|=|<|>|\(|\)|,)|"
+                    r"(?P<word>[A-Za-z_][\w.]*))")
+_in_list = re.compile(r"^\s*([A-Za-z_]\w*)\s+IN\s*\((.*)\)\s*$",
+                      re.IGNORECASE | re.DOTALL)
+_where_cache = {}
+
+
+def _literal(text):
+    text = text.strip()
+    if text.startswith("'"):
+        return text[1:-1].replace("''", "'")
+    return float(text) if '.' in text else int(text)
+
+
+def _compileWhere(where, table):
+    """Compiles a simple SQL where clause into a row predicate"""
+    if not where or not where.strip():
+        return None
+    key = (table.name, where)
+    if key in _where_cache:
+        return _where_cache[key]
+
+    # IN-lists are by far the most common clause, test them with a set
+    match = _in_list.match(where)
+    if match and re.search(r"\b(AND|OR)\b", where, re.IGNORECASE):
+        match = None
+    if match and "'" not in match.group(2):
+        field = table.canon(match.group(1))
+        values = frozenset(_literal(v) for v in match.group(2).split(',')
+                           if v.strip())
+        predicate = lambda row: row[field] in values
+    elif match:
+        field = table.canon(match.group(1))
+        values = frozenset(_literal(m.group(0)) for m in
+                           re.finditer(r"'(?:[^']|'')*'|-?\d+(?:\.\d+)?",
+                                       match.group(2)))
+        predicate = lambda row: row[field] in values
+    else:
+        out = []
+        pos = 0
+        while pos < len(where):
+            token = _token.match(where, pos)
+            if not token:
+                if not where[pos:].strip():
+                    break
+                raise RuntimeError('Invalid where clause: ' + where)
+            pos = token.end()
+            if token.group('str') is not None:
+                out.append(repr(_literal(token.group('str'))))
+            elif token.group('num') is not None:
+                out.append(token.group('num'))
+            elif token.group('op'):
+                out.append({'=': '==', '<>': '!='}.get(token.group('op'),
+                                                      token.group('op')))
+            else:
+                word = token.group('word').upper()
+                if word in ('AND', 'OR', 'NOT', 'IN', 'IS'):
+                    out.append(word.lower())
+                elif word == 'NULL':
+                    out.append('None')
+                else:
+                    out.append('row[{0!r}]'.format(
+                               table.canon(token.group('word'))))
+        expr = re.sub(r"in \(([^()]*)\)",
+                      lambda m: 'in {' + m.group(1) + ',}'
+                      if m.group(1).strip() else 'in ()', ' '.join(out))
+        predicate = eval('lambda row: ' + expr, {})
+    _where_cache[key] = predicate
+    return predicate
+
+
+def _resolve(dataset, where=None):
+    """Returns the table behind a dataset or layer and its where clauses"""
+    if dataset in LAYERS:
+        base, layer_where = LAYERS[dataset]
+        return TABLES[base], [layer_where, where]
+    return TABLES[_key(dataset)], [where]
+
+
+def _key(dataset):
+    if dataset in TABLES:
+        return dataset
+    lower = dataset.lower()
+    name = re.split(r'[\\/]', lower)[-1]
+    for key in TABLES:
+        if key.lower() in (lower, name):
+            return key
+    raise RuntimeError('Dataset does not exist: ' + dataset)
+
+
+def _filter(table, wheres):
+    predicates = [_compileWhere(w, table) for w in wheres if w]
+    predicates = [p for p in predicates if p]
+    if not predicates:
+        return list(table.rows)
+    if len(predicates) == 1:
+        predicate = predicates[0]
+        return [row for row in table.rows if predicate(row)]
+    return [row for row in table.rows if all(p(row) for p in predicates)]
+
+
+# --------------------------------- Cursors ----------------------------------#
+class _Cursor(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class SearchCursor(_Cursor):
+    def __init__(self, dataset, field_names, where_clause=None,
+                 spatial_reference=None, explode_to_points=False,
+                 sql_clause=(None, None)):
+        STATS['search'] += 1
+        table, wheres = _resolve(dataset, where_clause)
+        self._fields = [table.canon(f) for f in field_names]
+        rows = _filter(table, wheres)
+        if sql_clause and sql_clause[1]:
+            order = re.match(r'ORDER BY (\w+)', sql_clause[1], re.IGNORECASE)
+            if order:
+                field = table.canon(order.group(1))
+                rows.sort(key=lambda row: row[field])
+        if sql_clause and sql_clause[0]:
+            top = re.match(r'TOP (\d+)', sql_clause[0], re.IGNORECASE)
+            if top:
+                rows = rows[:int(top.group(1))]
+        self._rows = rows
+        self.fields = tuple(field_names)
+
+    def __iter__(self):
+        fields = self._fields
+        for row in self._rows:
+            STATS['rows_read'] += 1
+            yield tuple([row[f] for f in fields])
+
+    def reset(self):
+        pass
+
+
+class InsertCursor(_Cursor):
+    def __init__(self, dataset, field_names):
+        STATS['insert'] += 1
+        self._table = _resolve(dataset)[0]
+        skip = (self._table.oid, 'GlobalID' if self._table.globalid else None)
+        self._fields = [(i, self._table.canon(f)) for i, f in
+                        enumerate(field_names)
+                        if self._table.canon(f) not in skip]
+        self._width = len(field_names)
+        self.fields = tuple(field_names)
+
+    def insertRow(self, row):
+        if len(row) != self._width:
+            raise RuntimeError('Row length does not match cursor fields')
+        return self._table.insert({f: row[i] for i, f in self._fields})
+
+
+class UpdateCursor(_Cursor):
+    def __init__(self, dataset, field_names, where_clause=None, *args,
+                 **kwargs):
+        STATS['update'] += 1
+        self._table, wheres = _resolve(dataset, where_clause)
+        self._fields = [self._table.canon(f) for f in field_names]
+        self._rows = _filter(self._table, wheres)
+        self._current = None
+        self.fields = tuple(field_names)
+
+    def __iter__(self):
+        for row in self._rows:
+            self._current = row
+            STATS['rows_read'] += 1
+            yield [row[f] for f in self._fields]
+
+    def updateRow(self, values):
+        STATS['rows_written'] += 1
+        for field, value in zip(self._fields, values):
+            self._current[field] = value
+
+    def deleteRow(self):
+        self._table.rows.remove(self._current)
+
+
+class Editor(object):
+    """Edit session that snapshots every table and restores on discard"""
+    def __init__(self, workspace):
+        self.workspace = workspace
+        self.isEditing = False
+        self._snapshot = None
+
+    def startEditing(self, with_undo=True, multiuser_mode=True):
+        self._snapshot = {k: ([dict(row) for row in t.rows], t.next_oid)
+                          for k, t in TABLES.items()}
+        self.isEditing = True
+
+    def startOperation(self):
+        pass
+
+    def stopOperation(self):
+        pass
+
+    def abortOperation(self):
+        pass
+
+    def stopEditing(self, save_changes):
+        if not save_changes:
+            for key, (rows, next_oid) in self._snapshot.items():
+                if key in TABLES:
+                    TABLES[key].rows = rows
+                    TABLES[key].next_oid = next_oid
+        self._snapshot = None
+        self.isEditing = False
+
+
+da = types.SimpleNamespace(SearchCursor=SearchCursor,
+                           InsertCursor=InsertCursor,
+                           UpdateCursor=UpdateCursor, Editor=Editor)
+env = types.SimpleNamespace(workspace=None, overwriteOutput=False)
+
+
+# ------------------------------- Geometry -----------------------------------#
+class SpatialReference(object):
+    def __init__(self, factory_code=3857):
+        self.factoryCode = factory_code
+
+
+class Geometry(object):
+    """Geometry carrying only its WKB, flagged as having true curves if
+       hasCurves is set"""
+    def __init__(self, wkb=b'', hasCurves=False):
+        self.WKB = bytes(wkb)
+        self.hasCurves = hasCurves
+
+    @property
+    def JSON(self):
+        return json.dumps({'wkb': self.WKB.hex(), 'curves': self.hasCurves})
+
+    def __eq__(self, other):
+        return isinstance(other, Geometry) and other.WKB == self.WKB
+
+    def __hash__(self):
+        return hash(self.WKB)
+
+    def equals(self, other):
+        return self == other
+
+
+def FromWKB(wkb, spatial_reference=None):
+    return Geometry(wkb)
+
+
+def AsShape(geojson_struct, esri_json=False):
+    data = json.loads(geojson_struct)
+    return Geometry(bytes.fromhex(data['wkb']), data['curves'])
+
+
+# ------------------------------ Describe ------------------------------------#
+class Field(object):
+    def __init__(self, name, type='String'):
+        self.name = name
+        self.type = type
+
+
+def Exists(dataset):
+    try:
+        _resolve(dataset)
+    except (KeyError, RuntimeError):
+        return False
+    return True
+
+
+def ListFields(dataset, wild_card=None, field_type=None):
+    table = _resolve(dataset)[0]
+    fields = []
+    for name in table.fields:
+        if name == table.oid:
+            fields.append(Field(name, 'OID'))
+        elif name == 'SHAPE':
+            fields.append(Field('Shape', 'Geometry'))
+        elif name == 'GlobalID':
+            fields.append(Field(name, 'GlobalID'))
+        else:
+            fields.append(Field(name))
+    return fields
+
+
+def Describe(dataset):
+    table = _resolve(dataset)[0]
+    return types.SimpleNamespace(
+        name=table.name, catalogPath=dataset, hasGlobalID=table.globalid,
+        OIDFieldName=table.oid, fields=ListFields(dataset),
+        dataType='FeatureClass' if table.spatial else 'Table',
+        shapeFieldName='SHAPE' if table.spatial else None,
+        shapeType='Polygon' if table.spatial else None,
+        spatialReference=SpatialReference())
+
+
+def AddFieldDelimiters(datasource, field):
+    return field
+
+
+# --------------------------- Geoprocessing tools ----------------------------#
+def MakeFeatureLayer_management(in_features, out_layer, where_clause=None,
+                                *args):
+    STATS['layers'] += 1
+    LAYERS[out_layer] = (_key(in_features) if in_features not in LAYERS
+                         else LAYERS[in_features][0], where_clause)
+    return out_layer
+
+
+MakeTableView_management = MakeFeatureLayer_management
+
+
+def GetCount_management(in_rows):
+    table, wheres = _resolve(in_rows)
+    return [str(len(_filter(table, wheres)))]
+
+
+def TruncateTable_management(in_table):
+    STATS['gp_tools'] += 1
+    _resolve(in_table)[0].rows = []
+
+
+def DeleteRows_management(in_rows):
+    STATS['gp_tools'] += 1
+    table, wheres = _resolve(in_rows)
+    doomed = set(id(row) for row in _filter(table, wheres))
+    table.rows = [row for row in table.rows if id(row) not in doomed]
+
+
+def Append_management(inputs, target, schema_type='TEST', *args):
+    STATS['gp_tools'] += 1
+    source, wheres = _resolve(inputs)
+    table = _resolve(target)[0]
+    skip = (source.oid, 'GlobalID')
+    for row in _filter(source, wheres):
+        values = {}
+        for field, value in row.items():
+            if field not in skip and field.lower() in table._lower:
+                values[table._lower[field.lower()]] = value
+        table.insert(values)
+
+
+def CreateFeatureclass_management(out_path, out_name, geometry_type=None,
+                                  template=None, *args, **kwargs):
+    STATS['gp_tools'] += 1
+    source = _resolve(template)[0]
+    fields = [f for f in source.fields
+              if f not in (source.oid, 'GlobalID', 'SHAPE')]
+    addTable(Table(out_name, fields, True, source.globalid),
+             out_path + '\\' + out_name)
+
+
+def CreateTable_management(out_path, out_name, template=None, *args,
+                           **kwargs):
+    STATS['gp_tools'] += 1
+    source = _resolve(template)[0]
+    fields = [f for f in source.fields
+              if f not in (source.oid, 'GlobalID', 'SHAPE')]
+    addTable(Table(out_name, fields, False, source.globalid),
+             out_path + '\\' + out_name)
+
+
+def Delete_management(in_data, *args):
+    STATS['gp_tools'] += 1
+    if in_data in LAYERS:
+        LAYERS.pop(in_data)
+    else:
+        TABLES.pop(_key(in_data))
+
+
+def ClearWorkspaceCache_management(*args):
+    pass
+
+
+def DisconnectUser(*args):
+    pass
+
+
+def _gpTool(*args, **kwargs):
+    STATS['gp_tools'] += 1
+
+
+# Schema tools only change the geodatabase model, count them and move on
+TableToDomain_management = _gpTool
+AssignDomainToField_management = _gpTool
+CreateDomain_management = _gpTool
+CreateRelationshipClass_management = _gpTool
+SetSubtypeField_management = _gpTool
+AddSubtype_management = _gpTool
+AddField_management = _gpTool
+AddGlobalIDs_management = _gpTool
+MigrateRelationshipClass_management = _gpTool
+TableToTable_conversion = _gpTool
+FeatureClassToFeatureClass_conversion = _gpTool
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:        pyodbc.py
+#
+# Purpose:     In-process stand-in for pyodbc used by the benchmarks. Every
+#              statement is recorded in CALLS and can be given a fixed round
+#              trip LATENCY so batched and pooled SQL paths can be compared.
+#              Result sets for a procedure can be supplied in PROCEDURES.
+#              Geodatabase ObjectID reservation is answered for bulk inserts.
+#
+# Author:      Dylan Harwell - Resource Data Inc
+#
+# Created:     10/18/2026
+# -----------------------------------------------------------------------------
+
+import re
+import threading
+import time
+
+CALLS = []
+LATENCY = 0.0
+PROCEDURES = {}
+threadsafety = 1
+_calls_lock = threading.Lock()
+_next_oid = [1000000]
+
+
+class Error(Exception):
+    pass
+
+
+def reset():
+    """Clears recorded calls, latency and procedure results"""
+    global LATENCY
+    del CALLS[:]
+    PROCEDURES.clear()
+    LATENCY = 0.0
+
+
+class Cursor(object):
+    def __init__(self):
+        self.description = None
+        self.fast_executemany = False
+        self._rows = []
+        self._sets = 0
+
+    def execute(self, sql, *params):
+        with _calls_lock:
+            CALLS.append((sql, params))
+        if LATENCY:
+            time.sleep(LATENCY)
+        proc = re.search(r'EXEC\s+([\w.\[\]]+)', sql, re.IGNORECASE)
+        name = proc.group(1) if proc else None
+        if name in PROCEDURES:
+            columns, rows = PROCEDURES[name](*params)
+            self.description = [(c, str, None, None, None, None, True)
+                                for c in columns]
+            self._rows = [tuple(r) for r in rows]
+        elif 'INFORMATION_SCHEMA' in sql:
+            self.description = [('TABLE_SCHEMA', str, None, None, None,
+                                 None, True)]
+            self._rows = [('sde',)]
+        elif 'SDE_table_registry' in sql:
+            self.description = [('registration_id', int, None, None, None,
+                                 None, True)]
+            self._rows = [(1,)]
+        elif name and name.lower().endswith('_get_ids'):
+            with _calls_lock:
+                base_id = _next_oid[0]
+                _next_oid[0] += params[0]
+            self.description = [('base_id', int, None, None, None, None,
+                                 True), ('num_ids', int, None, None, None,
+                                         None, True)]
+            self._rows = [(base_id, params[0])]
+        else:
+            self.description = [('result', str, None, None, None, None, True)]
+            self._rows = []
+        self._sets = 2
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        rows = list(seq_of_params)
+        with _calls_lock:
+            CALLS.append((sql, len(rows)))
+        if LATENCY:
+            time.sleep(LATENCY)
+
+    def nextset(self):
+        self._sets -= 1
+        return self._sets > 0
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchval(self):
+        row = self.fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        pass
+
+
+class Connection(object):
+    def __init__(self, connection_string):
+        self.connection_string = connection_string
+        self.autocommit = False
+        self.closed = False
+
+    def cursor(self):
+        return Cursor()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.commit()
+
+
+def connect(connection_string, **kwargs):
+    if LATENCY:
+        time.sleep(LATENCY)
+    return Connection(connection_string)
@@ -347,6 +347,94 @@ as
 	from TFM_VT_CMN_SpecPoly_Type;
 GO
 
+/****** Object:  StoredProcedure [dbo].[MOBILE_StandOverlay_OIDList]    Script Date: 10/18/2026 9:00:00 AM ******/
+SET ANSI_NULLS ON
+GO
+
+SET QUOTED_IDENTIFIER ON
+GO
+
+
+
+/******************************************************************************************************
+Created By: Resource Data Inc
+
+Set-based wrapper around the LRM stand overlay procedure. Accepts a comma separated list of activity
+ObjectIDs and runs the overlay procedure for each one, so a batch of new stand activities costs one
+round trip from the sync script instead of one per activity. Each ObjectID runs under its own savepoint
+so a failure only undoes that ObjectID, and the ObjectIDs that failed are returned as a result set.
+If a failure dooms the transaction everything since the caller's last commit is rolled back, so every
+ObjectID run so far by this call is returned as failed. Change [dbo].[LRM_StandOverlay] below if the
+LRM overlay procedure (stand_overlay_proc in the sync config) has a different name.
+
+Modifications:
+Date		By					Description
+-------------------------------------------------------------------------------------------------------
+10/18/2026	rdi					Initial
+******************************************************************************************************/
+
+CREATE procedure [dbo].[MOBILE_StandOverlay_OIDList]
+	@OBJECTIDs varchar(max)
+	
+as
+	set nocount on
+
+	declare @oid int;
+	declare @trancount int;
+	declare @doomed bit;
+	declare @run table (OBJECTID int);
+	declare @failed table (FailedOBJECTID int, ErrorMessage nvarchar(4000));
+
+	declare oid_cursor cursor local fast_forward for
+		select distinct cast(value as int)
+		from string_split(@OBJECTIDs, ',')
+		where ltrim(rtrim(value)) <> '';
+
+	open oid_cursor;
+	fetch next from oid_cursor into @oid;
+
+	while @@fetch_status = 0
+	begin
+		insert into @run values (@oid);
+		set @trancount = @@trancount;
+		begin try
+			if @trancount = 0
+				begin transaction;
+			else
+				save transaction overlay_oid;
+
+			exec [dbo].[LRM_StandOverlay] @OBJECTID = @oid;
+
+			if @trancount = 0
+				commit transaction;
+		end try
+		begin catch
+			set @doomed = case when xact_state() = -1 and @trancount > 0
+							   then 1 else 0 end;
+			if xact_state() = -1 or (xact_state() = 1 and @trancount = 0)
+				rollback transaction;
+			else if xact_state() = 1
+				rollback transaction overlay_oid;
+
+			if @doomed = 1
+			begin
+				insert into @failed
+					select OBJECTID, error_message() from @run
+					where OBJECTID not in (select FailedOBJECTID from @failed);
+				delete from @run;
+			end
+			else
+				insert into @failed values (@oid, error_message());
+		end catch
+		fetch next from oid_cursor into @oid;
+	end
+
+	close oid_cursor;
+	deallocate oid_cursor;
+
+	select FailedOBJECTID, ErrorMessage from @failed;
+GO
+
 /****** Object:  StoredProcedure [dbo].[MOBILE_Update_chemdefaults_propertyOID]    Script Date: 5/4/2020 11:01:30 AM ******/
 SET ANSI_NULLS ON
 GO
@@ -13,9 +13,22 @@ import pandas as pd
 import pyodbc
 import json
 import time
+import datetime
+import threading
+import queue
+import atexit
+import contextlib
+import functools
+import cProfile
+import tracemalloc
+import mmap
+import sys
 import csv
 import os
 import shutil
+import uuid
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from zipfile import ZipFile
 from arcgis.gis import GIS
 import arcpy
@@ -27,10 +40,282 @@ def getTime():
     return date_time
 
 
-def logMessage(log_path, log_message):
-    """Opens and appends a message to a specified log file"""
-    with open(log_path, 'a') as log:
-        log.write(log_message + '\n')
+LOG_LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+_log_writers = {}
+
+
+class BufferedLogWriter(object):
+    """Queues log records and appends them to a log file in batches from a
+       background thread, so callers never wait on file or console IO. Keeps
+       per-stage counters that are written as one aggregated record"""
+
+    def __init__(self, log_path, level='INFO', json_lines=False, echo=False,
+                 flush_interval=0.5, max_batch=1000):
+        self.log_path = log_path
+        self.level = LOG_LEVELS[level.upper()]
+        self.json_lines = json_lines
+        self.echo = echo
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def emit(self, message, level='INFO', **fields):
+        """Queues a record if its level passes the writer's level"""
+        level = level.upper()
+        if LOG_LEVELS[level] < self.level:
+            return
+        if self.echo:
+            print(message)
+        record = {'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                  'level': level, 'message': message}
+        record.update(fields)
+        self._queue.put(record)
+
+    def count(self, stage, counter, n=1):
+        """Adds to an aggregated counter for a stage"""
+        with self._lock:
+            stage_counters = self.counters.setdefault(stage, {})
+            stage_counters[counter] = stage_counters.get(counter, 0) + n
+
+    def flushCounters(self, stage):
+        """Writes a stage's counters as a single record and resets them"""
+        with self._lock:
+            stage_counters = self.counters.pop(stage, None)
+        if stage_counters:
+            message = '...{0}: {1}'.format(stage, ', '.join(
+                      '{0}={1}'.format(k, v)
+                      for k, v in sorted(stage_counters.items())))
+            self.emit(message, stage=stage, counters=stage_counters)
+
+    def close(self):
+        """Writes any queued records and stops the background thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _format(self, record):
+        if self.json_lines:
+            return json.dumps(record, default=str)
+        return record['message']
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            deadline = time.time() + self.flush_interval
+            while batch[-1] is not None and len(batch) < self.max_batch:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                stop = True
+                batch.pop()
+            if batch:
+                with open(self.log_path, 'a') as log:
+                    log.write('\n'.join(self._format(r) for r in batch) +
+                              '\n')
+
+
+def configureLogger(log_path, level='INFO', json_lines=False, echo=False,
+                    flush_interval=0.5):
+    """Sets up the buffered writer used by logMessage for a log file"""
+    if log_path in _log_writers:
+        _log_writers.pop(log_path).close()
+    writer = BufferedLogWriter(log_path, level, json_lines, echo,
+                               flush_interval)
+    _log_writers[log_path] = writer
+    return writer
+
+
+def _getLogWriter(log_path):
+    writer = _log_writers.get(log_path)
+    if writer is None:
+        writer = configureLogger(log_path)
+    return writer
+
+
+def logMessage(log_path, log_message, level='INFO'):
+    """Queues a message for a specified log file, dropped if below the log
+       level configured for that file"""
+    _getLogWriter(log_path).emit(log_message, level)
+
+
+def logCount(log_path, stage, counter, n=1):
+    """Adds to a per-stage counter instead of logging a message per row"""
+    _getLogWriter(log_path).count(stage, counter, n)
+
+
+def flushLogCounters(log_path, stage):
+    """Writes the aggregated counters of a stage to the log"""
+    _getLogWriter(log_path).flushCounters(stage)
+
+
+@atexit.register
+def flushLogs(keep=None):
+    """Writes all queued log records and closes the writers, except the one
+       for the log file keep. Called automatically at exit"""
+    for log_path in list(_log_writers):
+        if log_path != keep:
+            _log_writers.pop(log_path).close()
+
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def startMetrics(script_name, metrics_path):
+    """Starts collecting stage timings, row counts and SDE/SQL/Portal call
+       counts for a script run. The metrics are written to metrics_path as
+       json when the script exits"""
+    _metrics.clear()
+    _metrics.update({'script': script_name, 'path': metrics_path,
+                     'started': time.strftime('%Y-%m-%d %H:%M:%S'),
+                     'start_time': time.time(), 'stages': {},
+                     'calls': {'sde': 0, 'sql': 0, 'portal': 0}, 'open': {}})
+    return _metrics
+
+
+_profile = {}
+
+
+def profilingRequested():
+    """Returns True if profiling was switched on with the GWR_PROFILE
+       environment variable or the --profile command line flag"""
+    env = os.environ.get('GWR_PROFILE', '').lower()
+    return env not in ('', '0', 'false', 'no') or '--profile' in sys.argv
+
+
+def enableProfiling(profile_dir, prefix):
+    """Profiles every named stage with cProfile and tracemalloc. Each stage
+       writes <prefix>_<stage>.prof and a <prefix>_<stage>_MEMORY.txt peak
+       memory report to profile_dir"""
+    _profile.clear()
+    _profile.update({'dir': profile_dir, 'prefix': prefix, 'stage': None})
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(10)
+
+
+def _startProfile(stage):
+    if not _profile or _profile['stage']:
+        return
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    _profile['stage'] = stage
+    _profile['memory'] = tracemalloc.get_traced_memory()[0]
+    _profile['profiler'] = cProfile.Profile()
+    _profile['profiler'].enable()
+
+
+def _endProfile(stage, status):
+    if not _profile or _profile['stage'] != stage:
+        return
+    _profile['profiler'].disable()
+    _profile['stage'] = None
+    current, peak = tracemalloc.get_traced_memory()
+    out_path = os.path.join(_profile['dir'], '{0}_{1}'.format(
+                            _profile['prefix'], stage))
+    _profile['profiler'].dump_stats(out_path + '.prof')
+    top = tracemalloc.take_snapshot().statistics('lineno')[:15]
+    with open(out_path + '_MEMORY.txt', 'w') as report:
+        report.write('Stage: {0} ({1})\n'.format(stage, status))
+        report.write('Memory at start: {0:.1f} MB\n'.format(
+                     _profile['memory'] / 1048576.0))
+        report.write('Memory at end: {0:.1f} MB\n'.format(
+                     current / 1048576.0))
+        report.write('Peak memory: {0:.1f} MB\n\n'.format(
+                     peak / 1048576.0))
+        report.write('Top allocations still held at end of stage:\n')
+        for stat in top:
+            report.write(str(stat) + '\n')
+
+
+def startStage(stage):
+    """Starts timing a named stage, and profiling it if enabled"""
+    if _metrics:
+        _metrics['open'][stage] = time.time()
+    _startProfile(stage)
+
+
+def endStage(stage, rows_in=None, rows_out=None, status='completed'):
+    """Stops timing a named stage and records its row counts"""
+    _endProfile(stage, status)
+    if not _metrics or stage not in _metrics['open']:
+        return
+    elapsed = time.time() - _metrics['open'].pop(stage)
+    with _metrics_lock:
+        stats = _metrics['stages'].setdefault(stage, {
+                'seconds': 0.0, 'runs': 0, 'rows_in': 0, 'rows_out': 0})
+        stats['seconds'] = round(stats['seconds'] + elapsed, 3)
+        stats['runs'] += 1
+        stats['status'] = status
+    recordRows(stage, rows_in or 0, rows_out or 0)
+
+
+@contextlib.contextmanager
+def timedStage(stage):
+    """Context manager that times the enclosed block as a named stage"""
+    startStage(stage)
+    try:
+        yield
+    except BaseException:
+        endStage(stage, status='failed')
+        raise
+    endStage(stage)
+
+
+def timed(stage):
+    """Decorator that times every call of a function as a named stage"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with timedStage(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def recordRows(stage, rows_in=0, rows_out=0):
+    """Adds to the rows in/rows out counters of a stage"""
+    if not _metrics:
+        return
+    with _metrics_lock:
+        stats = _metrics['stages'].setdefault(stage, {
+                'seconds': 0.0, 'runs': 0, 'rows_in': 0, 'rows_out': 0})
+        stats['rows_in'] += rows_in
+        stats['rows_out'] += rows_out
+
+
+def recordCall(kind, n=1):
+    """Counts calls made to SDE ('sde'), SQL Server ('sql') or Portal
+       ('portal')"""
+    if not _metrics:
+        return
+    with _metrics_lock:
+        _metrics['calls'][kind] = _metrics['calls'].get(kind, 0) + n
+
+
+@atexit.register
+def writeMetrics():
+    """Writes the collected metrics file, stops collecting and returns the
+       metrics written. Called automatically at exit. Stages still running
+       are marked incomplete"""
+    if not _metrics:
+        return
+    for stage in list(_metrics['open']):
+        endStage(stage, status='incomplete')
+    data = {k: v for k, v in _metrics.items()
+            if k not in ('path', 'open', 'start_time')}
+    data['seconds'] = round(time.time() - _metrics['start_time'], 3)
+    replaceJsonFile(_metrics['path'], data)
+    _metrics.clear()
+    return data
 
 
 def validateConfig(config_path):
@@ -62,13 +347,227 @@ def checkForChanges(change_type):
     return change_list
 
 
+_warm_connections = {'enabled': False}
+_connection_pools = {}
+_pools_lock = threading.Lock()
+STATEMENT_CACHE_SIZE = 32
+
+
+class PooledConnection(object):
+    """Database connection checked out of a ConnectionPool. Leaving a with
+       block commits, or rolls back on error, and returns the connection to
+       the pool. A connection that fails to commit or roll back is closed
+       instead and the error raised, unless the block already raised one"""
+
+    def __init__(self, pool, connection, cursors):
+        self._pool = pool
+        self._connection = connection
+        self._cursors = cursors
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.release()
+        else:
+            try:
+                self.release(False)
+            except Exception:
+                pass
+        return False
+
+    def statementCursor(self, sql):
+        """Returns the cursor this connection keeps for a statement, so
+           pyodbc re-executes its prepared statement instead of preparing
+           it again"""
+        cursor = self._cursors.get(sql)
+        if cursor is None:
+            if len(self._cursors) >= STATEMENT_CACHE_SIZE:
+                self._cursors.clear()
+            cursor = self._cursors[sql] = self._connection.cursor()
+        return cursor
+
+    def release(self, commit=True):
+        """Commits or rolls back and returns the connection to the pool. If
+           that fails the connection is closed and the error raised"""
+        if self._connection is None:
+            return
+        connection, self._connection = self._connection, None
+        try:
+            if commit:
+                connection.commit()
+            else:
+                connection.rollback()
+        except Exception:
+            self._pool.release(connection, None)
+            raise
+        self._pool.release(connection, self._cursors)
+
+
+class ConnectionPool(object):
+    """Bounded pool of connections to one database. Callers wait for an idle
+       connection once max_size are open. A connection idle for check_after
+       seconds or more is checked with a SELECT 1 before it is handed out
+       and replaced if it is dead. Opening a connection is retried with
+       backoff"""
+
+    def __init__(self, cnxn_info, max_size=8, check_after=30,
+                 wait_timeout=None, retries=2):
+        self.cnxn_info = cnxn_info
+        self.max_size = max(1, max_size)
+        self.check_after = check_after
+        self.wait_timeout = wait_timeout
+        self.retries = retries
+        self._idle = []
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Checks out a PooledConnection, opening one if none is idle"""
+        with self._cond:
+            while True:
+                if self._idle:
+                    connection, cursors, since = self._idle.pop()
+                    break
+                if self._open < self.max_size:
+                    self._open += 1
+                    connection, cursors, since = None, {}, None
+                    break
+                if not self._cond.wait(self.wait_timeout):
+                    raise Exception('Timed out waiting for a database '
+                                    'connection')
+        try:
+            if connection is not None and \
+                    time.time() - since >= self.check_after and \
+                    not self._isAlive(connection):
+                self._close(connection)
+                connection, cursors = None, {}
+            if connection is None:
+                connection = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, connection, cursors)
+
+    def release(self, connection, cursors=None):
+        """Returns a connection to the pool, or closes it if cursors is
+           None or the pool was closed"""
+        with self._cond:
+            keep = cursors is not None and not self._closed
+            if keep:
+                self._idle.append((connection, cursors, time.time()))
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if not keep:
+            self._close(connection)
+
+    def close(self):
+        """Closes all idle connections, busy ones are closed on release"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for connection, cursors, since in idle:
+            self._close(connection)
+
+    def _connect(self):
+        for attempt in range(self.retries + 1):
+            try:
+                return _openDB(self.cnxn_info)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(2 ** attempt)
+
+    def _isAlive(self, connection):
+        try:
+            cursor = connection.cursor()
+            recordCall('sql')
+            cursor.execute('SELECT 1;').fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def enableWarmConnections():
+    """Leaves the SDE workspace cache in place at the end of a sync run, for
+       processes that run the sync repeatedly. Database connections are
+       pooled for the whole process either way"""
+    _warm_connections['enabled'] = True
+
+
+def warmConnectionsEnabled():
+    """Returns True if the SDE workspace cache is kept between runs"""
+    return _warm_connections['enabled']
+
+
+def getConnectionPool(cnxn_info):
+    """Returns the process wide ConnectionPool for cnxn_info, sized by its
+       optional pool_size, pool_check_seconds and pool_timeout keys"""
+    key = json.dumps(cnxn_info, sort_keys=True)
+    with _pools_lock:
+        pool = _connection_pools.get(key)
+        if pool is None or pool._closed:
+            pool = _connection_pools[key] = ConnectionPool(
+                       cnxn_info, cnxn_info.get('pool_size', 8),
+                       cnxn_info.get('pool_check_seconds', 30),
+                       cnxn_info.get('pool_timeout'))
+    return pool
+
+
+@atexit.register
+def closeConnectionPools():
+    """Closes the idle connections of every pool"""
+    with _pools_lock:
+        pools = list(_connection_pools.values())
+        _connection_pools.clear()
+    for pool in pools:
+        pool.close()
+
+
 def connectToDB(cnxn_info):
-    """Retrieves connection info and connects to database using pyodbc"""
+    """Retrieves connection info and checks out a pooled pyodbc connection
+       to the database, use it in a with block to return it. If cnxn_info
+       has an 'emulator' fixture path, connects to the local SQLite
+       emulator of the MOBILE_* procedures instead"""
+    return getConnectionPool(cnxn_info).acquire()
+
+
+def _statementCursor(db_connection, sql):
+    """Returns the cursor a pooled connection keeps for sql, or a new
+       cursor of any other connection"""
+    if isinstance(db_connection, PooledConnection):
+        return db_connection.statementCursor(sql)
+    return db_connection.cursor()
+
+
+def _openDB(cnxn_info):
+    if cnxn_info.get('emulator'):
+        import MobileProcEmulator
+        recordCall('sql')
+        return MobileProcEmulator.connect(cnxn_info['emulator'],
+                                          cnxn_info.get('emulator_noop_procs'))
     driver = cnxn_info['driver']
     server = cnxn_info['server']
     database = cnxn_info['database']
     username = cnxn_info['username']
     password = cnxn_info['password']
+    recordCall('sql')
     return pyodbc.connect('driver={%s};server=%s;database=%s;uid=%s;pwd=%s' %
                           (driver, server, database, username, password))    
 
@@ -85,6 +584,7 @@ def executeSQLProcToPandasDF(db_connection, sql_proc, param_value=None):
     else:
         sql = """EXEC {0};
               """.format(sql_proc)
+    recordCall('sql')
     rows = cursor.execute(sql).fetchall()
     columns = [column[0] for column in cursor.description]
     df_list.append(pd.DataFrame.from_records(rows, columns=columns))
@@ -94,12 +594,13 @@ def executeSQLProcToPandasDF(db_connection, sql_proc, param_value=None):
 def executeSQLProcStandOverlay(db_connection, sql_proc, param_value):
     """Calls SQL stored procedure that LRM uses to match stand activity with
        stand participating in activity"""
-    cursor = db_connection.cursor()
     sql = """EXEC {0}
-             @OBJECTID = {1};
-          """.format(sql_proc, param_value)
+             @OBJECTID = ?;
+          """.format(sql_proc)
+    cursor = _statementCursor(db_connection, sql)
+    recordCall('sql')
     try:
-        rows = cursor.execute(sql)
+        rows = cursor.execute(sql, int(param_value))
         while rows.nextset():
             rows.fetchone()
     except:
@@ -107,11 +608,199 @@ def executeSQLProcStandOverlay(db_connection, sql_proc, param_value):
     return True
 
 
+def executeSQLProcStandOverlayBatch(db_connection, batch_proc, param_values,
+                                    batch_size=200):
+    """Calls the set-based stand overlay wrapper procedure with batches of
+       activity OIDs, one round trip and commit per batch. The procedure
+       returns the OIDs it could not overlay, a batch that fails as a whole
+       is rolled back. Returns a list of OIDs that failed"""
+    sql = """EXEC {0}
+             @OBJECTIDs = ?;
+          """.format(batch_proc)
+    cursor = _statementCursor(db_connection, sql)
+    failed = []
+    for chunk in chunkList(param_values, batch_size):
+        oid_list = ','.join(str(int(oid)) for oid in chunk)
+        recordCall('sql')
+        try:
+            rows = cursor.execute(sql, oid_list)
+            chunk_failed = []
+            while True:
+                if rows.description and \
+                        rows.description[0][0] == 'FailedOBJECTID':
+                    chunk_failed.extend(int(row[0])
+                                        for row in rows.fetchall())
+                if not rows.nextset():
+                    break
+            db_connection.commit()
+            failed.extend(chunk_failed)
+        except:
+            try:
+                db_connection.rollback()
+            except:
+                pass
+            failed.extend(chunk)
+    return failed
+
+
+def executeSQLProcStandOverlayPool(cnxn_info, sql_proc, param_values,
+                                   max_workers=4):
+    """Calls the per-OID stand overlay procedure across a bounded pool of
+       database connections, one connection per worker. Each OID is
+       committed on its own, or rolled back if it fails. Returns a list of
+       OIDs that failed"""
+    param_values = list(param_values)
+    if not param_values:
+        return []
+    workers = max(1, min(max_workers, len(param_values)))
+
+    def runOverlays(oids):
+        failed = []
+        with connectToDB(cnxn_info) as cnxn:
+            for oid in oids:
+                done = executeSQLProcStandOverlay(cnxn, sql_proc, oid)
+                try:
+                    if done:
+                        cnxn.commit()
+                    else:
+                        cnxn.rollback()
+                except Exception:
+                    done = False
+                if not done:
+                    failed.append(oid)
+        return failed
+
+    failed = []
+    slices = [param_values[i::workers] for i in range(workers)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(runOverlays, slices):
+            failed.extend(result)
+    return failed
+
+
+def getTableRegistration(db_connection, table, gdb_schema=None):
+    """Looks up the geodatabase registration of an owner qualified table,
+       e.g. dbo.TFM_ACT_CHEMICAL_APPLICATION. The schema holding the
+       geodatabase repository, sde or dbo, is detected unless gdb_schema is
+       given. Returns (gdb_schema, registration_id) for reserveObjectIDs"""
+    parts = table.split('.')
+    if len(parts) < 2 or not all(parts[-2:]):
+        raise Exception('{0} must be qualified with its owner, e.g. '
+                        'dbo.{0}'.format(table))
+    owner, name = parts[-2:]
+    if gdb_schema is None:
+        sql = """SELECT TABLE_SCHEMA FROM INFORMATION_SCHEMA.TABLES
+                 WHERE TABLE_NAME = 'SDE_table_registry';"""
+        recordCall('sql')
+        gdb_schema = _statementCursor(db_connection, sql).execute(
+                         sql).fetchval()
+        if gdb_schema is None:
+            raise Exception('No geodatabase repository found in the '
+                            'database')
+    if not gdb_schema.isidentifier():
+        raise Exception('Invalid geodatabase schema {0}'.format(gdb_schema))
+    sql = """SELECT registration_id FROM [{0}].SDE_table_registry
+             WHERE owner = ? AND table_name = ?;""".format(gdb_schema)
+    recordCall('sql')
+    registration_id = _statementCursor(db_connection, sql).execute(
+                          sql, owner, name).fetchval()
+    if registration_id is None:
+        raise Exception('{0} is not registered with the geodatabase'.format(
+                        table))
+    return gdb_schema, int(registration_id)
+
+
+def reserveObjectIDs(db_connection, registration, count):
+    """Reserves count ObjectIDs for a table registered with the geodatabase
+       from its <gdb_schema>.i<registration_id>_get_ids procedure, the way
+       ArcGIS does for its own inserts. registration is the
+       (gdb_schema, registration_id) from getTableRegistration. Returns a
+       list of ObjectIDs"""
+    gdb_schema, registration_id = registration
+    sql = """SET NOCOUNT ON;
+             DECLARE @base_id INT, @num_ids INT;
+             EXEC [{0}].i{1}_get_ids 2, ?, @base_id OUTPUT, @num_ids OUTPUT;
+             SELECT @base_id, @num_ids;
+          """.format(gdb_schema, int(registration_id))
+    cursor = _statementCursor(db_connection, sql)
+    oids = []
+    while len(oids) < count:
+        recordCall('sql')
+        base_id, num_ids = cursor.execute(sql, count - len(oids)).fetchone()
+        oids.extend(range(base_id, base_id + num_ids))
+    return oids
+
+
+def streamBatches(rows, batch_size):
+    """Yields lists of at most batch_size rows from any iterable, so a cursor
+       can feed a batched writer without being read into memory"""
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def splitRows(rows, key_count, keys):
+    """Yields each row without its first key_count values, appending those
+       to keys as it goes. Lets one cursor read feed a writer while the
+       caller keeps the routing keys"""
+    for row in rows:
+        keys.append(row[:key_count])
+        yield row[key_count:]
+
+
+def pairRows(rows, index, value):
+    """Yields each row followed by a copy with the value at index replaced,
+       e.g. a planned chemical record and its actual record"""
+    for row in rows:
+        row = list(row)
+        yield row
+        copy = list(row)
+        copy[index] = value
+        yield copy
+
+
+def bulkInsertRows(db_connection, table, fields, rows, batch_size=1000,
+                   oid_field='OBJECTID', globalid_field='GlobalID',
+                   registration=None):
+    """Streams rows into a non-versioned, non-spatial geodatabase table with
+       parameterized fast_executemany batches, giving each row a reserved
+       ObjectID and, if globalid_field is set, a new GlobalID. The table's
+       registration is looked up once unless passed in. The caller
+       commits. Returns the number of rows inserted"""
+    if registration is None:
+        registration = getTableRegistration(db_connection, table)
+    columns = [oid_field] + ([globalid_field] if globalid_field else []) + \
+        list(fields)
+    sql = 'INSERT INTO {0} ({1}) VALUES ({2});'.format(
+          table, ', '.join('[{0}]'.format(c) for c in columns),
+          ', '.join('?' for c in columns))
+    cursor = _statementCursor(db_connection, sql)
+    cursor.fast_executemany = True
+    count = 0
+    for batch in streamBatches(rows, batch_size):
+        oids = reserveObjectIDs(db_connection, registration, len(batch))
+        params = []
+        for oid, row in zip(oids, batch):
+            if globalid_field:
+                params.append([oid, '{' + str(uuid.uuid4()).upper() + '}'] +
+                              list(row))
+            else:
+                params.append([oid] + list(row))
+        recordCall('sql')
+        cursor.executemany(sql, params)
+        count += len(params)
+    return count
+
+
 def connectToPortal(portal_info):
     """Retrives Portal info and connects to Portal"""
     url = portal_info['url']
     username = portal_info['username']
     password = portal_info['password']
+    recordCall('portal')
     return GIS(url, username, password)
 
 
@@ -129,6 +818,7 @@ def downloadAndExtractFormItems(portal_connection, itemIDs, working_dir):
     """Downloads survey form items and extracts to current working directory"""
     for ID in itemIDs:
         item = portal_connection.content.get(ID[1])
+        recordCall('portal', 2)
         print(item)
         #zipName = item.name
         zipName = str(ID[0]) + '.zip'
@@ -142,30 +832,29 @@ def downloadAndExtractFormItems(portal_connection, itemIDs, working_dir):
 def swapCSVandUploadToPortal(portal_connection, itemIDs, working_dir):
     """Switches out the updated itemsets.csv in the media folder of each
        survey, zips the folder and uploads to Portal"""
-    itemsets_path = '\\esriinfo\\media\\itemsets.csv'
-    chems_path = '\\esriinfo\\media\\chemdefaults.csv'
+    itemsets_path = os.path.join('esriinfo', 'media', 'itemsets.csv')
+    chems_path = os.path.join('esriinfo', 'media', 'chemdefaults.csv')
     in_working_dir = os.listdir(working_dir)    
     updated_csvs = [name for name in in_working_dir if name.endswith('.csv')]
     for ID in itemIDs:
         item = portal_connection.content.get(ID[1])
-        old_itemsets_path = os.path.join(working_dir,
-                                         str(ID[0]) + itemsets_path)
-        old_chems_path = os.path.join(working_dir,
-                                         str(ID[0]) + chems_path)
+        old_itemsets_path = os.path.join(working_dir, str(ID[0]),
+                                         itemsets_path)
+        old_chems_path = os.path.join(working_dir, str(ID[0]), chems_path)
         for csv_name in updated_csvs:
             if str(ID[0]) + 'itemsets.csv' in csv_name:
                 new_itemsets_path = os.path.join(working_dir, 
                                                  str(ID[0]) + 'itemsets.csv')
                 os.remove(old_itemsets_path)
-                new_renamed_path1 = os.path.join(working_dir,
-                                                str(ID[0]) + itemsets_path)
+                new_renamed_path1 = os.path.join(working_dir, str(ID[0]),
+                                                 itemsets_path)
                 shutil.move(new_itemsets_path, new_renamed_path1)
             if str(ID[0]) + 'chemdefaults.csv' in csv_name:
                 new_chems_path = os.path.join(working_dir, 
                                                  str(ID[0])+'chemdefaults.csv')
                 os.remove(old_chems_path)
-                new_renamed_path2 = os.path.join(working_dir,
-                                                str(ID[0]) + chems_path)
+                new_renamed_path2 = os.path.join(working_dir, str(ID[0]),
+                                                 chems_path)
                 shutil.move(new_chems_path, new_renamed_path2)
                 #print('Swapped out updated itemsets.csv for: ' + str(ID[0]))
             out_zip = os.path.join(working_dir, str(ID[0]) + '.zip')
@@ -177,6 +866,7 @@ def swapCSVandUploadToPortal(portal_connection, itemIDs, working_dir):
             os.chdir(working_dir)
             #print('Compressed folder: ' + str(ID[0]))
             item.update(item_properties=None, data=out_zip)
+            recordCall('portal', 2)
             #print('Updated form item: ' + item.title)
 
 
@@ -210,26 +900,144 @@ def resetMobileFeatures(features):
     """Clears all records from a list of datasets"""
     for feature in features:
         try:
+            recordCall('sde')
             arcpy.TruncateTable_management(feature)
         except:
             return False
     return True
+
+
+def createStagingCopy(workspace, template, name):
+    """Creates an empty dataset with the schema of template in a staging
+       workspace such as memory, replacing one left by an earlier run.
+       Returns its path"""
+    staged = workspace + '\\' + name
+    if arcpy.Exists(staged):
+        arcpy.Delete_management(staged)
+    shape_type = describeCached(template)['shapeType']
+    if shape_type:
+        recordCall('sde')
+        spatial_reference = arcpy.Describe(template).spatialReference
+        arcpy.CreateFeatureclass_management(workspace, name,
+                                            shape_type.upper(), template,
+                                            spatial_reference=
+                                            spatial_reference)
+    else:
+        arcpy.CreateTable_management(workspace, name, template)
+    return staged
+
+
+def deleteStagingCopies(staged):
+    """Deletes staging datasets made by createStagingCopy"""
+    for dataset in staged:
+        try:
+            if arcpy.Exists(dataset):
+                arcpy.Delete_management(dataset)
+            resetSchemaCache(dataset)
+        except:
+            return False
+    return True
      
 
+# Field lists, Describe properties and field mappings are cached per dataset
+# for the life of the process, and optionally persisted to disk between runs.
+# A cache written under a different schema version is discarded on load
+SCHEMA_CACHE_FORMAT = 1
+DESCRIBE_PROPERTIES = ['dataType', 'hasGlobalID', 'OIDFieldName',
+                       'shapeFieldName', 'shapeType']
+_schema_cache = {'version': None, 'path': None, 'fields': {},
+                 'describe': {}, 'mappings': {}}
+
+
+def _schemaKey(dataset):
+    """Returns the cache key of a dataset, qualified by the workspace"""
+    if os.path.isabs(dataset) or not arcpy.env.workspace:
+        return dataset.lower()
+    return os.path.join(arcpy.env.workspace, dataset).lower()
+
+
+def setSchemaCache(cache_path=None, schema_version=None):
+    """Sets the schema version of the cache and, if a path is given, loads
+       the cache persisted there and saves it back at exit"""
+    _schema_cache['version'] = [SCHEMA_CACHE_FORMAT, schema_version]
+    _schema_cache['path'] = cache_path
+    if not cache_path or not os.path.exists(cache_path):
+        return False
+    try:
+        with open(cache_path, 'r') as cache_file:
+            persisted = json.load(cache_file)
+    except (OSError, ValueError):
+        return False
+    if persisted.get('version') != _schema_cache['version']:
+        return False
+    _schema_cache['fields'].update(persisted.get('fields', {}))
+    _schema_cache['describe'].update(persisted.get('describe', {}))
+    return True
+
+
+@atexit.register
+def saveSchemaCache():
+    """Persists cached field lists and Describe properties if a cache path
+       was set"""
+    if not _schema_cache['path']:
+        return
+    replaceJsonFile(_schema_cache['path'],
+                    {'version': _schema_cache['version'],
+                     'fields': _schema_cache['fields'],
+                     'describe': _schema_cache['describe']})
+
+
+def resetSchemaCache(dataset=None):
+    """Drops cached schema of one dataset, or of all datasets, e.g. after
+       fields or GlobalIDs are added"""
+    if dataset is None:
+        for cached in ('fields', 'describe', 'mappings'):
+            _schema_cache[cached].clear()
+        return
+    key = _schemaKey(dataset)
+    _schema_cache['fields'].pop(key, None)
+    _schema_cache['describe'].pop(key, None)
+    for pair in [p for p in _schema_cache['mappings'] if key in p]:
+        del _schema_cache['mappings'][pair]
+
+
+def listFieldsCached(dataset):
+    """Returns [name, type] pairs of the fields of a dataset, only calling
+       arcpy.ListFields the first time"""
+    key = _schemaKey(dataset)
+    if key not in _schema_cache['fields']:
+        recordCall('sde')
+        _schema_cache['fields'][key] = [[f.name, f.type] for f in
+                                        arcpy.ListFields(dataset)]
+    return _schema_cache['fields'][key]
+
+
+def describeCached(dataset):
+    """Returns a dict of the DESCRIBE_PROPERTIES of a dataset, only calling
+       arcpy.Describe the first time"""
+    key = _schemaKey(dataset)
+    if key not in _schema_cache['describe']:
+        recordCall('sde')
+        desc = arcpy.Describe(dataset)
+        _schema_cache['describe'][key] = {p: getattr(desc, p, None)
+                                          for p in DESCRIBE_PROPERTIES}
+    return _schema_cache['describe'][key]
+
+
 def customFieldMapper(target_feature, source_feature):
     """Returns a list of fields to map for use with update/insert cursors"""
-    ignore = ['OBJECTID', 'Shape', 'SHAPE', 'GlobalID', 'Shape.STArea()',
-              'Shape.STLength()', 'STArea()', 'STLength()']
-    target_fields = [f for f in arcpy.ListFields(target_feature)
-                     if f.name not in ignore]
-    source_fields = [f for f in arcpy.ListFields(source_feature)
-                     if f.name not in ignore]
-    fields_to_map = []
-    for a in source_fields:
-        for t in target_fields:
-            if a.name.lower() == t.name.lower():
-                fields_to_map.append(a.name)
-    return fields_to_map
+    pair = (_schemaKey(target_feature), _schemaKey(source_feature))
+    if pair not in _schema_cache['mappings']:
+        ignore = set(['OBJECTID', 'Shape', 'SHAPE', 'GlobalID',
+                      'Shape.STArea()', 'Shape.STLength()', 'STArea()',
+                      'STLength()'])
+        target_fields = set(name.lower() for name, field_type
+                            in listFieldsCached(target_feature)
+                            if name not in ignore)
+        _schema_cache['mappings'][pair] = [
+            name for name, field_type in listFieldsCached(source_feature)
+            if name not in ignore and name.lower() in target_fields]
+    return list(_schema_cache['mappings'][pair])
 
 
 def abortEditOperation(edit_operation_object):
@@ -245,6 +1053,57 @@ def abortEditOperation(edit_operation_object):
         return False
        
 
+class SyncEditSession(object):
+    """Edit session for the target writes of a sync run. Each stage runs as
+       its own edit operation. Unless shared, every stage starts and saves
+       its own edit session as before. A shared session stays open across
+       stages until save is called, holding back the journal marks of the
+       stages in it until their edits are saved, so a failure rolls back
+       every stage since the session started"""
+
+    def __init__(self, workspace, shared=False):
+        self.workspace = workspace
+        self.shared = shared
+        self.editor = None
+        self.pending = []
+
+    def startOperation(self):
+        """Starts an edit operation, starting the edit session if needed"""
+        if self.editor is None or not self.editor.isEditing:
+            self.editor = arcpy.da.Editor(self.workspace)
+            self.editor.startEditing(False, True)
+        self.editor.startOperation()
+
+    def stopOperation(self):
+        """Stops the edit operation, saving the session unless shared"""
+        self.editor.stopOperation()
+        if not self.shared:
+            self.editor.stopEditing(True)
+
+    def completeStage(self, journal_path, journal, stage, guids=None):
+        """Records a completed stage in the journal, or holds it until the
+           shared session is saved"""
+        if self.shared:
+            self.pending.append((stage, guids))
+        else:
+            completeStage(journal_path, journal, stage, guids)
+
+    def save(self, journal_path, journal):
+        """Saves the shared session and records its held journal marks"""
+        if self.editor is not None and self.editor.isEditing:
+            self.editor.stopEditing(True)
+        for stage, guids in self.pending:
+            completeStage(journal_path, journal, stage, guids)
+        self.pending = []
+
+    def abort(self):
+        """Stops the edit session without saving"""
+        self.pending = []
+        if self.editor is not None:
+            return abortEditOperation(self.editor)
+        return False
+
+
 def startOrStopServices(portal_connection, service_action):
     """Starts or stops all GIS services"""
     try:
@@ -254,7 +1113,9 @@ def startOrStopServices(portal_connection, service_action):
         for f in folders:
             for s in server.services.list(f):
                 service_list.append(s)
+        recordCall('portal', len(folders) + 2)
         for s in service_list:
+            recordCall('portal')
             if service_action.lower() == 'start':
                 s.start()
                 print('...Started service: {0}'
@@ -272,44 +1133,444 @@ def startOrStopServices(portal_connection, service_action):
     return True
 
 
-def addPropertyActivityGeometry(propOIDs, property_fc, activity_fc):
-    """Adds boundary geometry to property activities based on property OID"""
+def addPropertyActivityGeometry(propOIDs, property_fc, activity_fc,
+                                geometry_cache=None):
+    """Adds boundary geometry to property activities based on property OID.
+       Each requested boundary is read once into an OID to geometry map, from
+       a GeometryCache if given, and copied to all property activities in
+       one update cursor pass. Returns the number of activities updated, or
+       None if copying failed"""
     try:
-        # Create list of fields needed
-        activity_fields = ['PropertyOID', 'SHAPE@']
-        property_fields = ['ObjectID', 'SHAPE@']
-        for prop in propOIDs:
-            # Select property activities with where clause
-            where_activity = """PropertyOID = {0} AND Category IN 
-            ('Property', 'PropertyE', 'PropertyH', 'PropertyM')""".format(prop)
-            arcpy.MakeFeatureLayer_management(activity_fc, 'temp_act',
-                                              where_activity)
-            print('Property activities selected for {0}'.format(prop))
-            
-            # Begin search cursor, select property boundary with where clause
-            where_property = """ObjectID = {0}""".format(prop)
-            with arcpy.da.SearchCursor(property_fc, property_fields,
-                                        where_property) as sCur:
-                print('Property boundary selected for {0}'.format(prop))
-                
-                # Begin update cursor on selected property activities
-                with arcpy.da.UpdateCursor('temp_act',activity_fields) as uCur:
-                    for sRow in sCur:
-                        for uRow in uCur:
-                            if uRow[0] == sRow[0]:
-                                uRow[1] = sRow[1]
-                                uCur.updateRow(uRow)
-                            else:
-                                print('OIDs do not match!')
-                                print(sRow[0])
-                                print(uRow[0])
-                        print('Geometries copied for {0}'.format(prop))
-        
+        if geometry_cache:
+            boundaries = geometry_cache.fetch(property_fc, propOIDs)
+        else:
+            boundaries = {k: v[0] for k, v in fetchRowsByKey(
+                          property_fc, 'ObjectID', propOIDs,
+                          ['SHAPE@']).items()}
+        missing = set(oid for oid in propOIDs if oid is not None) - \
+            set(boundaries)
+        if missing:
+            print('No property boundary found for {0}'.format(
+                  ', '.join(str(oid) for oid in sorted(missing))))
+        where_activity = """Category IN ('Property', 'PropertyE', 'PropertyH',
+                            'PropertyM')"""
+        count = stampGeometryByKey(activity_fc, 'PropertyOID',
+                                   {oid: oid for oid in boundaries},
+                                   boundaries, where_clause=where_activity)
+        print('Geometries copied for {0} property activitie(s) of {1} '
+              'propertie(s)'.format(count, len(boundaries)))
+
     except Exception as e:
         print(e)
+        return None
+    return count
+
+
+def readWatermarks(watermark_path):
+    """Reads persisted high-water marks of previously synced mobile datasets"""
+    if not os.path.exists(watermark_path):
+        return {}
+    with open(watermark_path, 'r') as marks:
+        return json.load(marks)
+
+
+def replaceJsonFile(json_path, data):
+    """Writes data to a json file, only replacing the existing file once the
+       new one is completely written"""
+    temp_path = json_path + '.tmp'
+    with open(temp_path, 'w') as json_file:
+        json.dump(data, json_file, indent=4)
+    os.replace(temp_path, json_path)
+
+
+def writeWatermarks(watermark_path, watermarks):
+    """Persists high-water marks of synced mobile datasets"""
+    replaceJsonFile(watermark_path, watermarks)
+
+
+def loadJournal(journal_path):
+    """Loads the stage journal left by an unfinished sync run, or starts a new
+       one. The journal records completed stages, the GUIDs each stage
+       affected and any state needed to resume at the failed stage"""
+    if os.path.exists(journal_path):
+        with open(journal_path, 'r') as journal:
+            return json.load(journal)
+    return {'started': getTime(), 'completed': [], 'guids': {}, 'state': {}}
+
+
+def stagePending(journal, stage):
+    """Returns True if a stage has not been completed by a previous run"""
+    return stage not in journal['completed']
+
+
+def completeStage(journal_path, journal, stage, guids=None):
+    """Records a completed stage and the GUIDs it affected in the journal,
+       rows without a GUID are left out"""
+    journal['completed'].append(stage)
+    guids = [g for g in guids or [] if g is not None]
+    if guids:
+        journal['guids'][stage] = sorted(guids)
+    replaceJsonFile(journal_path, journal)
+
+
+def clearJournal(journal_path):
+    """Removes the stage journal once a sync run has fully completed"""
+    if os.path.exists(journal_path):
+        os.remove(journal_path)
+
+
+def watermarkValue(value):
+    """Converts a cursor value to a json friendly watermark, keeping dates to
+       the millisecond so they round trip through SQL Server"""
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+    return value
+
+
+def buildWatermarkClause(dataset, field, low_mark=None, high_mark=None):
+    """Returns a where clause selecting rows after low_mark and up to and
+       including high_mark, or None if neither mark is set"""
+    clauses = []
+    for operator, mark in (('>', low_mark), ('<=', high_mark)):
+        if mark is None:
+            continue
+        mark = watermarkValue(mark)
+        if isinstance(mark, str):
+            mark = "'{0}'".format(mark)
+        clauses.append('{0} {1} {2}'.format(
+                       arcpy.AddFieldDelimiters(dataset, field), operator,
+                       mark))
+    if not clauses:
+        return None
+    return ' AND '.join(clauses)
+
+
+def deleteRowsByOID(dataset, oids, chunk_size=1000):
+    """Deletes only the rows of a mobile dataset with the given ObjectIDs in
+       chunked IN-list deletes, leaving rows a run did not read"""
+    try:
+        oid_field = describeCached(dataset)['OIDFieldName'] or 'OBJECTID'
+        for chunk in chunkList(oids, chunk_size):
+            where = buildInClause(dataset, oid_field, chunk)
+            recordCall('sde', 2)
+            arcpy.MakeTableView_management(dataset, 'synced_rows', where)
+            arcpy.DeleteRows_management('synced_rows')
+    except:
         return False
     return True
 
+
+def countRows(dataset, where_clause=None):
+    """Counts the rows of a dataset matching an optional where clause"""
+    recordCall('sde')
+    count = 0
+    with arcpy.da.SearchCursor(dataset, ['OID@'], where_clause) as sCur:
+        for row in sCur:
+            count += 1
+    return count
+
+
+class DatasetInfo(object):
+    """Pre-flight metadata of a dataset: whether it exists, its GlobalID
+       flag, its [name, type] field pairs and, if counted, its row count"""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.exists = False
+        self.hasGlobalID = False
+        self.fields = []
+        self.count = None
+        self.error = None
+
+
+def _inspectDataset(dataset, path, count_rows):
+    """Fills a DatasetInfo for one dataset, read through its fully
+       qualified path, see preflightDatasets"""
+    info = DatasetInfo(dataset)
+    try:
+        recordCall('sde')
+        info.exists = arcpy.Exists(path)
+        if info.exists:
+            info.hasGlobalID = bool(describeCached(path)['hasGlobalID'])
+            info.fields = listFieldsCached(path)
+            if count_rows:
+                recordCall('sde')
+                info.count = int(arcpy.GetCount_management(path)[0])
+    except Exception as e:
+        info.exists = False
+        info.error = str(e)
+    return info
+
+
+def preflightDatasets(datasets, workspace=None, count_datasets=()):
+    """Checks that datasets exist and reads their GlobalID flag and fields,
+       counting rows of those in count_datasets with GetCount. Datasets are
+       checked one after another since arcpy is not thread safe, through
+       paths qualified by workspace or arcpy.env.workspace. Describe and
+       field results go through the schema cache so later stages do not
+       query them again. Returns a dict of DatasetInfo keyed by dataset, in
+       the order given"""
+    datasets = list(dict.fromkeys(datasets))
+    if not datasets:
+        return {}
+    workspace = workspace or arcpy.env.workspace
+    paths = {ds: ds if os.path.isabs(ds) or not workspace else
+             os.path.join(workspace, ds) for ds in datasets}
+    count_datasets = set(count_datasets)
+    return {ds: _inspectDataset(ds, paths[ds], ds in count_datasets)
+            for ds in datasets}
+
+
+def chunkList(values, chunk_size):
+    """Yields successive chunks of a list for use in IN-list where clauses"""
+    values = list(values)
+    for i in range(0, len(values), chunk_size):
+        yield values[i:i + chunk_size]
+
+
+def buildInClause(dataset, field, values):
+    """Returns a where clause selecting rows with field values in a list,
+       quoting string values such as GUIDs"""
+    literals = []
+    for value in values:
+        if isinstance(value, str):
+            literals.append("'{0}'".format(value.replace("'", "''")))
+        else:
+            literals.append(str(int(value)))
+    return """{0} IN ({1})""".format(arcpy.AddFieldDelimiters(dataset, field),
+                                     ', '.join(literals))
+
+
+def fetchRowsByKey(dataset, key_field, keys, value_fields, chunk_size=1000):
+    """Reads only the rows matching a set of keys in chunked IN-list queries
+       and returns a dictionary of key to tuple of value_fields"""
+    index = {}
+    keys = [k for k in set(keys) if k is not None]
+    fields = [key_field] + list(value_fields)
+    for chunk in chunkList(keys, chunk_size):
+        where = buildInClause(dataset, key_field, chunk)
+        recordCall('sde')
+        with arcpy.da.SearchCursor(dataset, fields, where) as sCur:
+            for row in sCur:
+                index[row[0]] = tuple(row[1:])
+    return index
+
+
+def fetchOIDsByGUID(dataset, guid_field, guids, chunk_size=1000):
+    """Resolves a list of GUIDs to (OID, GlobalID) of the matching rows in a
+       dataset using chunked IN-list queries"""
+    return fetchRowsByKey(dataset, guid_field, guids, ['OID@', 'GlobalID'],
+                          chunk_size)
+
+
+class GeometryCache(object):
+    """Local store of boundary geometries as WKB, or as Esri JSON if they
+       have true curves, keyed by dataset and ObjectID plus a change token
+       read from token_fields. Blobs are appended to <cache_path>.dat and
+       read back through a memory map, the offsets and tokens are kept in
+       <cache_path>.json. Only geometries missing from the cache or whose
+       token changed are read from SDE. A dataset with no token field that
+       changes on edit, i.e. none besides GlobalID, is never cached"""
+
+    def __init__(self, cache_path, token_fields=None):
+        self.data_path = cache_path + '.dat'
+        self.index_path = cache_path + '.json'
+        self.token_fields = token_fields or ['GlobalID', 'last_edited_date',
+                                             'Shape.STArea()',
+                                             'Shape.STLength()']
+        self.index = {}
+        self._map = None
+        self._spatial_refs = {}
+        if os.path.exists(self.index_path) and \
+                os.path.exists(self.data_path):
+            with open(self.index_path, 'r') as index_file:
+                self.index = json.load(index_file)
+        if not os.path.exists(self.data_path):
+            open(self.data_path, 'wb').close()
+            self.index = {}
+
+    def _tokenFields(self, dataset):
+        names = set(name.lower() for name, field_type in
+                    listFieldsCached(dataset))
+        return [f for f in self.token_fields if f.lower() in names]
+
+    def cacheable(self, dataset):
+        """Returns True if the token of a dataset changes when a geometry
+           is edited. GlobalID alone never does"""
+        return any(f.lower() != 'globalid' for f in
+                   self._tokenFields(dataset))
+
+    def _readTokens(self, dataset, oids):
+        """Reads the change token of each ObjectID without its geometry"""
+        token_fields = self._tokenFields(dataset)
+        return {oid: [str(watermarkValue(v)) for v in values]
+                for oid, values in fetchRowsByKey(dataset, 'ObjectID', oids,
+                                                  token_fields).items()}
+
+    def _spatialReference(self, dataset):
+        if dataset not in self._spatial_refs:
+            recordCall('sde')
+            self._spatial_refs[dataset] = \
+                arcpy.Describe(dataset).spatialReference
+        return self._spatial_refs[dataset]
+
+    def _read(self, offset, length):
+        if self._map is None:
+            with open(self.data_path, 'rb') as data_file:
+                self._map = mmap.mmap(data_file.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+        return self._map[offset:offset + length]
+
+    def _append(self, dataset, rows):
+        """Appends geometries to the data file and their entries to the
+           index, then writes the index"""
+        entries = self.index.setdefault(_schemaKey(dataset), {})
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        with open(self.data_path, 'ab') as data_file:
+            offset = data_file.tell()
+            for oid, token, geometry in rows:
+                # WKB densifies true curves, keep those as Esri JSON
+                if getattr(geometry, 'hasCurves', False):
+                    blob, blob_format = geometry.JSON.encode('utf-8'), 'json'
+                else:
+                    blob, blob_format = bytes(geometry.WKB), 'wkb'
+                data_file.write(blob)
+                entries[str(oid)] = [offset, len(blob), token, blob_format]
+                offset += len(blob)
+        replaceJsonFile(self.index_path, self.index)
+
+    def _geometry(self, dataset, entry):
+        blob = self._read(entry[0], entry[1])
+        if entry[3:] == ['json']:
+            return arcpy.AsShape(blob.decode('utf-8'), True)
+        return arcpy.FromWKB(blob, self._spatialReference(dataset))
+
+    def fetch(self, dataset, oids):
+        """Returns a dictionary of ObjectID to geometry for the requested
+           ObjectIDs, reading only new or changed geometries from SDE"""
+        oids = [oid for oid in set(oids) if oid is not None]
+        if not self.cacheable(dataset):
+            return {oid: values[0] for oid, values in fetchRowsByKey(
+                    dataset, 'ObjectID', oids, ['SHAPE@']).items()
+                    if values[0] is not None}
+        entries = self.index.get(_schemaKey(dataset), {})
+        tokens = self._readTokens(dataset, oids)
+        geometries = {}
+        stale = []
+        for oid, token in tokens.items():
+            entry = entries.get(str(oid))
+            if entry and entry[2] == token and entry[1]:
+                geometries[oid] = self._geometry(dataset, entry)
+            else:
+                stale.append(oid)
+        if stale:
+            rows = []
+            for oid, values in fetchRowsByKey(dataset, 'ObjectID', stale,
+                                              ['SHAPE@']).items():
+                if values[0] is not None:
+                    geometries[oid] = values[0]
+                    rows.append([oid, tokens[oid], values[0]])
+            self._append(dataset, rows)
+        return geometries
+
+    def rebuild(self, datasets):
+        """Rewrites the cache from every geometry of the given datasets,
+           dropping stale blobs"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self.index = {}
+        open(self.data_path, 'wb').close()
+        count = 0
+        for dataset in datasets:
+            if not self.cacheable(dataset):
+                continue
+            token_fields = self._tokenFields(dataset)
+            rows = []
+            recordCall('sde')
+            with arcpy.da.SearchCursor(dataset, ['OID@', 'SHAPE@'] +
+                                       token_fields) as sCur:
+                for row in sCur:
+                    if row[1] is not None:
+                        rows.append([row[0], [str(watermarkValue(v))
+                                              for v in row[2:]], row[1]])
+            self._append(dataset, rows)
+            count += len(rows)
+        return count
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+def stampGeometryByKey(dataset, key_field, key_to_oid, geometries,
+                       oid_field=None, where_clause=None):
+    """Copies cached geometries onto rows of a dataset in one update cursor
+       pass. Each row's key_field value is looked up in key_to_oid and the
+       geometry for that OID is assigned, optionally stamping the OID into
+       oid_field. Returns the number of rows updated"""
+    fields = [key_field, 'SHAPE@']
+    if oid_field:
+        fields.append(oid_field)
+    count = 0
+    recordCall('sde')
+    with arcpy.da.UpdateCursor(dataset, fields, where_clause) as uCur:
+        for row in uCur:
+            oid = key_to_oid.get(row[0])
+            if oid not in geometries:
+                continue
+            row[1] = geometries[oid]
+            if oid_field:
+                row[2] = oid
+            uCur.updateRow(row)
+            count += 1
+    return count
+
+
+def updateRowsByKey(dataset, key_field, value_fields, key_to_values,
+                    where_clause=None):
+    """Sets value_fields on every row whose key_field value is in
+       key_to_values in a single update cursor pass, only writing rows whose
+       values actually change. Returns the number of rows touched"""
+    fields = [key_field] + list(value_fields)
+    count = 0
+    recordCall('sde')
+    with arcpy.da.UpdateCursor(dataset, fields, where_clause) as uCur:
+        for row in uCur:
+            values = key_to_values.get(row[0])
+            if values is None or tuple(row[1:]) == tuple(values):
+                continue
+            uCur.updateRow([row[0]] + list(values))
+            count += 1
+    return count
+
+
+def updateRowsInKeyList(dataset, key_field, value_fields, key_to_values,
+                        chunk_size=1000, where_clause=None):
+    """Same as updateRowsByKey, but narrows the update cursor to only the
+       rows whose key is in key_to_values using chunked IN-list queries,
+       optionally further limited by where_clause. Returns the number of
+       rows touched"""
+    count = 0
+    for chunk in chunkList(key_to_values.keys(), chunk_size):
+        where = buildInClause(dataset, key_field, chunk)
+        if where_clause:
+            where = '({0}) AND ({1})'.format(where, where_clause)
+        count += updateRowsByKey(dataset, key_field, value_fields,
+                                 key_to_values, where)
+    return count
+
+
+def rowsPerSecond(row_count, start_time):
+    """Returns throughput for a number of rows processed since start_time"""
+    elapsed = time.time() - start_time
+    if elapsed <= 0:
+        return float(row_count)
+    return row_count / elapsed
+
 # -----------------------------------------------------------------------------
 if __name__ == '__main__':
     pass
\ No newline at end of file
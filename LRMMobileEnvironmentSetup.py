@@ -40,11 +40,15 @@ if proceed.lower() == 'no':
 else:
     print('...Proceeding with environment setup!')
 
-# Set paths to config and needed directories
-config_path = 'F:\\LRMMobileSolution\\Scripts\\config.json'
-domains_dir = 'F:\\LRMMobileSolution\\Domains'
-working_dir = 'F:\\LRMMobileSolution\\Working'
-log_dir = 'F:\\LRMMobileSolution\\Scripts\\Logs'
+# Set paths to config and needed directories, each can be overridden
+# with a GWR_* environment variable for offline runs
+config_path = os.environ.get('GWR_CONFIG',
+                             'F:\\LRMMobileSolution\\Scripts\\config.json')
+domains_dir = os.environ.get('GWR_DOMAINS_DIR',
+                             'F:\\LRMMobileSolution\\Domains')
+working_dir = os.environ.get('GWR_WORKING_DIR',
+                             'F:\\LRMMobileSolution\\Working')
+log_dir = os.environ.get('GWR_LOG_DIR', 'F:\\LRMMobileSolution\\Scripts\\Logs')
 
 # Create new log file
 log_name = 'LRMMobileEnvironmentSetup_LOG_' + GWRutils.getTime() + '.txt'
@@ -52,6 +56,15 @@ log = os.path.join(log_dir, log_name)
 log_file = open(log, 'w+')
 log_file.close()
 print('...New log file created')
+GWRutils.startMetrics('LRMMobileEnvironmentSetup', os.path.join(
+                      log_dir, 'LRMMobileEnvironmentSetup_METRICS_' +
+                      GWRutils.getTime() + '.json'))
+
+# Profile each stage with cProfile and tracemalloc if GWR_PROFILE is set or
+# the script was run with --profile
+if GWRutils.profilingRequested():
+    GWRutils.enableProfiling(log_dir, 'LRMMobileEnvironmentSetup_PROFILE_' +
+                             GWRutils.getTime())
 
 # Validate config file
 is_valid = GWRutils.validateConfig(config_path)
@@ -70,6 +83,7 @@ sql_procs = GWRutils.configReader(config_path, 'sql_procs')
 datasets = GWRutils.configReader(config_path, 'datasets')
 properties = GWRutils.configReader(config_path, 'properties')
 mobile_datasets = GWRutils.configReader(config_path, 'mobile_datasets')
+sync_options = GWRutils.configReader(config_path, 'sync_options') or {}
 
 if not sde_connection:
     print('No sde connection file! Exiting...')
@@ -99,6 +113,12 @@ if not mobile_datasets:
     print('No mobile dataset values! Exiting...')
     GWRutils.logMessage(log, 'No mobile dataset values! Exiting...')
     sys.exit()
+
+# Set up buffered logging, optionally level-gated or written as json lines
+log_config = GWRutils.configReader(config_path, 'logging')
+if log_config:
+    GWRutils.configureLogger(log, log_config.get('level', 'INFO'),
+                             log_config.get('json_lines', False))
 GWRutils.logMessage(log, '...All configurations loaded')
 
 # Set workspace and disconnect users
@@ -106,18 +126,31 @@ arcpy.env.workspace = sde_connection
 arcpy.env.overwriteOutput = True
 arcpy.DisconnectUser(sde_connection, 'ALL')
 
-# Ensure all feature classes and tables are valid
+# Point at the schema cache MobileSyncLRM persists so it is rewritten at exit
+# and the next sync reads the new field lists, but drop what it holds so
+# every dataset is described live while the schema is rebuilt
+GWRutils.setSchemaCache(sync_options.get('schema_cache_path'),
+                        sync_options.get('schema_version'))
+GWRutils.resetSchemaCache()
+
+# Ensure all feature classes and tables are valid.
+# Their GlobalID flags are kept for adding GlobalIDs below
+dataset_info = GWRutils.preflightDatasets(datasets.values(),
+                                          sde_connection)
 for ds in datasets:
-    if not arcpy.Exists(datasets[ds]):
+    if not dataset_info[datasets[ds]].exists:
         print('Could not find: {0}! Exiting...'.format(datasets[ds]))
         GWRutils.logMessage(log, 'Could not find: {0}! Exiting...'.format(
                                   datasets[ds]))
+        if dataset_info[datasets[ds]].error:
+            GWRutils.logMessage(log, dataset_info[datasets[ds]].error)
         sys.exit()
     else:
         print('...Found dataset: {0}'.format(datasets[ds]))
         GWRutils.logMessage(log, '...Found dataset: {0}'.format(datasets[ds]))
 
 # Connect to Portal and stop all services
+GWRutils.startStage('stop_services')
 try:
     portal_cnxn = GWRutils.connectToPortal(portal_info)
     print('...Signed into Portal as ' + portal_cnxn.properties.user.username)
@@ -136,6 +169,7 @@ else:
     print('Failed to stop all services! Exiting...')
     GWRutils.logMessage(log, 'Failed to stop all services! Exiting...')
     sys.exit()
+GWRutils.endStage('stop_services')
 
 # Set variables for datasets from config needed for domain assignment and
 # relationship class creation
@@ -151,13 +185,14 @@ activity_mobile = datasets['activity_mobile']
 chem_app_mobile = datasets['chem_app_mobile']
 
 # Add GlobalIDs to all datasets
+GWRutils.startStage('schema')
 try:
     for ds in datasets:
-        desc = arcpy.Describe(datasets[ds])
-        if desc.hasGlobalID:
+        if dataset_info[datasets[ds]].hasGlobalID:
             pass
         else:
             arcpy.AddGlobalIDs_management(datasets[ds])
+            dataset_info[datasets[ds]].hasGlobalID = True
     print('...GlobalIDs added to all datasets')
     GWRutils.logMessage(log, '...GlobalIDs added to all datasets')
     
@@ -202,6 +237,8 @@ except Exception as e:
                         'Chemical datasets! Exiting...')
     GWRutils.logMessage(log, str(e))
     sys.exit()
+GWRutils.resetSchemaCache()
+GWRutils.endStage('schema', len(datasets), len(datasets))
 
 # Set fields needing domains
 field_act_status = 'Status'
@@ -242,6 +279,7 @@ props_dict = {k.split(' - ')[0]:k.split(' - ')[1] for k in properties.keys()}
 universal_domains = [domain_act_status, domain_act_plant_pattern, 
                       domain_act_plant_stock, domain_harv_status,
                       domain_s_point, domain_s_line, domain_s_poly]
+GWRutils.startStage('universal_domains')
 try:
     for domain in universal_domains:
         domain_path = os.path.join(domains_dir, domain + '.csv')
@@ -319,9 +357,13 @@ except Exception as e:
     GWRutils.logMessage(log, str(e))
     sys.exit()
 
+GWRutils.endStage('universal_domains', len(universal_domains),
+                  len(universal_domains))
+
 # Create and assign property specific domains
 # Need to check for empty CSV domains because TableToDomain treats them as text
 # and throws error when assigned to integer field
+GWRutils.startStage('property_domains')
 for prop in props_dict:
     try:
         with GWRutils.connectToDB(cnxn_info) as cnxn:
@@ -497,8 +539,11 @@ for prop in props_dict:
                             '{0}! Exiting...'.format(prop))
         GWRutils.logMessage(log, str(e))
         sys.exit()
+    GWRutils.recordRows('property_domains', 1, 1)
+GWRutils.endStage('property_domains')
 
 # Create needed relationship classes
+GWRutils.startStage('relationship_classes')
 rel_classes = ['Property_PropAct', 'Activity_Chemical_Existing',
                 'Activity_Chemical_New', 'HVunit_OPTproduct']
 
@@ -625,8 +670,10 @@ except Exception as e:
                         'GlobalIDs! Exiting...')
     GWRutils.logMessage(log, str(e))
     sys.exit()
+GWRutils.endStage('relationship_classes', len(rel_classes), len(rel_classes))
 
 # Clean up working directory
+GWRutils.startStage('cleanup')
 try:
     GWRutils.cleanWorkingDir(working_dir)
     print('...Cleaned working directory')
@@ -636,9 +683,13 @@ except Exception as e:
     print(e)
     GWRutils.logMessage(log, 'Failed to clean working directory!')   
     GWRutils.logMessage(log, str(e))     
+GWRutils.endStage('cleanup')
 
 # Start all services
+GWRutils.startStage('start_services')
 start_services = GWRutils.startOrStopServices(portal_cnxn, 'START')
+GWRutils.endStage('start_services', status='completed' if start_services
+                  else 'failed')
 if start_services:
     print('...Started all services')
     GWRutils.logMessage(log, '...Started all services')
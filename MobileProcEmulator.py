@@ -0,0 +1,474 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:        MobileProcEmulator.py
+#
+# Purpose:     Local emulator of the MOBILE_* stored procedures in
+#              Create_LRMMobileSolution_Procedures.sql over a SQLite fixture
+#              of the LRM VT tables, returning the same result shapes. Used by
+#              GWRutils.connectToDB when cnxn_info has an "emulator" key so the
+#              domain and itemsets pipelines can run offline.
+#
+# Usage Notes: Build a synthetic fixture with:
+#                python MobileProcEmulator.py fixture.sqlite --properties 5000
+#              then point cnxn_info at it in config.json:
+#                  "cnxn_info": {"emulator": "C:\\path\\fixture.sqlite",
+#                                "emulator_noop_procs": ["LRM_StandOverlay"]}
+#              Procedures not defined in the SQL file, like the LRM stand
+#              overlay, are run as no-ops if listed in emulator_noop_procs.
+#
+# Author:      Dylan Harwell - Resource Data Inc
+#
+# Created:     10/18/2026
+# -----------------------------------------------------------------------------
+
+import argparse
+import os
+import random
+import re
+import sqlite3
+from urllib.request import pathname2url
+
+
+class Error(Exception):
+    pass
+
+
+class ProgrammingError(Error):
+    pass
+
+
+# Placeholder row the domain procedures return for an empty domain
+_placeholder = ('1', 'NA')
+
+# T-SQL strips the concatenated inventory location from chemical names
+_chem_name = """case when instr(description, '--') > 0
+                then substr(description, 1, instr(description, '--') - 1)
+                else description end"""
+
+_special_type = """select distinct
+                   cast(TYPE as text) || coalesce(' - ' || SUBTYPE, '')
+                   as code,
+                   TYPE_DESC || coalesce(' - ' || SubType_DESC, '')
+                   as description
+                   from {0}"""
+
+_itemsets_row = """select distinct {0} as list_name, cast({1} as text) as name,
+                   cast({2} as text) as label, {3} as p_category,
+                   {4} as p_type, {5} as s_category, {6} as s_type,
+                   {7} as prop_or_stand, {8} as s_subtype, {9} as inv_loc,
+                   {10} as REG_Species"""
+
+_property_res = """from V_TFM_VT_OP_Property_TYPE_SUBTYPE_RES
+                   where PROPERTYOID = :propertyOID and activeflag = 1
+                   and Category in (select distinct category
+                   from V_TFM_VT_OP_Property_Category_1300
+                   where PROPERTYOID = :propertyOID and activeflag = 1)"""
+
+_stand_res = """from V_TFM_VT_OP_Stand_1400
+                where PROPERTYOID = :propertyOID and activeflag = 1"""
+
+_species_res = """from V_TFM_VT_Species_RES
+                  where PropertyOID = :propertyOID and activeflag = 1"""
+
+_itemsets = ' union '.join([
+    _itemsets_row.format("'p_category'", 'Category', 'Category_desc', 'null',
+                         'null', 'null', 'null', "'prop'", 'null', 'null',
+                         'null') + ' ' + _property_res,
+    _itemsets_row.format("'p_type'", 'type', 'type_desc',
+                         'cast(Category as text)', 'null', 'null', 'null',
+                         'null', 'null', 'null', 'null') + ' ' + _property_res,
+    _itemsets_row.format("'p_subtype'", 'subtype', 'subType_desc', 'null',
+                         'cast(type as text)', 'null', 'null', 'null', 'null',
+                         'null', 'null') + ' ' + _property_res,
+    _itemsets_row.format("'s_category'", 'Category', 'Category_desc', 'null',
+                         'null', 'null', 'null', "'stand'", 'null', 'null',
+                         'null') + ' ' + _stand_res,
+    _itemsets_row.format("'s_type'", 'type', 'type_desc', 'null', 'null',
+                         'cast(Category as text)', 'null', 'null', 'null',
+                         'null', 'null') + ' ' + _stand_res,
+    _itemsets_row.format("'s_subtype'", 'subtype', 'subType_desc', 'null',
+                         'null', 'null', 'cast(type as text)', 'null', 'null',
+                         'null', 'null') + ' ' + _stand_res,
+    _itemsets_row.format("'inv_loc'", 'vm.Inventory_Location',
+                         'vm.Inventory_Location', 'null', 'null', 'null',
+                         'null', 'null', 'cast(s.subtype as text)', 'null',
+                         'null') + """
+        from TFM_VT_OP_ACT_TYPE s
+        inner join v_tfm_vt_act_Chem_MasterOID vm
+        on vm.PropertyOID = s.PROPERTYOID
+        inner join TFM_ACT_Chemical_Master m on s.PROPERTYOID = m.PropertyOID
+        where vm.PropertyOID = :propertyOID and vm.ACTIVEFLAG = 1
+        and s.ACTIVEFLAG = 1 and IS_CHEMICAL_IND = 1
+        and m.GTFF_Approved_IND = 'Y'""",
+    _itemsets_row.format("'chem_masterOID'", 'CODE',
+                         _chem_name.replace('description',
+                                            'vm.description'),
+                         'null', 'null', 'null', 'null', 'null', 'null',
+                         'vm.Inventory_Location', 'null') + """
+        from v_tfm_vt_act_Chem_MasterOID vm
+        inner join TFM_ACT_Chemical_Master m on vm.CODE = m.ObjectID
+        where vm.PropertyOID = :propertyOID and vm.activeflag = 1
+        and m.GTFF_Approved_IND = 'Y'""",
+    _itemsets_row.format("'REG_Species'", 'SPECIES_CODE', 'SPECIES_DESC',
+                         'null', 'null', 'null', 'null', "'stand'", 'null',
+                         'null', 'null') + ' ' + _species_res,
+    _itemsets_row.format("'REG_Variety'", 'Variety_Code', 'Variety_DESC',
+                         'null', 'null', 'null', 'null', 'null', 'null',
+                         'null', 'cast(SPECIES_CODE as text)') + ' ' +
+    _species_res]) + ' order by list_name'
+
+# Procedure name (lower case) to its parameters, result set queries and
+# whether an empty single result set is replaced by the NA placeholder
+PROCEDURES = {
+    'mobile_get_chemicaloids_propertyoid': (['propertyOID'], ["""
+        select distinct cast(CODE as text) as code, {0} as description
+        from v_tfm_vt_act_Chem_MasterOID vm
+        inner join TFM_ACT_Chemical_Master m on vm.CODE = m.ObjectID
+        where vm.PropertyOID = :propertyOID and vm.activeflag = 1
+        and m.GTFF_Approved_IND = 'Y'""".format(
+            _chem_name.replace('description', 'vm.description'))], True),
+    'mobile_get_compartmentoids_propertyoid': (['propertyOID'], ["""
+        select cast(CompartmentOID as text) as code, description
+        from v_tfm_vt_cmn_Compartment_Name
+        where PropertyOID = :propertyOID and activeflag = 1"""], True),
+    'mobile_get_contractoroids_propertyoid': (['propertyOID'], ["""
+        select distinct cast(Contractor_OID as text) as code,
+        DESCRIPTION as description from V_TFM_VT_ACT_Contractor_Rest
+        where PROPERTYOID = :propertyOID and activeflag = 1"""], True),
+    'mobile_get_hardcodedlists_propertyoid': (['propertyOID'], ["""
+        select 'compartment' as list_name, CompartmentOID,
+        description as Compartment from v_tfm_vt_cmn_Compartment_Name
+        where PropertyOID = :propertyOID and activeflag = 1""", """
+        select distinct 'supervisor' as list_name, CODE,
+        DESCRIPTION as Supervisor from TFM_VT_CMN_Supervisor
+        where PROPERTYOID = :propertyOID and ACTIVEFLAG = 1""", """
+        select distinct 'contractor' as list_name, Contractor_OID,
+        DESCRIPTION as Contractor from V_TFM_VT_ACT_Contractor_Rest
+        where PROPERTYOID = :propertyOID and activeflag = 1"""], False),
+    'mobile_get_plantingspecies_propertyoid': (['propertyOID'], ["""
+        select distinct cast(SPECIES_CODE as text) as code,
+        SPECIES_DESC as description from V_TFM_VT_Species_RES
+        where PropertyOID = :propertyOID and activeflag = 1"""], True),
+    'mobile_get_supervisoroids_propertyoid': (['propertyOID'], ["""
+        select distinct cast(CODE as text) as code,
+        DESCRIPTION as description from TFM_VT_CMN_Supervisor
+        where PROPERTYOID = :propertyOID and ACTIVEFLAG = 1"""], True),
+    'mobile_get_universaldomains': ([], [
+        """select distinct CODE as code, DESCRIPTION as description
+           from V_TFM_VT_ACT_Status_Rest""",
+        """select distinct CODE as code, DESCRIPTION as description
+           from TFM_VT_HV_HarvStatus""",
+        """select distinct CODE as code, DESCRIPTION as description
+           from TFM_VT_CMN_Pattern""",
+        """select distinct CODE as code, DESCRIPTION as description
+           from V_TFM_VT_CMN_Plant_Stock_Rest""",
+        _special_type.format('TFM_VT_CMN_SpecPoint_Type'),
+        _special_type.format('TFM_VT_CMN_SpecLine_Type'),
+        _special_type.format('TFM_VT_CMN_SpecPoly_Type')], False),
+    'mobile_update_chemdefaults_propertyoid': (['propertyOID'], ["""
+        select Default_Cost_per_unit as cost, DefaultRate as rate,
+        printf('%.1f', m.ObjectID) as chem_masterOID
+        from TFM_ACT_Chemical_Master m
+        inner join v_tfm_vt_act_Chem_MasterOID vm on m.ObjectID = vm.CODE
+        where m.PropertyOID = :propertyOID and vm.activeflag = 1
+        and m.GTFF_Approved_IND = 'Y'"""], False),
+    'mobile_update_itemsets_propertyoid': (['propertyOID'], [_itemsets],
+                                           False)}
+
+_exec = re.compile(r'^\s*EXEC(?:UTE)?\s+([\w.\[\]]+)\s*(.*?)\s*;?\s*$',
+                   re.IGNORECASE | re.DOTALL)
+_ping = re.compile(r'^\s*SELECT\s+1\s*;?\s*$', re.IGNORECASE)
+_param = re.compile(r"@(\w+)\s*=\s*(\?|N?'(?:[^']|'')*'|[-\w.]+)")
+
+
+def _procName(name):
+    return name.replace('[', '').replace(']', '').split('.')[-1].lower()
+
+
+def _parseExec(sql, params):
+    """Splits an EXEC statement into a procedure name and a dict of named
+       parameter values, filling ? markers from params in order"""
+    match = _exec.match(sql)
+    if not match:
+        raise ProgrammingError('Only EXEC statements are emulated: ' + sql)
+    values = {}
+    positional = list(params)
+    for name, value in _param.findall(match.group(2)):
+        if value == '?':
+            value = positional.pop(0)
+        elif value.upper().startswith("N'") or value.startswith("'"):
+            value = value[value.index("'") + 1:-1].replace("''", "'")
+        elif re.match(r'^-?\d+$', value):
+            value = int(value)
+        values[name.lower()] = value
+    return _procName(match.group(1)), values
+
+
+class Cursor(object):
+    """pyodbc style cursor that runs emulated procedures"""
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rowcount = -1
+        self._results = []
+        self._rows = []
+
+    def execute(self, sql, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = params[0]
+        if _ping.match(sql):
+            self._results = [([('', int, None, None, None, None, True)],
+                              [(1,)])]
+            self._nextResult()
+            return self
+        name, values = _parseExec(sql, params)
+        self._results = self.connection.runProcedure(name, values)
+        self._nextResult()
+        return self
+
+    def _nextResult(self):
+        if self._results:
+            self.description, self._rows = self._results.pop(0)
+        else:
+            self.description, self._rows = None, []
+        self.rowcount = len(self._rows)
+
+    def nextset(self):
+        if not self._results:
+            return False
+        self._nextResult()
+        return True
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchval(self):
+        row = self.fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        self._results = []
+        self._rows = []
+
+
+class Connection(object):
+    """pyodbc style connection to a SQLite fixture of the LRM VT tables"""
+    def __init__(self, fixture_path, noop_procs=None):
+        self.fixture_path = fixture_path
+        self.noop_procs = set(_procName(p) for p in noop_procs or [])
+        self.autocommit = False
+        uri = 'file:{0}?mode=ro'.format(pathname2url(
+              os.path.abspath(fixture_path)))
+        self._db = sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def runProcedure(self, name, values):
+        """Returns the result sets of an emulated procedure as a list of
+           (description, rows) tuples"""
+        if name == 'mobile_standoverlay_oidlist':
+            failed = []
+            for oid in str(values.get('objectids', '')).split(','):
+                if not oid.strip():
+                    continue
+                try:
+                    self.runProcedure('lrm_standoverlay',
+                                      {'objectid': int(oid)})
+                except Error as e:
+                    failed.append((int(oid), str(e)))
+            return [([('FailedOBJECTID', int, None, None, None, None, True),
+                      ('ErrorMessage', str, None, None, None, None, True)],
+                     failed)]
+        if name in self.noop_procs:
+            return []
+        if name not in PROCEDURES:
+            raise ProgrammingError('Could not find stored procedure '
+                                   '{0}'.format(name))
+        param_names, statements, placeholder = PROCEDURES[name]
+        args = {}
+        for param in param_names:
+            if param.lower() not in values:
+                raise ProgrammingError('Procedure {0} expects parameter @{1}'
+                                       .format(name, param))
+            args[param] = values[param.lower()]
+        results = []
+        for statement in statements:
+            cursor = self._db.execute(statement, args)
+            description = [(c[0], str, None, None, None, None, True)
+                           for c in cursor.description]
+            rows = [tuple(row) for row in cursor.fetchall()]
+            if placeholder and not rows:
+                rows = [_placeholder]
+            results.append((description, rows))
+        return results
+
+    def cursor(self):
+        return Cursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.commit()
+
+
+def connect(fixture_path, noop_procs=None):
+    """Opens a read-only emulator connection to a SQLite fixture"""
+    return Connection(fixture_path, noop_procs)
+
+
+# ------------------------------ Fixture builder -----------------------------#
+_fixture_tables = {
+    'TFM_ACT_Chemical_Master': 'ObjectID integer primary key, PropertyOID '
+        'integer, GTFF_Approved_IND text, Default_Cost_per_unit real, '
+        'DefaultRate real',
+    'v_tfm_vt_act_Chem_MasterOID': 'CODE integer, description text, '
+        'PropertyOID integer, activeflag integer, Inventory_Location text',
+    'v_tfm_vt_cmn_Compartment_Name': 'CompartmentOID integer, description '
+        'text, PropertyOID integer, activeflag integer',
+    'V_TFM_VT_ACT_Contractor_Rest': 'Contractor_OID integer, DESCRIPTION '
+        'text, PROPERTYOID integer, activeflag integer',
+    'TFM_VT_CMN_Supervisor': 'CODE integer, DESCRIPTION text, PROPERTYOID '
+        'integer, ACTIVEFLAG integer',
+    'V_TFM_VT_Species_RES': 'SPECIES_CODE text, SPECIES_DESC text, '
+        'Variety_Code text, Variety_DESC text, PropertyOID integer, '
+        'activeflag integer',
+    'V_TFM_VT_OP_Property_TYPE_SUBTYPE_RES': 'PROPERTYOID integer, Category '
+        'integer, Category_desc text, type integer, type_desc text, subtype '
+        'integer, subType_desc text, activeflag integer',
+    'V_TFM_VT_OP_Property_Category_1300': 'PROPERTYOID integer, category '
+        'integer, activeflag integer',
+    'V_TFM_VT_OP_Stand_1400': 'PROPERTYOID integer, Category integer, '
+        'Category_desc text, type integer, type_desc text, subtype integer, '
+        'subType_desc text, activeflag integer',
+    'TFM_VT_OP_ACT_TYPE': 'PROPERTYOID integer, subtype integer, ACTIVEFLAG '
+        'integer, IS_CHEMICAL_IND integer',
+    'V_TFM_VT_ACT_Status_Rest': 'CODE text, DESCRIPTION text',
+    'TFM_VT_HV_HarvStatus': 'CODE text, DESCRIPTION text',
+    'TFM_VT_CMN_Pattern': 'CODE text, DESCRIPTION text',
+    'V_TFM_VT_CMN_Plant_Stock_Rest': 'CODE text, DESCRIPTION text',
+    'TFM_VT_CMN_SpecPoint_Type': 'TYPE text, SUBTYPE text, TYPE_DESC text, '
+        'SubType_DESC text',
+    'TFM_VT_CMN_SpecLine_Type': 'TYPE text, SUBTYPE text, TYPE_DESC text, '
+        'SubType_DESC text',
+    'TFM_VT_CMN_SpecPoly_Type': 'TYPE text, SUBTYPE text, TYPE_DESC text, '
+        'SubType_DESC text'}
+
+
+def _insert(db, table, rows):
+    if rows:
+        db.executemany('insert into {0} values ({1})'.format(
+                       table, ', '.join('?' * len(rows[0]))), rows)
+
+
+def buildFixture(fixture_path, propertyOIDs, seed=1, empty_every=25):
+    """Creates a SQLite fixture of the VT tables read by the MOBILE_*
+       procedures with synthetic domains for each property OID. Every
+       empty_every-th property gets no domain rows, so the NA placeholders
+       are exercised"""
+    rnd = random.Random(seed)
+    db = sqlite3.connect(fixture_path)
+    for table, columns in _fixture_tables.items():
+        db.execute('drop table if exists {0}'.format(table))
+        db.execute('create table {0} ({1})'.format(table, columns))
+
+    for table in ('V_TFM_VT_ACT_Status_Rest', 'TFM_VT_HV_HarvStatus',
+                  'TFM_VT_CMN_Pattern', 'V_TFM_VT_CMN_Plant_Stock_Rest'):
+        _insert(db, table, [(str(i), '{0} {1}'.format(table, i))
+                            for i in range(1, 11)])
+    for table in ('TFM_VT_CMN_SpecPoint_Type', 'TFM_VT_CMN_SpecLine_Type',
+                  'TFM_VT_CMN_SpecPoly_Type'):
+        _insert(db, table, [(str(t), str(s) if s else None,
+                             'Type {0}'.format(t),
+                             'Subtype {0}'.format(s) if s else None)
+                            for t in range(1, 6) for s in range(0, 4)])
+
+    chemOID = 0
+    for n, oid in enumerate(propertyOIDs):
+        if empty_every and n % empty_every == empty_every - 1:
+            continue
+        chems, masters = [], []
+        for i in range(30):
+            chemOID += 1
+            location = 'Location {0}'.format(rnd.randint(1, 4))
+            masters.append((chemOID, oid, 'Y' if rnd.random() < 0.9 else 'N',
+                            round(rnd.uniform(1, 90), 2),
+                            round(rnd.uniform(0.1, 10), 2)))
+            chems.append((chemOID, 'Chemical {0}--{1}'.format(chemOID,
+                                                               location),
+                          oid, 1 if rnd.random() < 0.95 else 0, location))
+        _insert(db, 'TFM_ACT_Chemical_Master', masters)
+        _insert(db, 'v_tfm_vt_act_Chem_MasterOID', chems)
+        _insert(db, 'v_tfm_vt_cmn_Compartment_Name',
+                [(oid * 100 + i, 'Compartment {0}'.format(i), oid, 1)
+                 for i in range(20)])
+        _insert(db, 'V_TFM_VT_ACT_Contractor_Rest',
+                [(rnd.randint(1, 500), 'Contractor {0}'.format(i), oid, 1)
+                 for i in range(10)])
+        _insert(db, 'TFM_VT_CMN_Supervisor',
+                [(rnd.randint(1, 200), 'Supervisor {0}'.format(i), oid, 1)
+                 for i in range(5)])
+        _insert(db, 'V_TFM_VT_Species_RES',
+                [('SP{0}'.format(s), 'Species {0}'.format(s),
+                  'V{0}{1}'.format(s, v), 'Variety {0}{1}'.format(s, v), oid,
+                  1) for s in range(8) for v in range(3)])
+        _insert(db, 'V_TFM_VT_OP_Property_Category_1300',
+                [(oid, 1300 + c, 1) for c in range(3)])
+        _insert(db, 'V_TFM_VT_OP_Property_TYPE_SUBTYPE_RES',
+                [(oid, 1300 + c, 'Property category {0}'.format(c),
+                  c * 10 + t, 'Property type {0}'.format(t),
+                  (c * 10 + t) * 10 + s, 'Property subtype {0}'.format(s),
+                  1) for c in range(4) for t in range(4) for s in range(3)])
+        _insert(db, 'V_TFM_VT_OP_Stand_1400',
+                [(oid, 1400 + c, 'Stand category {0}'.format(c),
+                  500 + c * 10 + t, 'Stand type {0}'.format(t),
+                  (500 + c * 10 + t) * 10 + s, 'Stand subtype {0}'.format(s),
+                  1) for c in range(4) for t in range(5) for s in range(4)])
+        _insert(db, 'TFM_VT_OP_ACT_TYPE',
+                [(oid, 9000 + s, 1, 1 if s < 3 else 0) for s in range(10)])
+
+    for table, column in (('TFM_ACT_Chemical_Master', 'PropertyOID'),
+                          ('v_tfm_vt_act_Chem_MasterOID', 'PropertyOID'),
+                          ('v_tfm_vt_act_Chem_MasterOID', 'CODE'),
+                          ('v_tfm_vt_cmn_Compartment_Name', 'PropertyOID'),
+                          ('V_TFM_VT_ACT_Contractor_Rest', 'PROPERTYOID'),
+                          ('TFM_VT_CMN_Supervisor', 'PROPERTYOID'),
+                          ('V_TFM_VT_Species_RES', 'PropertyOID'),
+                          ('V_TFM_VT_OP_Property_Category_1300',
+                           'PROPERTYOID'),
+                          ('V_TFM_VT_OP_Property_TYPE_SUBTYPE_RES',
+                           'PROPERTYOID'),
+                          ('V_TFM_VT_OP_Stand_1400', 'PROPERTYOID'),
+                          ('TFM_VT_OP_ACT_TYPE', 'PROPERTYOID')):
+        db.execute('create index ix_{0}_{1} on {0} ({1})'.format(table,
+                                                                  column))
+    db.commit()
+    db.close()
+    return fixture_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Builds a SQLite fixture '
+                                     'for the MOBILE_* procedure emulator')
+    parser.add_argument('fixture_path')
+    parser.add_argument('--properties', type=int, default=1000,
+                        help='number of properties to generate')
+    parser.add_argument('--first-oid', type=int, default=1001,
+                        help='propertyOID of the first property')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    buildFixture(args.fixture_path, range(args.first_oid, args.first_oid +
+                                          args.properties), args.seed)
+    print('...Built emulator fixture for {0} properties: {1}'.format(
+          args.properties, args.fixture_path))
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:        MobileSyncDaemon.py
+#
+# Purpose:     Runs MobileSyncLRM.py continuously in micro-batches. Polls the
+#              mobile activity and chemical copies on an interval and syncs
+#              whatever arrived since the last batch, keeping SDE and SQL
+#              Server connections open between batches.
+#
+# Usage Notes: Requires "incremental": true in the sync_options section of
+#              config.json so rows arriving during a batch are kept for the
+#              next one. Poll interval and stats file are set in an optional
+#              daemon_options section, e.g.
+#                  "daemon_options": {"poll_interval": 60,
+#                                     "stats_path": "...\\daemon_stats.json",
+#                                     "max_cycles": null}
+#              Throughput and queue depth are logged after every batch and
+#              written to the stats file after every poll. With max_batch
+#              set in sync_options each batch syncs at most that many
+#              activities and chemicals, and the next poll starts right away
+#              while more are waiting. Stop with Ctrl+C.
+#
+# Author:      Dylan Harwell - Resource Data Inc
+#
+# Created:     10/18/2026
+# -----------------------------------------------------------------------------
+
+import GWRutils
+import arcpy
+import os
+import runpy
+import sys
+import time
+
+# Set path to config and logs directory, create new log file. Both can be
+# overridden with GWR_CONFIG and GWR_LOG_DIR and are passed on to the sync
+config_path = os.environ.get('GWR_CONFIG',
+                             'F:\\LRMMobileSolution\\Scripts\\config.json')
+log_dir = os.environ.get('GWR_LOG_DIR', 'F:\\LRMMobileSolution\\Scripts\\Logs')
+log_name = 'MobileSyncDaemon_LOG_' + GWRutils.getTime() + '.txt'
+log = os.path.join(log_dir, log_name)
+log_file = open(log, 'w+')
+log_file.close()
+sync_script = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'MobileSyncLRM.py')
+
+# Validate config file
+is_valid = GWRutils.validateConfig(config_path)
+if is_valid == True:
+    pass
+else:
+    print('Invalid config! Exiting...')
+    GWRutils.logMessage(log, 'Invalid config! Exiting...')
+    sys.exit()
+
+# Retrieve data from config and validate
+sde_connection = GWRutils.configReader(config_path, 'sde_connection')
+mobile_datasets = GWRutils.configReader(config_path, 'mobile_datasets')
+sync_options = GWRutils.configReader(config_path, 'sync_options') or {}
+daemon_options = GWRutils.configReader(config_path, 'daemon_options') or {}
+
+if not sde_connection:
+    print('No sde connection file! Exiting...')
+    GWRutils.logMessage(log, 'No sde connection file! Exiting...')
+    sys.exit()
+if not mobile_datasets:
+    print('No mobile_datasets found! Exiting...')
+    GWRutils.logMessage(log, 'No mobile_datasets found! Exiting...')
+    sys.exit()
+if not sync_options.get('incremental'):
+    print('Daemon mode requires incremental sync_options! Exiting...')
+    GWRutils.logMessage(log, 'Daemon mode requires incremental '
+                        'sync_options! Exiting...')
+    sys.exit()
+
+# Set up buffered logging, optionally level-gated or written as json lines
+log_config = GWRutils.configReader(config_path, 'logging')
+if log_config:
+    GWRutils.configureLogger(log, log_config.get('level', 'INFO'),
+                             log_config.get('json_lines', False))
+GWRutils.logMessage(log, '...All configurations loaded')
+
+# Set sde connection workspace, it stays cached for every batch since the
+# sync no longer clears the workspace cache with warm connections enabled.
+# SQL Server connections stay open in the shared connection pool
+arcpy.env.workspace = sde_connection
+GWRutils.enableWarmConnections()
+os.environ['GWR_CONFIG'] = config_path
+os.environ['GWR_LOG_DIR'] = log_dir
+
+mobile_act = mobile_datasets['activity_mobile_copy']
+mobile_che = mobile_datasets['chem_app_mobile_copy']
+poll_interval = daemon_options.get('poll_interval', 60)
+max_cycles = daemon_options.get('max_cycles')
+stats_path = daemon_options.get('stats_path', os.path.join(
+                                log_dir, 'MobileSyncDaemon_stats.json'))
+
+# Same defaults MobileSyncLRM.py uses
+watermark_field = sync_options.get('watermark_field', 'OBJECTID')
+max_batch = sync_options.get('max_batch')
+watermark_path = sync_options.get('watermark_path', os.path.join(
+                                  os.path.dirname(config_path),
+                                  'MobileSyncLRM_watermarks.json'))
+journal_path = sync_options.get('journal_path', os.path.join(
+                                log_dir, 'MobileSyncLRM_journal.json'))
+
+stats = {'started': time.strftime('%Y-%m-%d %H:%M:%S'), 'polls': 0,
+         'batches': 0, 'failed_batches': 0, 'activities_synced': 0,
+         'chemicals_synced': 0, 'busy_seconds': 0.0, 'rows_per_second': 0.0,
+         'queue_depth': {}, 'max_queue_depth': 0, 'last_batch': None}
+
+
+def queueDepth():
+    """Counts mobile rows above the persisted watermarks, i.e. rows waiting
+       for the next batch"""
+    watermarks = GWRutils.readWatermarks(watermark_path)
+    depth = {}
+    for ds in (mobile_act, mobile_che):
+        where = GWRutils.buildWatermarkClause(ds, watermark_field,
+                                              watermarks.get(ds))
+        depth[ds] = GWRutils.countRows(ds, where)
+    return depth
+
+
+def runBatch():
+    """Runs one sync in this process and returns the metrics it recorded"""
+    try:
+        runpy.run_path(sync_script, run_name='__main__')
+    except SystemExit:
+        pass
+    except Exception as e:
+        print('Sync batch raised an error: {0}'.format(e))
+        GWRutils.logMessage(log, 'Sync batch raised an error: {0}'.format(e),
+                            'ERROR')
+    metrics = GWRutils.writeMetrics() or {'stages': {}}
+    GWRutils.flushLogs(keep=log)
+    return metrics
+
+
+print('...Polling {0} and {1} every {2}s'.format(mobile_act, mobile_che,
+                                                 poll_interval))
+GWRutils.logMessage(log, '...Polling {0} and {1} every {2}s'.format(
+                    mobile_act, mobile_che, poll_interval))
+try:
+    while max_cycles is None or stats['polls'] < max_cycles:
+        poll_start = time.time()
+        stats['polls'] += 1
+        try:
+            depth = queueDepth()
+        except Exception as e:
+            print('Failed to read queue depth: {0}'.format(e))
+            GWRutils.logMessage(log, 'Failed to read queue depth: {0}'
+                                .format(e), 'ERROR')
+            depth = {}
+        stats['queue_depth'] = depth
+        stats['max_queue_depth'] = max(stats['max_queue_depth'],
+                                       sum(depth.values()))
+
+        # Chemicals are only synced along with activities, a journal left
+        # by a failed batch is resumed even if nothing new arrived
+        if depth.get(mobile_act) or os.path.exists(journal_path):
+            start = time.time()
+            metrics = runBatch()
+            seconds = time.time() - start
+            stages = metrics['stages']
+            activities = stages.get('append', {}).get('rows_out', 0)
+            chemicals = stages.get('chem_append', {}).get('rows_in', 0)
+            failed = [s for s in stages if stages[s].get('status') in
+                      ('failed', 'incomplete')]
+            stats['batches'] += 1
+            stats['failed_batches'] += 1 if failed else 0
+            stats['activities_synced'] += activities
+            stats['chemicals_synced'] += chemicals
+            stats['busy_seconds'] = round(stats['busy_seconds'] + seconds, 3)
+            stats['rows_per_second'] = round(
+                (stats['activities_synced'] + stats['chemicals_synced']) /
+                stats['busy_seconds'], 1) if stats['busy_seconds'] else 0.0
+            stats['last_batch'] = {
+                'finished': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'seconds': round(seconds, 3), 'activities': activities,
+                'chemicals': chemicals, 'queue_depth': depth,
+                'failed_stages': failed}
+            message = ('...Batch {0}: {1} activitie(s), {2} chemical(s) in '
+                       '{3:.1f}s, {4} rows/sec overall, queue depth {5}'
+                       .format(stats['batches'], activities, chemicals,
+                               seconds, stats['rows_per_second'],
+                               sum(depth.values())))
+            if failed:
+                message += ', failed at: ' + ', '.join(failed)
+            print(message)
+            GWRutils.logMessage(log, message,
+                                'WARNING' if failed else 'INFO')
+        GWRutils.replaceJsonFile(stats_path, stats)
+
+        # A batch capped at max_batch left rows behind, poll again at once
+        backlog = max_batch and max(depth.values() or [0]) > max_batch
+        if not backlog and (max_cycles is None or
+                            stats['polls'] < max_cycles):
+            time.sleep(max(0, poll_interval - (time.time() - poll_start)))
+
+except KeyboardInterrupt:
+    print('...Stopping')
+    GWRutils.logMessage(log, '...Stopping')
+
+GWRutils.closeConnectionPools()
+arcpy.ClearWorkspaceCache_management()
+GWRutils.replaceJsonFile(stats_path, stats)
+print('...{0} batch(es), {1} activitie(s) and {2} chemical(s) synced'.format(
+      stats['batches'], stats['activities_synced'],
+      stats['chemicals_synced']))
+GWRutils.logMessage(log, '...{0} batch(es), {1} activitie(s) and {2} '
+                    'chemical(s) synced'.format(stats['batches'],
+                                                stats['activities_synced'],
+                                                stats['chemicals_synced']))
+print(GWRutils.getTime())
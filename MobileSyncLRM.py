@@ -15,15 +15,26 @@ import GWRutils
 import arcpy
 import os
 import sys
+import time
 
-# Set path to config and logs directory, create new log file
-config_path = 'F:\\LRMMobileSolution\\Scripts\\config.json'
-mobile_gdb = 'F:\\LRMMobileSolution\\LRM_Mobile.gdb'
-log_dir = 'F:\\LRMMobileSolution\\Scripts\\Logs'
+# Set path to config and logs directory, create new log file. Both can be
+# overridden with GWR_CONFIG and GWR_LOG_DIR, e.g. by the benchmarks
+config_path = os.environ.get('GWR_CONFIG',
+                             'F:\\LRMMobileSolution\\Scripts\\config.json')
+log_dir = os.environ.get('GWR_LOG_DIR', 'F:\\LRMMobileSolution\\Scripts\\Logs')
 log_name = 'MobileSyncLRM_LOG_' + GWRutils.getTime() + '.txt'
 log = os.path.join(log_dir, log_name)
 log_file = open(log, 'w+')
 log_file.close()
+GWRutils.startMetrics('MobileSyncLRM', os.path.join(
+                      log_dir, 'MobileSyncLRM_METRICS_' + GWRutils.getTime() +
+                      '.json'))
+
+# Profile each stage with cProfile and tracemalloc if GWR_PROFILE is set or
+# the script was run with --profile
+if GWRutils.profilingRequested():
+    GWRutils.enableProfiling(log_dir, 'MobileSyncLRM_PROFILE_' +
+                             GWRutils.getTime())
 
 # Validate config file
 is_valid = GWRutils.validateConfig(config_path)
@@ -40,6 +51,7 @@ cnxn_info = GWRutils.configReader(config_path, 'cnxn_info')
 sql_procs = GWRutils.configReader(config_path, 'sql_procs')
 datasets = GWRutils.configReader(config_path, 'datasets')
 mobile_datasets = GWRutils.configReader(config_path, 'mobile_datasets')
+sync_options = GWRutils.configReader(config_path, 'sync_options') or {}
 
 if not sde_connection:
     print('No sde connection file! Exiting...')
@@ -61,15 +73,25 @@ if not mobile_datasets:
     print('No mobile_datasets found! Exiting...')
     GWRutils.logMessage(log, 'No mobile_datasets found! Exiting...')
     sys.exit()
+
+# Set up buffered logging, optionally level-gated or written as json lines
+log_config = GWRutils.configReader(config_path, 'logging')
+if log_config:
+    GWRutils.configureLogger(log, log_config.get('level', 'INFO'),
+                             log_config.get('json_lines', False))
 GWRutils.logMessage(log, '...All configurations loaded')
 
 # Set sde connection workspace
 arcpy.env.workspace = sde_connection
 arcpy.env.overwriteOutput = True
 
+# Field lists and mappings are cached for the run. With schema_cache_path set
+# they are kept between runs until schema_version is changed in the config
+GWRutils.setSchemaCache(sync_options.get('schema_cache_path'),
+                        sync_options.get('schema_version'))
+
 # Set paths to needed feature classes and tables
 mobile_act_script = datasets['activity_mobile_script']
-mobile_chem_script = datasets['chem_app_mobile_script']
 target_act = datasets['activity_fc']
 target_che = datasets['chem_app_table']
 stands = datasets['stand_fc']
@@ -77,395 +99,704 @@ property_fc = datasets['property_fc']
 mobile_act = mobile_datasets['activity_mobile_copy']
 mobile_che = mobile_datasets['chem_app_mobile_copy']
 
-# Ensure all feature classes and tables are valid
-feature_list = [mobile_act_script, mobile_chem_script, target_act, target_che, 
-                stands, property_fc, mobile_act, mobile_che]
+# Ensure all feature classes and tables are valid.
+# Their fields and Describe properties land in the schema cache and the
+# mobile activity copy is counted so an empty queue exits before any setup
+feature_list = [mobile_act_script, target_act, target_che, stands, property_fc,
+                mobile_act, mobile_che]
+dataset_info = GWRutils.preflightDatasets(feature_list, sde_connection,
+                                          [mobile_act])
 for feature in feature_list:
-    if not arcpy.Exists(feature):
+    if not dataset_info[feature].exists:
         print('Could not find: {0}! Exiting...'.format(feature))
         GWRutils.logMessage(log, 'Could not find: {0}! Exiting...'.format(
                                   feature))
+        if dataset_info[feature].error:
+            GWRutils.logMessage(log, dataset_info[feature].error, 'ERROR')
         sys.exit()
     else:
         print('...Found dataset: {0}'.format(feature))
         GWRutils.logMessage(log, '...Found dataset: {0}'.format(feature))
 
-# Determine if new activities were added to mobile dataset
-count_act = int(arcpy.GetCount_management(mobile_act)[0])
-if count_act > 0:
-    # Proceed with script
-    print('...{0} new activitie(s) added today'.format(str(count_act)))
-    GWRutils.logMessage(log, '...{0} new activitie(s) added today'.format(
-                              str(count_act)))
-else:
+# In incremental mode only rows newer than the persisted high-water mark of
+# each mobile dataset are synced, otherwise the whole mobile copy is synced.
+# Marks are kept after cleanup, so watermark_field must grow in the order rows
+# arrive. ObjectIDs of synced rows that could not be deleted are persisted
+# with the marks and deleted again by the next run
+incremental = sync_options.get('incremental', False)
+watermark_field = sync_options.get('watermark_field', 'OBJECTID')
+watermark_path = sync_options.get('watermark_path', os.path.join(
+                                  os.path.dirname(config_path),
+                                  'MobileSyncLRM_watermarks.json'))
+watermarks = GWRutils.readWatermarks(watermark_path) if incremental else {}
+
+# With max_batch set, an incremental run syncs at most that many activities
+# and chemicals, oldest first, leaving the rest above the new marks for the
+# next run. Rows are taken in ObjectID order, so the watermark_field must be
+# the ObjectID field
+max_batch = sync_options.get('max_batch') if incremental else None
+batch_clause = (None, None)
+if max_batch:
+    if watermark_field.lower() != \
+            GWRutils.describeCached(mobile_act)['OIDFieldName'].lower():
+        print('...max_batch needs the ObjectID as watermark_field, syncing '
+              'all new rows')
+        GWRutils.logMessage(log, '...max_batch needs the ObjectID as '
+                            'watermark_field, syncing all new rows',
+                            'WARNING')
+    else:
+        batch_clause = ('TOP {0}'.format(int(max_batch)),
+                        'ORDER BY {0}'.format(watermark_field))
+
+# The sync runs as a sequence of stages recorded in a journal. If a previous
+# run failed partway through, resume at the failed stage instead of redoing
+# the SDE writes of completed stages
+journal_path = sync_options.get('journal_path', os.path.join(
+                                log_dir, 'MobileSyncLRM_journal.json'))
+journal = GWRutils.loadJournal(journal_path)
+resumed = bool(journal['completed'])
+if resumed:
+    print('...Resuming sync started {0} after stage(s): {1}'.format(
+          journal['started'], ', '.join(journal['completed'])))
+    GWRutils.logMessage(log, '...Resuming sync started {0} after stage(s): '
+                        '{1}'.format(journal['started'],
+                                     ', '.join(journal['completed'])))
+elif dataset_info[mobile_act].count == 0:
     print('No new activities added today! Exiting...')
     GWRutils.logMessage(log, 'No new activities added today! Exiting...')
+    GWRutils.clearJournal(journal_path)
     sys.exit()
-        
-# Create dictionaries of property activities, stand activities and chemicals
-prop_act = {}
-stand_act = {}
-chems = {}
-
-fields_act = ['OBJECTID', 'Parent_GUID', 'prop_or_stand', 'PropertyOID',
-              'standOID']
-with arcpy.da.SearchCursor(mobile_act, fields_act) as sCur:
-    for row in sCur:
-        if row[2] == 'prop':
-            prop_act[row[0]] = row[3]
-        if row[2] == 'stand':
-            stand_act[row[0]] = [row[1], row[4]]
-            
-fields_che = ['OBJECTID', 'Child_GUID']
-if int(arcpy.GetCount_management(mobile_che)[0]) > 0:      
-    with arcpy.da.SearchCursor(mobile_che, fields_che) as sCur:
-        for row in sCur:
-            chems[row[0]] = row[1]
-            
-# Create dictionary with GlobalID from Property feature class
-prop_act_new = {}
-fields_prop = ['ObjectID', 'GlobalID']
-for item in prop_act.items():
-    with arcpy.da.SearchCursor(property_fc, fields_prop) as sCur:
-        for row in sCur:
-            if item[1] == row[0]:
-                prop_act_new[item[0]] = [row[0], row[1]]
 
-# ----------------------- Property Activities --------------------------------#
-if not prop_act:
-    print('...No new property activities to add')
-    GWRutils.logMessage(log, '...No new property activities to add')
-else:
-    print('...{0} new property activitie(s) to add'.format(str(len(prop_act))))
-    GWRutils.logMessage(log, '...{0} new property activitie(s) to add'.format(
-                              str(len(prop_act))))
+# With staging_workspace set, e.g. to "memory", activities are staged in an
+# empty copy of the script activity dataset made there instead of in SDE, so
+# only the writes to the targets go to SDE. Staged rows do not outlive the
+# run, so a resumed run routes them again unless they were already appended
+staging_workspace = sync_options.get('staging_workspace')
+if staging_workspace:
+    try:
+        mobile_act_script = GWRutils.createStagingCopy(
+                                staging_workspace, mobile_act_script,
+                                'ACTIVITY_STAGE')
+        print('...Staging in {0}'.format(staging_workspace))
+        GWRutils.logMessage(log, '...Staging in {0}'.format(
+                            staging_workspace))
+    except Exception as e:
+        print('Failed to create staging datasets in {0}! Exiting...'.format(
+              staging_workspace))
+        print(e)
+        GWRutils.logMessage(log, 'Failed to create staging datasets in {0}! '
+                            'Exiting...'.format(staging_workspace), 'ERROR')
+        GWRutils.logMessage(log, str(e), 'ERROR')
+        sys.exit()
+    if GWRutils.stagePending(journal, 'append'):
+        journal['completed'] = [stage for stage in journal['completed']
+                                if stage not in ('route', 'stage',
+                                                 'geometry')]
 
-    try:  
-        # Append records from Activity Mobile to Target Activity table
-        fields = GWRutils.customFieldMapper(mobile_act_script, mobile_act)
-        for item in prop_act.items():
-            where = """{0} = {1}""".format(arcpy.AddFieldDelimiters(
-                                            sde_connection,'OBJECTID'),
-                                            item[0])
-            arcpy.MakeFeatureLayer_management(mobile_act, 'prop_act', where)
-            with arcpy.da.SearchCursor('prop_act', fields) as sCur:
-                with arcpy.da.InsertCursor(mobile_act_script, fields) as iCur:
-                    for srow in sCur:
-                        iCur.insertRow(srow)
-                        print('...Appended property activity to intermediate'+
-                              ' activity feature')
-                        GWRutils.logMessage(log, '...Appended property ' + 
-                                                  'activity to intermediate '+
-                                                  'activity feature')
-
-        # Update intermediate activity TFM_CMN_PROPERTY_GlobalID field
-        fields = ['PropertyOID', 'TFM_CMN_PROPERTY_GlobalID']
-        for item in prop_act_new.items():
-            with arcpy.da.UpdateCursor(mobile_act_script, fields) as uCur:
-                for row in uCur:
-                    if row[0] == item[1][0]:
-                        row[1] = item[1][1]
-                    uCur.updateRow(row)
-        print('...Added property GlobalIDs to intermediate activity feature')
-        GWRutils.logMessage(log, '...Added property GlobalIDs to ' +
-                            'intermediate activity feature')
-        
-        # Add property boundary geometry to intermediate property activities
-        propOIDs = [prop_act[k] for k in prop_act]
-        addGeom = GWRutils.addPropertyActivityGeometry(propOIDs, 
-                                                       property_fc, 
-                                                       mobile_act_script)
-        if addGeom:
-            print('...Copied property boundary geometry to intermediate ' +
-                  'property activities')
-            GWRutils.logMessage(log, '...Copied property boundary geometry ' +
-                                'to intermediate property activities')
-        else:
-            print('Failed to copy property boundary geometry to intermediate '+
-                  'property activities! Exiting...')
-            GWRutils.logMessage(log, 'Failed to copy property boundary ' +
-                                'geometry to intermediate property ' +
-                                'activities! Exiting...')
-            sys.exit()
-        
-        # Append intermediate property activities to target activities
-        arcpy.Append_management(mobile_act_script, target_act, 'NO_TEST')
-        print('...Appended property activities to target activity feature')
-        GWRutils.logMessage(log, '...Appended property activities to target '+
-                            'activity feature')        
-        
-        # Reset mobile_act_script dataset by clearing all records
-        result = GWRutils.resetMobileFeatures([mobile_act_script])
-        print('...Cleared mobile activity script dataset')
+# Target writes run as one edit operation per stage. With single_edit_session
+# set, the stages share one edit session saved after the last chemical stage,
+# so a failure rolls back every stage written since the session started. The
+# stand overlay then runs after the save, once the activities are committed
+single_session = sync_options.get('single_edit_session', False)
+edit_session = GWRutils.SyncEditSession(arcpy.env.workspace, single_session)
 
+# If the target chem table is non-versioned, chem_bulk_table can be set to its
+# SQL Server name, e.g. "dbo.TFM_ACT_CHEMICAL_APPLICATION", to insert new
+# chemical rows in fast_executemany batches instead of through an arcpy
+# insert cursor. Ignored with single_edit_session, whose writes must all go
+# through the edit session. The table's geodatabase registration is looked up
+# once here; chem_bulk_schema names the schema of the geodatabase repository,
+# "sde" or "dbo", if it should not be detected
+chem_bulk_table = None if single_session else \
+    sync_options.get('chem_bulk_table')
+chem_bulk_batch_size = sync_options.get('chem_bulk_batch_size', 1000)
+chem_bulk_registration = None
+if chem_bulk_table:
+    try:
+        with GWRutils.connectToDB(cnxn_info) as cnxn:
+            chem_bulk_registration = GWRutils.getTableRegistration(
+                cnxn, chem_bulk_table, sync_options.get('chem_bulk_schema'))
     except Exception as e:
-        print('Failed while appending property activity to target activity ' +
-              'feature! Exiting...')
+        print('Failed to look up chem_bulk_table {0}! Exiting...'.format(
+              chem_bulk_table))
         print(e)
-        GWRutils.logMessage(log, 'Failed while appending property activity ' +
-                            'to target activity feature! Exiting...')
-        GWRutils.logMessage(log, str(e))
+        GWRutils.logMessage(log, 'Failed to look up chem_bulk_table {0}! '
+                            'Exiting...'.format(chem_bulk_table), 'ERROR')
+        GWRutils.logMessage(log, str(e), 'ERROR')
         sys.exit()
 
-# ---------------------------- Stand Activities ------------------------------#
-if not stand_act:
-    print('...No new stand activities to add')
-    GWRutils.logMessage(log, '...No new stand activities to add')
-else:
-    print('...{0} new stand activitie(s) to add'.format(str(len(stand_act))))
-    GWRutils.logMessage(log, '...{0} new stand activitie(s) to add'.format(
-                              str(len(stand_act))))
-    
+
+def exitAtStage(stage, message, error=None):
+    """Discards unsaved edits, logs a failed stage and exits, leaving the
+       journal for a rerun"""
+    edit_session.abort()
+    print(message)
+    GWRutils.logMessage(log, message, 'ERROR')
+    if error is not None:
+        print(error)
+        GWRutils.logMessage(log, str(error), 'ERROR')
+    print('Stage "{0}" failed, rerun to resume from this stage'.format(stage))
+    GWRutils.logMessage(log, 'Stage "{0}" failed, rerun to resume from this '
+                        'stage'.format(stage), 'ERROR')
+    GWRutils.flushLogCounters(log, stage)
+    GWRutils.endStage(stage, status='failed')
+    sys.exit()
+
+
+def countUnlinkedChems():
+    """Counts the target chemical rows of each Child_GUID that are not linked
+       to an activity yet"""
+    counts = {}
+    GWRutils.recordCall('sde')
+    with arcpy.da.SearchCursor(target_che, ['Child_GUID'],
+                               'ActivityOID IS NULL') as sCur:
+        for row in sCur:
+            if row[0] is not None:
+                counts[row[0]] = counts.get(row[0], 0) + 1
+    return counts
+
+
+def skipAppendedChems(rows, keys, pending, appended):
+    """Yields the chemical rows still to append, dropping rows that were not
+       journaled and the number of rows per Child_GUID in appended"""
+    for row in rows:
+        oid, guid = keys[-1][:2]
+        if oid not in pending:
+            keys.pop()
+        elif appended.get(guid):
+            appended[guid] -= 1
+            GWRutils.logCount(log, 'chem_append', 'skipped')
+        else:
+            yield row
+
+
+# Property and stand boundaries are read from a local geometry cache if
+# geometry_cache_path is set, only new or edited boundaries come from SDE.
+# RebuildGeometryCache.py refreshes the whole cache
+geometry_cache = None
+if sync_options.get('geometry_cache_path'):
+    geometry_cache = GWRutils.GeometryCache(
+                         sync_options['geometry_cache_path'],
+                         sync_options.get('geometry_cache_tokens'))
+    for feature in (property_fc, stands):
+        if not geometry_cache.cacheable(feature):
+            print('...No edit date token on {0}, reading its boundaries '
+                  'from SDE'.format(feature))
+            GWRutils.logMessage(log, '...No edit date token on {0}, reading '
+                                'its boundaries from SDE'.format(feature),
+                                'WARNING')
+
+
+# ---------------------------------- Route -----------------------------------#
+# Read the mobile activities once, routing property and stand activities into
+# the intermediate activity feature as they stream past and keeping only the
+# keys later stages need. Chemicals are routed as they are appended
+if GWRutils.stagePending(journal, 'route'):
+    GWRutils.startStage('route')
+    where_act = GWRutils.buildWatermarkClause(mobile_act, watermark_field,
+                                              watermarks.get(mobile_act))
+    if incremental:
+        marks = dict((ds, watermarks[ds]) for ds in (mobile_act, mobile_che)
+                     if ds in watermarks)
+        print('...Incremental sync from watermarks: {0}'.format(str(marks)))
+        GWRutils.logMessage(log, '...Incremental sync from watermarks: {0}'
+                            .format(str(marks)))
+
+    prop_act = {}
+    stand_act = {}
+    skip_act = []
+    count_act = 0
+    act_mark = None
     try:
-        # Append stand activities to intermediate feature
+        # Clear anything left in the intermediate feature by a failed run,
+        # staging copies are always new
+        if not staging_workspace and \
+                not GWRutils.resetMobileFeatures([mobile_act_script]):
+            raise Exception('Could not clear {0}'.format(mobile_act_script))
+
+        fields_act = ['OBJECTID', 'Parent_GUID', 'prop_or_stand',
+                      'PropertyOID', 'standOID', watermark_field]
         fields = GWRutils.customFieldMapper(mobile_act_script, mobile_act)
-        for item in stand_act.items():
-            where = """{0} = {1}""".format(arcpy.AddFieldDelimiters(
-                                            sde_connection,'OBJECTID'), item[0])
-            arcpy.MakeFeatureLayer_management(mobile_act, 'stand_act', where)        
-            print('...Layer created for mobile stand activity oid: {0}'.format(
-                    str(item[0])))
-            GWRutils.logMessage(log, '...Mobile stand activity layer created')
-
-            # Append mobile activity record to intermediate activity table
-            with arcpy.da.SearchCursor('stand_act', fields) as sCur:
-                with arcpy.da.InsertCursor(mobile_act_script, fields) as iCur:
-                    for row in sCur:
-                        iCur.insertRow(row)
-                        print('...Appended record to intermediate feature')
-                        GWRutils.logMessage(log, '...Appended record to ' +
-                                                  'intermediate feature')
-      
-            # Select stand by its OID from mobile activity and copy geometry
-            where = """{0} = {1}""".format(arcpy.AddFieldDelimiters(
-                                            sde_connection, 'ObjectID'),
-                                            item[1][1])
-            arcpy.MakeFeatureLayer_management(stands, 'temp_stands', where)
-            print('...Selected stand with activity')
-            GWRutils.logMessage(log, '...Selected stand with activity')
-            
-            # Copy stand geometry and GUID field to intermediate feature
-            where = """{0} = '{1}'""".format(arcpy.AddFieldDelimiters(
-                                              mobile_gdb, 'Parent_GUID'),
-                                              item[1][0])
-            fields_stand = ['OID@', 'SHAPE@']
-            fields_int = ['Parent_OID', 'SHAPE@']
-            with arcpy.da.SearchCursor('temp_stands', fields_stand) as sCur:
-                with arcpy.da.UpdateCursor(mobile_act_script,
-                                            fields_int,where) as uCur:
-                    for srow in sCur:
-                        for urow in uCur:
-                            urow[0] = srow[0]
-                            urow[1] = srow[1]
-                            uCur.updateRow(urow)
-                            print('...Geometry and GUID copied')
-                            GWRutils.logMessage(log, '...Geometry and GUID ' +
-                                                      'copied')
+        keys = []
+        count = 0
+        start = time.time()
+        GWRutils.recordCall('sde', 2)
+        with arcpy.da.SearchCursor(mobile_act, fields_act + fields,
+                                   where_act,
+                                   sql_clause=batch_clause) as sCur:
+            with arcpy.da.InsertCursor(mobile_act_script, fields) as iCur:
+                for row in GWRutils.splitRows(sCur, len(fields_act), keys):
+                    key = keys.pop()
+                    count_act += 1
+                    if act_mark is None or key[5] > act_mark:
+                        act_mark = key[5]
+                    if key[2] == 'prop':
+                        prop_act[key[0]] = [key[1], key[3]]
+                    elif key[2] == 'stand':
+                        stand_act[key[0]] = [key[1], key[4]]
+                    else:
+                        skip_act.append(key[0])
+                        continue
+                    iCur.insertRow(row)
+                    count += 1
 
     except Exception as e:
-        print('Failed during steps to append stand activty to intermediate '
-              'feature! Exiting...')
-        print(e)
-        GWRutils.logMessage(log, 'Failed during steps to append stand activty'+
-                                  ' to intermediate feature! Exiting...')
-        GWRutils.logMessage(log, str(e))
+        exitAtStage('route', 'Failed while routing mobile activities! '
+                    'Exiting...', e)
+
+    # Determine if new activities were added to mobile dataset
+    if count_act == 0:
+        print('No new activities added today! Exiting...')
+        GWRutils.logMessage(log, 'No new activities added today! Exiting...')
+        GWRutils.clearJournal(journal_path)
+        GWRutils.endStage('route')
         sys.exit()
-    
+
+    rate = GWRutils.rowsPerSecond(count, start)
+    print('...Appended {0} activitie(s) to intermediate activity feature '
+          '({1:.1f} rows/sec)'.format(count, rate))
+    GWRutils.logMessage(log, '...Appended {0} activitie(s) to intermediate '
+                        'activity feature ({1:.1f} rows/sec)'.format(count,
+                                                                     rate))
+    journal['state'] = {
+        'count_act': count_act,
+        'prop_act': [[k] + v for k, v in prop_act.items()],
+        'stand_act': [[k] + v for k, v in stand_act.items()],
+        'skip_act': skip_act,
+        'act_mark': GWRutils.watermarkValue(act_mark)}
+    GWRutils.endStage('route', count_act, count)
+    GWRutils.completeStage(journal_path, journal, 'route',
+                           [v[0] for v in prop_act.values()] +
+                           [v[0] for v in stand_act.values()])
+else:
+    state = journal['state']
+    count_act = state['count_act']
+    prop_act = {r[0]: r[1:] for r in state['prop_act']}
+    stand_act = {r[0]: r[1:] for r in state['stand_act']}
+    skip_act = state.get('skip_act', [])
+    act_mark = state['act_mark']
+
+print('...{0} new activitie(s) added today'.format(str(count_act)))
+GWRutils.logMessage(log, '...{0} new activitie(s) added today'.format(
+                          str(count_act)))
+print('...{0} new property activitie(s), {1} new stand activitie(s)'.format(
+      len(prop_act), len(stand_act)))
+GWRutils.logMessage(log, '...{0} new property activitie(s), {1} new stand '
+                    'activitie(s)'.format(len(prop_act), len(stand_act)))
+
+# GUID to (OID, GlobalID) map of new target activities, fetched once after
+# append and journaled, shared by the stand overlay and chemical linking
+# stages
+act_index = {}
+act_guids = [v[0] for v in prop_act.values()] + \
+            [v[0] for v in stand_act.values()]
+
+# ---------------------------------- Stage -----------------------------------#
+# Add property GlobalIDs to the routed property activities
+if GWRutils.stagePending(journal, 'stage'):
+    GWRutils.startStage('stage')
+    try:
+        # Create dictionary with GlobalID from Property feature class, reading
+        # only the properties referenced by new activities into an ObjectID
+        # index, then update the intermediate TFM_CMN_PROPERTY_GlobalID field
+        # of property activities by PropertyOID
+        propOIDs = [v[1] for v in prop_act.values()]
+        prop_globalIds = GWRutils.fetchRowsByKey(property_fc, 'ObjectID',
+                                                 propOIDs, ['GlobalID'])
+        where = "{0} = 'prop'".format(arcpy.AddFieldDelimiters(
+                                      mobile_act_script, 'prop_or_stand'))
+        count = GWRutils.updateRowsInKeyList(mobile_act_script, 'PropertyOID',
+                                             ['TFM_CMN_PROPERTY_GlobalID'],
+                                             prop_globalIds,
+                                             where_clause=where)
+        print('...Added property GlobalIDs to {0} intermediate activity '
+              'feature(s)'.format(count))
+        GWRutils.logMessage(log, '...Added property GlobalIDs to {0} '
+                            'intermediate activity feature(s)'.format(count))
+
+    except Exception as e:
+        exitAtStage('stage', 'Failed while adding property GlobalIDs to '
+                    'intermediate activity feature! Exiting...', e)
+    GWRutils.endStage('stage', len(prop_act), count)
+    GWRutils.completeStage(journal_path, journal, 'stage', act_guids)
+
+# -------------------------------- Geometry ----------------------------------#
+# Copy property boundary and stand geometry to intermediate activities
+if GWRutils.stagePending(journal, 'geometry'):
+    GWRutils.startStage('geometry')
+    count_geom = 0
+    if prop_act:
+        propOIDs = [v[1] for v in prop_act.values()]
+        addGeom = GWRutils.addPropertyActivityGeometry(propOIDs,
+                                                       property_fc,
+                                                       mobile_act_script,
+                                                       geometry_cache)
+        if addGeom is not None:
+            count_geom = addGeom
+            print('...Copied property boundary geometry to intermediate ' +
+                  'property activities')
+            GWRutils.logMessage(log, '...Copied property boundary geometry ' +
+                                'to intermediate property activities')
+        else:
+            exitAtStage('geometry', 'Failed to copy property boundary ' +
+                        'geometry to intermediate property activities! ' +
+                        'Exiting...')
+
+    if stand_act:
+        try:
+            # Fetch all needed stand geometries in one query, then copy
+            # geometry and stand OID to intermediate features in one pass
+            standOIDs = [v[1] for v in stand_act.values()]
+            if geometry_cache:
+                stand_geoms = geometry_cache.fetch(stands, standOIDs)
+            else:
+                stand_geoms = {k: v[0] for k, v in GWRutils.fetchRowsByKey(
+                               stands, 'ObjectID', standOIDs,
+                               ['SHAPE@']).items()}
+            guid_to_stand = {v[0]: v[1] for v in stand_act.values()}
+            count = GWRutils.stampGeometryByKey(mobile_act_script,
+                                                'Parent_GUID', guid_to_stand,
+                                                stand_geoms, 'Parent_OID')
+            print('...Stand geometry and OID copied to {0} intermediate '
+                  'feature(s)'.format(count))
+            GWRutils.logMessage(log, '...Stand geometry and OID copied to '
+                                '{0} intermediate feature(s)'.format(count))
+            count_geom += count
+            if count < len(stand_act):
+                print('...Could not locate stand geometry for {0} '
+                      'activitie(s)'.format(len(stand_act) - count))
+                GWRutils.logMessage(log, '...Could not locate stand geometry '
+                                    'for {0} activitie(s)'.format(
+                                    len(stand_act) - count), 'WARNING')
+
+        except Exception as e:
+            exitAtStage('geometry', 'Failed while copying stand geometry to '
+                        'intermediate feature! Exiting...', e)
+    GWRutils.endStage('geometry', len(prop_act) + len(stand_act),
+                      count_geom)
+    GWRutils.completeStage(journal_path, journal, 'geometry')
+
+# --------------------------------- Append -----------------------------------#
+# Append intermediate features to target activity features
+if GWRutils.stagePending(journal, 'append'):
+    GWRutils.startStage('append')
     try:
-        # Append intermediate features to target activity features  
         new_fields = GWRutils.customFieldMapper(target_act, mobile_act_script)
         new_fields.append('SHAPE@')
-        edit = arcpy.da.Editor(arcpy.env.workspace)
-        edit.startEditing(False, True)
-        edit.startOperation()         
+        guid_field = [f.lower() for f in new_fields].index('parent_guid')
+
+        # When resuming, skip activities a failed run already committed
+        appended = set()
+        if resumed:
+            appended = set(GWRutils.fetchOIDsByGUID(target_act,
+                                                    'Parent_GUID', act_guids))
+        count = 0
+        start = time.time()
+        edit_session.startOperation()
+        GWRutils.recordCall('sde', 2)
         with arcpy.da.SearchCursor(mobile_act_script, new_fields) as sCur:
             with arcpy.da.InsertCursor(target_act, new_fields) as iCur:
                 for row in sCur:
+                    if row[guid_field] in appended:
+                        GWRutils.logCount(log, 'append', 'skipped')
+                        continue
                     iCur.insertRow(row)
-                    print('...Appended to target activities')
-                    GWRutils.logMessage(log, '...Appended to target' +
-                                              ' activities')
-        edit.stopOperation()
-        edit.stopEditing(True)
+                    count += 1
+        edit_session.stopOperation()
+        act_index = GWRutils.fetchOIDsByGUID(target_act, 'Parent_GUID',
+                                             act_guids)
+        rate = GWRutils.rowsPerSecond(count, start)
+        print('...Appended {0} activitie(s) to target activities ({1:.1f} '
+              'rows/sec)'.format(count, rate))
+        GWRutils.logMessage(log, '...Appended {0} activitie(s) to target '
+                            'activities ({1:.1f} rows/sec)'.format(count,
+                                                                   rate))
 
     except Exception as e:
-        print('Failed during steps to append to target activity records! ' +
-              'Exiting...')
-        print(e)
-        GWRutils.logMessage(log, 'Failed during steps to append to target ' +
-                                  'activity records! Exiting...')
-        GWRutils.logMessage(log, str(e))
-        GWRutils.abortEditOperation(edit)
-        sys.exit()
+        exitAtStage('append', 'Failed during steps to append to target ' +
+                    'activity records! Exiting...', e)
+    journal['state']['act_index'] = [[k] + list(v)
+                                     for k, v in act_index.items()]
+    GWRutils.flushLogCounters(log, 'append')
+    GWRutils.endStage('append', len(act_guids), count)
+    edit_session.completeStage(journal_path, journal, 'append', act_guids)
+else:
+    act_index = {r[0]: tuple(r[1:]) for r in journal['state']['act_index']}
 
-    # After append, search target activities and retrieve new activity OIDs
+# ------------------------------- Chemicals ----------------------------------#
+# Read the mobile chemicals once, writing each as a planned record and an
+# actual record with contextID 1440 while keeping their GUIDs for the later
+# chemical stages
+if GWRutils.stagePending(journal, 'chem_append'):
+    GWRutils.startStage('chem_append')
+    where_che = GWRutils.buildWatermarkClause(mobile_che, watermark_field,
+                                              watermarks.get(mobile_che))
+    chems = {}
+    che_mark = None
     try:
-        activityOIDs = []
-        target_fields = ['OID@', 'Parent_GUID']
-        for item in stand_act.items():
-            where = """{0} = '{1}'""".format(arcpy.AddFieldDelimiters(
-                                      sde_connection, 'Parent_GUID'),
-                                      item[1][0])
-            with arcpy.da.SearchCursor(target_act,target_fields,where) as sCur:
-                for srow in sCur:
-                    activityOIDs.append(srow[0])
-                    print('...Retrieved target activity OID: {0}'.format(
-                          str(srow[0])))
-                    GWRutils.logMessage(log, '...Retrieved target activity ' +
-                                              'OID: {0}'.format(str(srow[0])))
-                    
-    except Exception as e:
-        print('Failed while retrieving target activity OID! Exiting...')
-        print(e)
-        GWRutils.logMessage(log, 'Failed while retrieving target activity ' +
-                                  'OID! Exiting...')
-        GWRutils.logMessage(log, str(e))
-        sys.exit()
+        # Append planned and actual chemical records to chem app table, in
+        # bulk through SQL Server if configured
+        fields_che = ['OBJECTID', 'Child_GUID', watermark_field]
+        chem_fields = GWRutils.customFieldMapper(target_che, mobile_che)
+        context = [f.lower() for f in chem_fields].index('activity_contextid')
 
-    # Connect to db and execute stand overly procedure for each activity OID
-    overlay_proc = sql_procs['stand_overlay_proc']
-    try:
-        with GWRutils.connectToDB(cnxn_info) as cnxn:
-            print('...Connected to SQL Server')
-            GWRutils.logMessage(log, '...Connected to SQL Server')
-            for oid in activityOIDs:
-                execute = GWRutils.executeSQLProcStandOverlay(cnxn, 
-                                                              overlay_proc,
-                                                              oid)
-                if execute:
-                    print('...Stand overlay proc executed for oid: {0}'
-                          .format(str(oid)))
-                    GWRutils.logMessage(log, '...Stand overlay proc executed '+
-                                              'for oid: {0}'.format(str(oid)))
-                else:
-                    print('Failed to execute stand overlay proc! Exiting...')
-                    GWRutils.logMessage(log, 'Failed to execute stand ' +
-                                              'overlay proc! Exiting...')
-                    sys.exit()
+        # Journal the mobile chemicals to append and the unlinked target
+        # rows of each GUID before writing. A rerun only appends journaled
+        # chemicals and skips those whose GUID gained unlinked target rows,
+        # i.e. the ones a failed run already committed
+        state = journal['state']
+        retry = 'chem_pending' in state
+        if not retry:
+            GWRutils.recordCall('sde')
+            with arcpy.da.SearchCursor(mobile_che, ['OBJECTID'], where_che,
+                                       sql_clause=batch_clause) as sCur:
+                state['chem_pending'] = [row[0] for row in sCur]
+            state['chem_unlinked'] = countUnlinkedChems()
+            GWRutils.replaceJsonFile(journal_path, journal)
+        pending = set(state['chem_pending'])
+        appended = {}
+        if retry:
+            for guid, n in countUnlinkedChems().items():
+                # Each chemical was written as a planned and an actual row
+                n = (n - state['chem_unlinked'].get(guid, 0)) // 2
+                if n > 0:
+                    appended[guid] = n
+        keys = []
+        count = 0
+        start = time.time()
+        GWRutils.recordCall('sde')
+        with arcpy.da.SearchCursor(mobile_che, fields_che + chem_fields,
+                                   where_che,
+                                   sql_clause=batch_clause) as sCur:
+            rows = GWRutils.splitRows(sCur, len(fields_che), keys)
+            rows = skipAppendedChems(rows, keys, pending, appended)
+            rows = GWRutils.pairRows(rows, context, 1440)
+            if chem_bulk_table:
+                with GWRutils.connectToDB(cnxn_info) as cnxn:
+                    count = GWRutils.bulkInsertRows(
+                                cnxn, chem_bulk_table, chem_fields, rows,
+                                chem_bulk_batch_size,
+                                registration=chem_bulk_registration)
+                    cnxn.commit()
+            else:
+                edit_session.startOperation()
+                GWRutils.recordCall('sde')
+                with arcpy.da.InsertCursor(target_che, chem_fields) as iCur:
+                    for row in rows:
+                        iCur.insertRow(row)
+                        count += 1
+                edit_session.stopOperation()
+        for key in keys:
+            chems[key[0]] = key[1]
+            if che_mark is None or key[2] > che_mark:
+                che_mark = key[2]
+        del keys
+        if chems:
+            rate = GWRutils.rowsPerSecond(count, start)
+            print('...Appended {0} planned and actual chemical record(s) to '
+                  'target ({1:.1f} rows/sec through {2})'.format(
+                  count, rate, 'bulk insert' if chem_bulk_table else
+                  'insert cursor'))
+            GWRutils.logMessage(log, '...Appended {0} planned and actual '
+                                'chemical record(s) to target ({1:.1f} '
+                                'rows/sec through {2})'.format(
+                                count, rate, 'bulk insert' if
+                                chem_bulk_table else 'insert cursor'))
 
     except Exception as e:
-        print('Failed to connect to SQL Server! Exiting...')
-        print(e)
-        GWRutils.logMessage(log, 'Failed to connect to SQL Server! Exiting...')
-        GWRutils.logMessage(log, str(e))
-        sys.exit()
+        exitAtStage('chem_append', 'Failed while appending chemical records ' +
+                    'to target! Exiting...', e)
+    journal['state'].update({
+        'chems': [[k, v] for k, v in chems.items()],
+        'che_mark': GWRutils.watermarkValue(che_mark)})
+    GWRutils.flushLogCounters(log, 'chem_append')
+    GWRutils.endStage('chem_append', len(chems), count)
+    edit_session.completeStage(journal_path, journal, 'chem_append',
+                               list(chems.values()))
+else:
+    state = journal['state']
+    chems = {r[0]: r[1] for r in state['chems']}
+    che_mark = state['che_mark']
 
-# ------------------------------- Chemicals ----------------------------------#
+chem_guids = set(chems.values())
 if not chems:
     print('...No new chemical applications to add')
     GWRutils.logMessage(log, '...No new chemical applications to add')
-    pass
 else:
     print('...{0} new chemical application(s) to add'.format(str(len(chems))))
     GWRutils.logMessage(log,'...{0} new chemical application(s) to add'.format(
                         str(len(chems))))
-    
+
+if GWRutils.stagePending(journal, 'chem_link'):
+    GWRutils.startStage('chem_link')
     try:
-        # Append chemical mobile records to chem app table
-        chem_fields = GWRutils.customFieldMapper(target_che, mobile_che)
-        edit = arcpy.da.Editor(arcpy.env.workspace)
-        edit.startEditing(False, True)
-        edit.startOperation()
-        with arcpy.da.SearchCursor(mobile_che, chem_fields) as sCur:
-            with arcpy.da.InsertCursor(target_che, chem_fields) as iCur:
-                for row in sCur:
-                    iCur.insertRow(row)
-                    print('...Appended chemical records to target')
-                    GWRutils.logMessage(log, '...Appended chemical records ' +
-                                        'to target')
-        edit.stopOperation()
-        edit.stopEditing(True)
+        # Link every target chemical without an ActivityOID, i.e. this run's
+        # chemicals and any appended by an earlier run before their activity
+        # was synced. Activities not synced in this run are looked up into
+        # the GUID keyed index of new activities
+        GWRutils.recordCall('sde')
+        with arcpy.da.SearchCursor(target_che, ['Child_GUID'],
+                                   'ActivityOID IS NULL') as sCur:
+            unlinked = set(row[0] for row in sCur if row[0] is not None)
+        act_index.update(GWRutils.fetchOIDsByGUID(
+                         target_act, 'Parent_GUID',
+                         [g for g in unlinked if g not in act_index]))
+        chem_links = {g: act_index[g] for g in unlinked if g in act_index}
+
+        # Copy ActivityOID and GlobalID to all unlinked chemical rows in a
+        # single update pass narrowed to their Child_GUIDs
+        field_che = ['ActivityOID', 'TFM_OP_ACTIVITY_GlobalID']
+        edit_session.startOperation()
+        count = GWRutils.updateRowsInKeyList(target_che, 'Child_GUID',
+                                             field_che, chem_links)
+        edit_session.stopOperation()
+        print('...ActivityOID and GlobalID copied to {0} chem record(s)'
+              .format(count))
+        GWRutils.logMessage(log, '...ActivityOID and GlobalID copied to {0} '
+                            'chem app record(s)'.format(count))
+        waiting = len(unlinked) - len(chem_links)
+        if waiting:
+            print('...{0} chemical GUID(s) still waiting for their activity'
+                  .format(waiting))
+            GWRutils.logMessage(log, '...{0} chemical GUID(s) still waiting '
+                                'for their activity'.format(waiting),
+                                'WARNING')
 
     except Exception as e:
-        print('Failed while appending chemical records to target! Exiting...')
-        print(e)
-        GWRutils.logMessage(log, 'Failed while appending chemical records ' +
-                                  'to target! Exiting...')
-        GWRutils.logMessage(log, str(e))
-        GWRutils.abortEditOperation(edit)
-        sys.exit()
-    
+        exitAtStage('chem_link', 'Failed while copying ActivityOID/GlobalID '
+                    'to chem table! Exiting...', e)
+    GWRutils.endStage('chem_link', len(unlinked), count)
+    edit_session.completeStage(journal_path, journal, 'chem_link',
+                               chem_guids)
+
+# ---------------------------------- Save ------------------------------------#
+# Save the shared edit session, only then are its stages marked complete
+if single_session:
+    GWRutils.startStage('save')
     try:
-        # Apped a copy to chem app script table, change status to active then 
-        # append to chem app table
-        context = ['Activity_ContextID']
-        chem_fields = GWRutils.customFieldMapper(mobile_chem_script,mobile_che)
-        with arcpy.da.SearchCursor(mobile_che, chem_fields) as sCur:
-            with arcpy.da.InsertCursor(mobile_chem_script,chem_fields) as iCur:
-                for row in sCur:
-                    iCur.insertRow(row)
-                    print('...Appended chemical records to chem script table')
-                    GWRutils.logMessage(log, '...Appended chemical records ' +
-                                        'to chem script table')
-        with arcpy.da.UpdateCursor(mobile_chem_script, context) as uCur:
-            for row in uCur:
-                row[0] = 1440
-                uCur.updateRow(row)
-                print('...Changed contextID to 1440')
-                GWRutils.logMessage(log, '...Changed contextID to 1440')
-        arcpy.Append_management(mobile_chem_script, target_che, 'NO_TEST')
-        print('...Copied actual record to target chems')
-        GWRutils.logMessage(log, '...Copied actual record to target chems')
-        
+        edit_session.save(journal_path, journal)
+        print('...Saved edit session')
+        GWRutils.logMessage(log, '...Saved edit session')
     except Exception as e:
-        print('Failed while creating actual chem record! Exiting...')
-        print(e)
-        GWRutils.logMessage(log, 'Failed while creating actual chem record! '+
-                            'Exiting...')
-        GWRutils.logMessage(log, str(e))
-        sys.exit()
-    
-    try:
-        # Retrive ActivityOIDs and GlobalIds based on GUID
-        act_oids_globalIds = {}
-        for guid in chems.values():
-            where = """{0} = '{1}'""".format(arcpy.AddFieldDelimiters(
-                                              sde_connection,'Parent_GUID'), 
-                                              guid)
-            field_act = ['OID@', 'GlobalID']
-            with arcpy.da.SearchCursor(target_act, field_act, where) as sCur:
-                for row in sCur:
-                    act_oids_globalIds[row[0]] = (guid, row[1])
-
-        edit = arcpy.da.Editor(arcpy.env.workspace)
-        edit.startEditing(False, True)
-        edit.startOperation() 
-        for item in act_oids_globalIds.items():
-            where = """{0} = '{1}'""".format(arcpy.AddFieldDelimiters(
-                                              sde_connection,'Child_GUID'),
-                                              item[1][0])
-            field_che = ['ActivityOID', 'TFM_OP_ACTIVITY_GlobalID']
-            with arcpy.da.UpdateCursor(target_che, field_che, where) as uCur:
-                for urow in uCur:
-                    urow[0] = item[0]
-                    urow[1] = item[1][1]
-                    uCur.updateRow(urow)
-                    print('...ActivityOID and GlobalID copied to chem table')
-                    GWRutils.logMessage(log, '...ActivityOID and GlobalId ' +
-                                             'copied to chem app table')
-        edit.stopOperation()
-        edit.stopEditing(True)
+        exitAtStage('save', 'Failed to save edit session! Exiting...', e)
+    GWRutils.endStage('save')
 
-    except Exception as e:
-        print('Failed while copying ActivityOID/GlobalId to chem table! ' +
-              'Exiting...')
-        print(e)
-        GWRutils.logMessage(log, 'Failed while copying ActivityOID/GLobalID '+
-                                 'to chem table! Exiting...')
-        GWRutils.logMessage(log, str(e))
-        GWRutils.abortEditOperation(edit)
-        sys.exit()    
+# --------------------------------- Overlay ----------------------------------#
+# Runs after the chemical stages so the procedure only ever sees saved target
+# activities, also when they were written in a shared edit session
+if GWRutils.stagePending(journal, 'overlay'):
+    GWRutils.startStage('overlay')
+    if stand_act:
+        # Stand activity Parent_GUIDs resolve to new target activity OIDs
+        # through the index built after append. A rerun after a partly
+        # failed overlay only retries the OIDs that were not overlaid
+        stand_guids = [v[0] for v in stand_act.values()]
+        overlaid = set(journal['state'].get('overlaid', []))
+        activityOIDs = [act_index[g][0] for g in stand_guids
+                        if g in act_index and
+                        act_index[g][0] not in overlaid]
+        print('...Retrieved {0} target activity OID(s)'.format(
+              len(activityOIDs)))
+        GWRutils.logMessage(log, '...Retrieved {0} target activity '
+                            'OID(s)'.format(len(activityOIDs)))
+
+        # Connect to db and execute stand overlay procedure for new activity
+        # OIDs, in batches through the wrapper proc if configured, otherwise
+        # per OID across a bounded pool of connections
+        overlay_proc = sql_procs['stand_overlay_proc']
+        overlay_batch_proc = sql_procs.get('stand_overlay_batch_proc')
+        overlay_batch_size = sync_options.get('overlay_batch_size', 200)
+        overlay_workers = sync_options.get('overlay_workers', 4)
+        try:
+            start = time.time()
+            if overlay_batch_proc:
+                with GWRutils.connectToDB(cnxn_info) as cnxn:
+                    print('...Connected to SQL Server')
+                    GWRutils.logMessage(log, '...Connected to SQL Server')
+                    failed = GWRutils.executeSQLProcStandOverlayBatch(
+                                cnxn, overlay_batch_proc, activityOIDs,
+                                overlay_batch_size)
+            else:
+                failed = GWRutils.executeSQLProcStandOverlayPool(
+                            cnxn_info, overlay_proc, activityOIDs,
+                            overlay_workers)
+
+        except Exception as e:
+            exitAtStage('overlay', 'Failed to connect to SQL Server! '
+                        'Exiting...', e)
+        if failed:
+            failed_oids = set(failed)
+            overlaid.update(oid for oid in activityOIDs
+                            if oid not in failed_oids)
+            journal['state']['overlaid'] = sorted(overlaid)
+            GWRutils.replaceJsonFile(journal_path, journal)
+            exitAtStage('overlay', 'Failed to execute stand overlay proc for '
+                        'oid(s): {0}! Exiting...'.format(str(failed)))
+        rate = GWRutils.rowsPerSecond(len(activityOIDs), start)
+        print('...Stand overlay proc executed for {0} activitie(s) ({1:.1f} '
+              'rows/sec)'.format(len(activityOIDs), rate))
+        GWRutils.logMessage(log, '...Stand overlay proc executed for {0} '
+                            'activitie(s) ({1:.1f} rows/sec)'.format(
+                            len(activityOIDs), rate))
+    GWRutils.endStage('overlay', len(stand_act),
+                      len(activityOIDs) if stand_act else 0)
+    GWRutils.completeStage(journal_path, journal, 'overlay',
+                           [v[0] for v in stand_act.values()])
 
 # -------------------------------- Clean Up ----------------------------------#
-# Reset mobile datasets by clearing all records
-result = GWRutils.resetMobileFeatures([mobile_act, mobile_che,
-                                        mobile_act_script, mobile_chem_script])
+GWRutils.startStage('cleanup')
+# All target writes are committed, advance the high-water marks so synced
+# rows are not read again if deleting them below fails
+if incremental:
+    if act_mark is not None:
+        watermarks[mobile_act] = GWRutils.watermarkValue(act_mark)
+    if che_mark is not None:
+        watermarks[mobile_che] = GWRutils.watermarkValue(che_mark)
+    GWRutils.writeWatermarks(watermark_path, watermarks)
+    marks = dict((ds, watermarks[ds]) for ds in (mobile_act, mobile_che)
+                 if ds in watermarks)
+    print('...Advanced watermarks to: {0}'.format(str(marks)))
+    GWRutils.logMessage(log, '...Advanced watermarks to: {0}'.format(
+                        str(marks)))
+
+# Reset mobile datasets by clearing all records, in incremental mode only
+# delete the rows this run read, and those an earlier run failed to delete,
+# so edits that arrived during the run are kept. Staging copies are deleted
+# instead
+script_features = [mobile_act_script]
+result = True
+if staging_workspace:
+    result = GWRutils.deleteStagingCopies(script_features)
+    script_features = []
+if incremental:
+    result = result and GWRutils.resetMobileFeatures(script_features)
+    undeleted = watermarks.pop('undeleted', {})
+    synced = {mobile_act: list(prop_act) + list(stand_act) + skip_act,
+              mobile_che: list(chems)}
+    for ds in synced:
+        oids = sorted(set(synced[ds] + undeleted.pop(ds, [])))
+        if not GWRutils.deleteRowsByOID(ds, oids):
+            # Synced rows stay below the mark, retry them next run
+            undeleted[ds] = oids
+            result = False
+    if undeleted:
+        watermarks['undeleted'] = undeleted
+    GWRutils.writeWatermarks(watermark_path, watermarks)
+else:
+    result = result and GWRutils.resetMobileFeatures([mobile_act, mobile_che] +
+                                                     script_features)
 if result:
     print('...Cleared mobile datasets')
     GWRutils.logMessage(log, '...Cleared mobile datasets')
 else:
     print('Failed to clear mobile datasets!')
     GWRutils.logMessage(log, 'Failed to clear mobile datasets!')
-  
-arcpy.ClearWorkspaceCache_management()
-print(GWRutils.getTime())
\ No newline at end of file
+
+# Every stage completed, the journal is no longer needed
+GWRutils.clearJournal(journal_path)
+GWRutils.endStage('cleanup')
+
+# Keep the SDE connection cached when run repeatedly by MobileSyncDaemon.py
+if not GWRutils.warmConnectionsEnabled():
+    arcpy.ClearWorkspaceCache_management()
+print(GWRutils.getTime())
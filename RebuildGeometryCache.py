@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:        RebuildGeometryCache.py
+#
+# Purpose:     To rebuild the local geometry cache of property and stand
+#              boundaries MobileSyncLRM.py reads instead of SDE.
+#
+# Usage Notes: Set "geometry_cache_path" in the sync_options section of
+#              config.json, e.g. "F:\\LRMMobileSolution\\Cache\\boundaries".
+#              The sync keeps the cache current on its own by re-reading
+#              boundaries whose GlobalID, last edited date or shape area and
+#              length changed. Datasets with none of these besides GlobalID
+#              are not cached. Run this after bulk boundary edits or to
+#              compact the cache file.
+#
+# Author:      Dylan Harwell - Resource Data Inc
+#
+# Created:     10/18/2026
+# -----------------------------------------------------------------------------
+
+import GWRutils
+import arcpy
+import os
+import sys
+
+# Set path to config and logs directory, create new log file. Both can be
+# overridden with GWR_CONFIG and GWR_LOG_DIR
+config_path = os.environ.get('GWR_CONFIG',
+                             'F:\\LRMMobileSolution\\Scripts\\config.json')
+log_dir = os.environ.get('GWR_LOG_DIR', 'F:\\LRMMobileSolution\\Scripts\\Logs')
+log_name = 'RebuildGeometryCache_LOG_' + GWRutils.getTime() + '.txt'
+log = os.path.join(log_dir, log_name)
+log_file = open(log, 'w+')
+log_file.close()
+
+# Validate config file
+is_valid = GWRutils.validateConfig(config_path)
+if is_valid == True:
+    pass
+else:
+    print('Invalid config! Exiting...')
+    GWRutils.logMessage(log, 'Invalid config! Exiting...')
+    sys.exit()
+
+# Retrieve data from config and validate
+sde_connection = GWRutils.configReader(config_path, 'sde_connection')
+datasets = GWRutils.configReader(config_path, 'datasets')
+sync_options = GWRutils.configReader(config_path, 'sync_options') or {}
+
+if not sde_connection:
+    print('No sde connection file! Exiting...')
+    GWRutils.logMessage(log, 'No sde connection file! Exiting...')
+    sys.exit()
+if not datasets:
+    print('No datasets found! Exiting...')
+    GWRutils.logMessage(log, 'No datasets found! Exiting...')
+    sys.exit()
+if not sync_options.get('geometry_cache_path'):
+    print('No geometry_cache_path in sync_options! Exiting...')
+    GWRutils.logMessage(log, 'No geometry_cache_path in sync_options! '
+                        'Exiting...')
+    sys.exit()
+
+# Set sde connection workspace
+arcpy.env.workspace = sde_connection
+boundary_datasets = [datasets['property_fc'], datasets['stand_fc']]
+dataset_info = GWRutils.preflightDatasets(boundary_datasets,
+                                          sde_connection)
+for feature in boundary_datasets:
+    if not dataset_info[feature].exists:
+        print('Could not find: {0}! Exiting...'.format(feature))
+        GWRutils.logMessage(log, 'Could not find: {0}! Exiting...'.format(
+                                  feature))
+        sys.exit()
+
+# Rewrite the cache from every property and stand boundary
+try:
+    geometry_cache = GWRutils.GeometryCache(
+                         sync_options['geometry_cache_path'],
+                         sync_options.get('geometry_cache_tokens'))
+    for feature in boundary_datasets:
+        if not geometry_cache.cacheable(feature):
+            print('...No edit date token on {0}, not caching it'.format(
+                  feature))
+            GWRutils.logMessage(log, '...No edit date token on {0}, not '
+                                'caching it'.format(feature), 'WARNING')
+    count = geometry_cache.rebuild(boundary_datasets)
+    geometry_cache.close()
+    print('...Cached {0} boundary geometries'.format(count))
+    GWRutils.logMessage(log, '...Cached {0} boundary geometries'.format(
+                        count))
+
+except Exception as e:
+    print('Failed to rebuild geometry cache! Exiting...')
+    print(e)
+    GWRutils.logMessage(log, 'Failed to rebuild geometry cache! Exiting...')
+    GWRutils.logMessage(log, str(e))
+    sys.exit()
+
+arcpy.ClearWorkspaceCache_management()
+print(GWRutils.getTime())
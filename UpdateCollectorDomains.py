@@ -40,16 +40,29 @@ if proceed.lower() == 'no':
 else:
     print('...Proceeding with Collector domain updates!')
 
-# Set paths for working and logs directories, create new log file
-config_path = 'F:\\LRMMobileSolution\\Scripts\\config.json'
-domains_dir = 'F:\\LRMMobileSolution\\Domains'
-working_dir = 'F:\\LRMMobileSolution\\Working'
-log_dir = 'F:\\LRMMobileSolution\\Scripts\\Logs'
+# Set paths for working and logs directories, create new log file. Each
+# path can be overridden with a GWR_* environment variable for offline runs
+config_path = os.environ.get('GWR_CONFIG',
+                             'F:\\LRMMobileSolution\\Scripts\\config.json')
+domains_dir = os.environ.get('GWR_DOMAINS_DIR',
+                             'F:\\LRMMobileSolution\\Domains')
+working_dir = os.environ.get('GWR_WORKING_DIR',
+                             'F:\\LRMMobileSolution\\Working')
+log_dir = os.environ.get('GWR_LOG_DIR', 'F:\\LRMMobileSolution\\Scripts\\Logs')
 log_name = 'UpdateCollectorDomains_LOG_' + GWRutils.getTime() + '.txt'
 log = os.path.join(log_dir, log_name)
 log_file = open(log, 'w+')
 log_file.close()
 print('...New log file created')
+GWRutils.startMetrics('UpdateCollectorDomains', os.path.join(
+                      log_dir, 'UpdateCollectorDomains_METRICS_' +
+                      GWRutils.getTime() + '.json'))
+
+# Profile each stage with cProfile and tracemalloc if GWR_PROFILE is set or
+# the script was run with --profile
+if GWRutils.profilingRequested():
+    GWRutils.enableProfiling(log_dir, 'UpdateCollectorDomains_PROFILE_' +
+                             GWRutils.getTime())
 
 # Validate config file
 is_valid = GWRutils.validateConfig(config_path)
@@ -92,6 +105,12 @@ if not sql_procs:
     print('No sql procedures! Exiting...')
     GWRutils.logMessage(log, 'No sql procedures! Exiting...')
     sys.exit()
+
+# Set up buffered logging, optionally level-gated or written as json lines
+log_config = GWRutils.configReader(config_path, 'logging')
+if log_config:
+    GWRutils.configureLogger(log, log_config.get('level', 'INFO'),
+                             log_config.get('json_lines', False))
 GWRutils.logMessage(log, '...All configurations loaded')
 
 # Set workspace and disconnect users
@@ -99,6 +118,7 @@ arcpy.env.workspace = sde_connection
 arcpy.DisconnectUser(sde_connection, 'ALL')
 
 # Connect to Portal and stop all services
+GWRutils.startStage('stop_services')
 try:
     portal = GWRutils.connectToPortal(portal_info)
     print('...Signed into Portal as ' + portal.properties.user.username)
@@ -113,6 +133,7 @@ stop_services = GWRutils.startOrStopServices(portal, 'STOP')
 if stop_services:
     print('...Stopped all services')
     GWRutils.logMessage(log, '...Stopped all services')
+    GWRutils.endStage('stop_services')
 else:
     print('Failed to stop all services! Exiting...')
     GWRutils.logMessage(log, 'Failed to stop all services! Exiting...')
@@ -135,6 +156,7 @@ domain_s_poly = 'special_poly'
 universal_domains = [domain_act_status, domain_act_plant_pattern, 
                      domain_act_plant_stock, domain_harv_status,
                      domain_s_point, domain_s_line, domain_s_poly]
+GWRutils.startStage('universal_domains')
 try:
     for domain in universal_domains:
         domain_path = os.path.join(domains_dir, domain + '.csv')
@@ -142,6 +164,7 @@ try:
                                        sde_connection, domain,domain,'REPLACE')
         print('...Overwrote domain: {0}'.format(domain))
         GWRutils.logMessage(log, '...Overwrote domain: {0}'.format(domain))
+        GWRutils.recordCall('sde')
         
 except Exception as e:
     print('Failed to overwrite universal domains! Exiting...')
@@ -150,6 +173,8 @@ except Exception as e:
                         'Exiting...')
     GWRutils.logMessage(log, str(e))
     sys.exit()
+GWRutils.endStage('universal_domains', len(universal_domains),
+                  len(universal_domains))
 
 # Check for prperties to update in config
 props_to_update = GWRutils.checkForChanges(properties)
@@ -169,6 +194,7 @@ contractor_proc = sql_procs['contractor_proc']
 chemOIDs_proc = sql_procs['chemOIDs_proc']
 species_proc = sql_procs['species_proc']
 
+GWRutils.startStage('property_domains')
 if props_to_update:
     with GWRutils.connectToDB(cnxn_info) as cnxn:
         print('...Connected to SQL Server')
@@ -316,8 +342,11 @@ if props_to_update:
                 GWRutils.logMessage(log, 'Failed to overwrite chemical ' +
                                          'domain! Exiting...')
                 sys.exit()
+            GWRutils.recordRows('property_domains', 1, 1)
+GWRutils.endStage('property_domains')
 
 # Clean up working directory
+GWRutils.startStage('cleanup')
 try:
     GWRutils.cleanWorkingDir(working_dir)
     print('...Cleaned working directory')
@@ -335,7 +364,10 @@ except:
     print('Failed to reset config file to false state!')
     GWRutils.logMessage(log, 'Failed to reset config file to false state!') 
 
+GWRutils.endStage('cleanup')
+
 # Start all services
+GWRutils.startStage('start_services')
 start_services = GWRutils.startOrStopServices(portal, 'START')
 if start_services:
     print('...Started all services')
@@ -343,6 +375,8 @@ if start_services:
 else:
     print('Failed to start all services! End of script...')
     GWRutils.logMessage(log, 'Failed to start all services! End of script...') 
+GWRutils.endStage('start_services', status='completed' if start_services
+                  else 'failed')
 
 print('Finished script at: ' + GWRutils.getTime())
 GWRutils.logMessage(log, 'Finished script at: ' + GWRutils.getTime())
\ No newline at end of file
@@ -35,15 +35,27 @@ if proceed.lower() == 'no':
 else:
     print('...Proceeding with Survey123 form domain updates!')
 
-# Set paths for working and logs directories, create new log file
-config_path = 'F:\\LRMMobileSolution\\Scripts\\config.json'
-working_dir = 'F:\\LRMMobileSolution\\Working'
-log_dir = 'F:\\LRMMobileSolution\\Scripts\\Logs'
+# Set paths for working and logs directories, create new log file. Each
+# path can be overridden with a GWR_* environment variable for offline runs
+config_path = os.environ.get('GWR_CONFIG',
+                             'F:\\LRMMobileSolution\\Scripts\\config.json')
+working_dir = os.environ.get('GWR_WORKING_DIR',
+                             'F:\\LRMMobileSolution\\Working')
+log_dir = os.environ.get('GWR_LOG_DIR', 'F:\\LRMMobileSolution\\Scripts\\Logs')
 log_name = 'UpdateSurvey123Domains_LOG_' + GWRutils.getTime() + '.txt'
 log = os.path.join(log_dir, log_name)
 log_file = open(log, 'w+')
 log_file.close()
 print('...New log file created')
+GWRutils.startMetrics('UpdateSurvey123Domains', os.path.join(
+                      log_dir, 'UpdateSurvey123Domains_METRICS_' +
+                      GWRutils.getTime() + '.json'))
+
+# Profile each stage with cProfile and tracemalloc if GWR_PROFILE is set or
+# the script was run with --profile
+if GWRutils.profilingRequested():
+    GWRutils.enableProfiling(log_dir, 'UpdateSurvey123Domains_PROFILE_' +
+                             GWRutils.getTime())
 
 # Validate config file
 is_valid = GWRutils.validateConfig(config_path)
@@ -81,6 +93,12 @@ if not sql_procs:
     print('No sql procedures! Exiting...')
     GWRutils.logMessage(log, 'No sql procedures! Exiting...')
     sys.exit()
+
+# Set up buffered logging, optionally level-gated or written as json lines
+log_config = GWRutils.configReader(config_path, 'logging')
+if log_config:
+    GWRutils.configureLogger(log, log_config.get('level', 'INFO'),
+                             log_config.get('json_lines', False))
 GWRutils.logMessage(log, '...All configurations loaded')
 
 # Check for prperties to update in config
@@ -95,6 +113,7 @@ else:
     GWRutils.logMessage(log, '...Properties to update: ' + str(propertyOIDs))
 
 # Connect to Portal
+GWRutils.startStage('download_forms')
 try:
     portal = GWRutils.connectToPortal(portal_info)
     print('...Signed into Portal as ' + portal.properties.user.username)
@@ -109,6 +128,7 @@ except:
 try:
     formItemIDs = []
     portalForms = portal.content.search(query='', item_type='Form')
+    GWRutils.recordCall('portal')
     for oid in propertyOIDs:
         for form in portalForms:
             if str(oid) in form.title:
@@ -144,12 +164,14 @@ except:
     GWRutils.logMessage(log, 'Failed while downloading/extracting form items!'
                              + ' Exiting...')
     sys.exit()
+GWRutils.endStage('download_forms', len(propertyOIDs), len(foundOIDs))
 
 # Connect to db and retrieve category, type, subtype tables for each property
 # and other csv tables in media folder
 itemsets_proc = sql_procs['itemsets_proc']
 chems_proc = sql_procs['chem_defaults_proc']
 
+GWRutils.startStage('generate_csvs')
 try:
     with GWRutils.connectToDB(cnxn_info) as cnxn:
         print('...Connected to SQL Server')
@@ -209,6 +231,8 @@ try:
                 GWRutils.logMessage(log, 'Failed to convert pandas DataFrame'
                                           + ' to chemdefaults.csv! Exiting...')
                 sys.exit()
+            GWRutils.recordRows('generate_csvs', result1[0].shape[0] +
+                                result2[0].shape[0], 2)
                                               
 except Exception as e:
     print('Failed to connect to SQL Server! Exiting...')
@@ -216,8 +240,10 @@ except Exception as e:
     GWRutils.logMessage(log, 'Failed to connect to SQL Server! Exiting...')
     GWRutils.logMessage(log, str(e))
     sys.exit()
+GWRutils.endStage('generate_csvs')
     
 # Updated itemsets.csv(s), swap and upload to Portal
+GWRutils.startStage('upload_forms')
 try:
     GWRutils.swapCSVandUploadToPortal(portal, formItemIDs, working_dir)
     print('...Swapped csvs and uploaded to portal')
@@ -227,8 +253,10 @@ except:
     GWRutils.logMessage(log, 'Failed to swap out csvs and upload to Portal! ' 
                               + 'Exiting...')
     sys.exit()
+GWRutils.endStage('upload_forms', len(formItemIDs), len(formItemIDs))
     
 # Clean up working directory
+GWRutils.startStage('cleanup')
 try:
     GWRutils.cleanWorkingDir(working_dir)
     print('...Cleaned working directory')
@@ -245,6 +273,7 @@ try:
 except:
     print('Failed to reset config file to false state!')
     GWRutils.logMessage(log, 'Failed to reset config file to false state!')
+GWRutils.endStage('cleanup')
     
 print('Finished script at: ' + GWRutils.getTime())
 GWRutils.logMessage(log, 'Finished script at: ' + GWRutils.getTime())
\ No newline at end of file
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:        test_activity_index.py
+#
+# Purpose:     Checks MobileSyncLRM.py resolves the GUIDs of its new target
+#              activities to OIDs once after append, sharing the index with
+#              chemical linking and the stand overlay, also when resumed.
+#
+# Usage Notes: python -m pytest tests
+#
+# Author:      Dylan Harwell - Resource Data Inc
+#
+# Created:     10/18/2026
+# -----------------------------------------------------------------------------
+
+import contextlib
+import io
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+scripts_dir = os.path.dirname(tests_dir)
+sys.path.insert(0, os.path.join(scripts_dir, 'Benchmarks', 'stubs'))
+sys.path.insert(1, scripts_dir)
+sys.path.insert(2, os.path.join(scripts_dir, 'Benchmarks'))
+
+import arcpy
+import pyodbc
+import BenchData
+import GWRutils
+
+target_act = BenchData.datasets['activity_fc']
+
+
+class ActivityIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='gwr_test_')
+        self.guids = BenchData.buildSyncData(60, seed=3)
+        pyodbc.reset()
+        self.config = BenchData.writeConfig(self.work_dir)
+        self.lookups = []
+        fetch = GWRutils.fetchOIDsByGUID
+
+        def lookup(dataset, guid_field, guids, *args):
+            guids = list(guids)
+            if dataset == target_act and guids:
+                self.lookups.append(set(guids))
+            return fetch(dataset, guid_field, guids, *args)
+        self.patch = mock.patch('GWRutils.fetchOIDsByGUID', lookup)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        GWRutils.closeConnectionPools()
+        GWRutils.writeMetrics()
+        GWRutils.flushLogs()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def runSync(self):
+        os.environ['GWR_CONFIG'] = self.config
+        os.environ['GWR_LOG_DIR'] = self.work_dir
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                runpy.run_path(os.path.join(scripts_dir, 'MobileSyncLRM.py'),
+                               run_name='__main__')
+        except SystemExit:
+            pass
+
+    def overlaidOIDs(self):
+        return set(params[0] for sql, params in pyodbc.CALLS
+                   if 'LRM_StandOverlay' in sql)
+
+    def testResolvesNewActivitiesOnce(self):
+        self.runSync()
+        self.assertEqual(self.lookups, [set(self.guids)])
+        self.assertTrue(self.overlaidOIDs())
+
+    def testResumeReadsIndexFromJournal(self):
+        overlay = GWRutils.executeSQLProcStandOverlayPool
+        with mock.patch('GWRutils.executeSQLProcStandOverlayPool',
+                        side_effect=pyodbc.Error('server gone')):
+            self.runSync()
+        del self.lookups[:]
+        self.runSync()
+        self.assertEqual(self.lookups, [])
+        stand_oids = set(row['OBJECTID'] for row in
+                         arcpy.TABLES[target_act].rows
+                         if row['Parent_OID'] is not None)
+        self.assertEqual(self.overlaidOIDs(), stand_oids)
+        self.assertIs(GWRutils.executeSQLProcStandOverlayPool, overlay)
+
+
+if __name__ == '__main__':
+    unittest.main()
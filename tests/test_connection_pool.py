@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:        test_connection_pool.py
+#
+# Purpose:     Tests GWRutils.ConnectionPool against the pyodbc stand-in in
+#              Benchmarks\stubs: reuse, waiting for a free connection,
+#              replacing dead connections, slot accounting when connecting
+#              fails and closing the pool.
+#
+# Usage Notes: python -m pytest tests
+#
+# Author:      Dylan Harwell - Resource Data Inc
+#
+# Created:     10/18/2026
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+scripts_dir = os.path.dirname(tests_dir)
+sys.path.insert(0, os.path.join(scripts_dir, 'Benchmarks', 'stubs'))
+sys.path.insert(1, scripts_dir)
+
+import pyodbc
+import GWRutils
+
+cnxn_info = {'driver': 'ODBC Driver 17 for SQL Server', 'server': 'test',
+             'database': 'LRM', 'username': 'test', 'password': 'test'}
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        pyodbc.reset()
+
+    def testReusesIdleConnection(self):
+        pool = GWRutils.ConnectionPool(cnxn_info, max_size=2)
+        with pool.acquire() as cnxn:
+            first = cnxn._connection
+            cursor = cnxn.statementCursor('SELECT 2;')
+        with pool.acquire() as cnxn:
+            self.assertIs(cnxn._connection, first)
+            self.assertIs(cnxn.statementCursor('SELECT 2;'), cursor)
+        self.assertEqual(pool._open, 1)
+
+    def testWaitsForReleasedConnection(self):
+        pool = GWRutils.ConnectionPool(cnxn_info, max_size=1)
+        cnxn = pool.acquire()
+        acquired = threading.Event()
+
+        def waiter():
+            with pool.acquire():
+                acquired.set()
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        self.assertFalse(acquired.wait(0.2))
+        cnxn.release()
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+        self.assertEqual(pool._open, 1)
+
+    def testWaitTimeout(self):
+        pool = GWRutils.ConnectionPool(cnxn_info, max_size=1,
+                                       wait_timeout=0.05)
+        cnxn = pool.acquire()
+        self.assertRaises(Exception, pool.acquire)
+        cnxn.release()
+        self.assertEqual(pool._open, 1)
+
+    def testReplacesDeadConnection(self):
+        pool = GWRutils.ConnectionPool(cnxn_info, max_size=1, check_after=0)
+        with pool.acquire() as cnxn:
+            dead = cnxn._connection
+        dead.cursor = mock.Mock(side_effect=pyodbc.Error('link failure'))
+        with pool.acquire() as cnxn:
+            self.assertIsNot(cnxn._connection, dead)
+        self.assertTrue(dead.closed)
+        self.assertEqual(pool._open, 1)
+
+    def testChecksOnlyIdleConnections(self):
+        pool = GWRutils.ConnectionPool(cnxn_info, check_after=60)
+        with pool.acquire():
+            pass
+        with pool.acquire():
+            pass
+        self.assertFalse([sql for sql, params in pyodbc.CALLS
+                          if sql.startswith('SELECT 1')])
+
+    def testFailedConnectFreesSlot(self):
+        pool = GWRutils.ConnectionPool(cnxn_info, max_size=1, retries=1,
+                                       wait_timeout=1)
+        error = pyodbc.Error('login failed')
+        with mock.patch('GWRutils._openDB', side_effect=error) as openDB, \
+                mock.patch('GWRutils.time.sleep') as sleep:
+            self.assertRaises(pyodbc.Error, pool.acquire)
+            self.assertEqual(openDB.call_count, 2)
+            sleep.assert_called_once_with(1)
+        self.assertEqual(pool._open, 0)
+        with pool.acquire():
+            self.assertEqual(pool._open, 1)
+
+    def testFailedCommitClosesConnection(self):
+        pool = GWRutils.ConnectionPool(cnxn_info)
+        cnxn = pool.acquire()
+        connection = cnxn._connection
+        connection.commit = mock.Mock(side_effect=pyodbc.Error('gone'))
+        with self.assertRaises(pyodbc.Error):
+            cnxn.release()
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool._idle, [])
+        self.assertEqual(pool._open, 0)
+
+    def testFailedCommitRaisesFromWithBlock(self):
+        pool = GWRutils.ConnectionPool(cnxn_info)
+        with self.assertRaises(pyodbc.Error):
+            with pool.acquire() as cnxn:
+                cnxn._connection.commit = mock.Mock(
+                    side_effect=pyodbc.Error('gone'))
+        self.assertEqual(pool._open, 0)
+
+    def testFailedRollbackKeepsBlockError(self):
+        pool = GWRutils.ConnectionPool(cnxn_info)
+        with self.assertRaises(ValueError):
+            with pool.acquire() as cnxn:
+                cnxn._connection.rollback = mock.Mock(
+                    side_effect=pyodbc.Error('gone'))
+                raise ValueError('block failed')
+        self.assertEqual(pool._open, 0)
+
+    def testCloseClosesIdleAndReleasedConnections(self):
+        pool = GWRutils.ConnectionPool(cnxn_info)
+        idle = pool.acquire()
+        busy = pool.acquire()
+        idle_connection = idle._connection
+        busy_connection = busy._connection
+        idle.release()
+        pool.close()
+        self.assertTrue(idle_connection.closed)
+        self.assertFalse(busy_connection.closed)
+        busy.release()
+        self.assertTrue(busy_connection.closed)
+        self.assertEqual(pool._open, 0)
+
+    def testGetConnectionPoolReplacesClosedPool(self):
+        info = dict(cnxn_info, pool_size=3)
+        pool = GWRutils.getConnectionPool(info)
+        self.assertIs(GWRutils.getConnectionPool(info), pool)
+        self.assertEqual(pool.max_size, 3)
+        GWRutils.closeConnectionPools()
+        self.assertIsNot(GWRutils.getConnectionPool(info), pool)
+        GWRutils.closeConnectionPools()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:        test_geometry_cache.py
+#
+# Purpose:     Tests GWRutils.GeometryCache against the arcpy stand-in in
+#              Benchmarks\stubs: reading only new or edited boundaries,
+#              keeping true curves and never caching without an edit token.
+#
+# Usage Notes: python -m pytest tests
+#
+# Author:      Dylan Harwell - Resource Data Inc
+#
+# Created:     10/18/2026
+# -----------------------------------------------------------------------------
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+scripts_dir = os.path.dirname(tests_dir)
+sys.path.insert(0, os.path.join(scripts_dir, 'Benchmarks', 'stubs'))
+sys.path.insert(1, scripts_dir)
+
+import arcpy
+import GWRutils
+
+
+class GeometryCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        arcpy.reset()
+        GWRutils.resetSchemaCache()
+        self.work_dir = tempfile.mkdtemp(prefix='gwr_test_')
+        self.cache_path = os.path.join(self.work_dir, 'geometry')
+        self.stands = arcpy.addTable(arcpy.Table(
+                          'STANDS', ['last_edited_date'], spatial=True))
+        for i in range(5):
+            self.stands.insert({'last_edited_date': '2020-03-01 00:00:00',
+                                'SHAPE': arcpy.Geometry(bytes([i] * 8))})
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def shapesRead(self, cache, oids):
+        """Returns the geometries fetched and how many were read from SDE"""
+        read = arcpy.STATS['rows_read']
+        tokens = len(oids)
+        geometries = cache.fetch('STANDS', oids)
+        return geometries, arcpy.STATS['rows_read'] - read - tokens
+
+    def testReadsOnlyNewOrChangedGeometries(self):
+        cache = GWRutils.GeometryCache(self.cache_path)
+        geometries, read = self.shapesRead(cache, [1, 2, 3])
+        self.assertEqual(read, 3)
+        self.assertEqual(geometries[2], arcpy.Geometry(bytes([1] * 8)))
+
+        self.stands.rows[1]['SHAPE'] = arcpy.Geometry(b'edited')
+        self.stands.rows[1]['last_edited_date'] = '2020-03-02 00:00:00'
+        geometries, read = self.shapesRead(cache, [1, 2, 3, 4])
+        self.assertEqual(read, 2)
+        self.assertEqual(geometries[2], arcpy.Geometry(b'edited'))
+        cache.close()
+
+        cache = GWRutils.GeometryCache(self.cache_path)
+        geometries, read = self.shapesRead(cache, [1, 2, 3, 4])
+        self.assertEqual(read, 0)
+        self.assertEqual(geometries[4], arcpy.Geometry(bytes([3] * 8)))
+        cache.close()
+
+    def testKeepsTrueCurves(self):
+        self.stands.rows[0]['SHAPE'] = arcpy.Geometry(b'arc', hasCurves=True)
+        cache = GWRutils.GeometryCache(self.cache_path)
+        cache.fetch('STANDS', [1])
+        cache.close()
+        cache = GWRutils.GeometryCache(self.cache_path)
+        geometry = cache.fetch('STANDS', [1])[1]
+        self.assertEqual(geometry, arcpy.Geometry(b'arc'))
+        self.assertTrue(geometry.hasCurves)
+        cache.close()
+
+    def testNeverCachesWithGlobalIDToken(self):
+        arcpy.addTable(arcpy.Table('PROPERTIES', ['Name'], spatial=True))
+        arcpy.TABLES['PROPERTIES'].insert({'SHAPE': arcpy.Geometry(b'p')})
+        cache = GWRutils.GeometryCache(self.cache_path)
+        self.assertFalse(cache.cacheable('PROPERTIES'))
+        self.assertEqual(cache.fetch('PROPERTIES', [1]),
+                         {1: arcpy.Geometry(b'p')})
+        self.assertEqual(cache.index, {})
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
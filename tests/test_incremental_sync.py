@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:        test_incremental_sync.py
+#
+# Purpose:     Tests the watermark where clauses and runs MobileSyncLRM.py in
+#              incremental mode against the stand-ins in Benchmarks\stubs
+#              several times, with mobile rows arriving between runs, a
+#              failed cleanup and a chemical synced before its activity.
+#
+# Usage Notes: python -m pytest tests
+#
+# Author:      Dylan Harwell - Resource Data Inc
+#
+# Created:     10/18/2026
+# -----------------------------------------------------------------------------
+
+import contextlib
+import datetime
+import io
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+scripts_dir = os.path.dirname(tests_dir)
+sys.path.insert(0, os.path.join(scripts_dir, 'Benchmarks', 'stubs'))
+sys.path.insert(1, scripts_dir)
+sys.path.insert(2, os.path.join(scripts_dir, 'Benchmarks'))
+
+import arcpy
+import pyodbc
+import BenchData
+import GWRutils
+
+target_act = BenchData.datasets['activity_fc']
+target_che = BenchData.datasets['chem_app_table']
+mobile_act = BenchData.mobile_datasets['activity_mobile_copy']
+mobile_che = BenchData.mobile_datasets['chem_app_mobile_copy']
+
+
+class WatermarkClauseTest(unittest.TestCase):
+
+    def testNoMarks(self):
+        self.assertIsNone(GWRutils.buildWatermarkClause('T', 'EDITED'))
+
+    def testLowMarkOnly(self):
+        self.assertEqual(GWRutils.buildWatermarkClause('T', 'OBJECTID', 42),
+                         'OBJECTID > 42')
+
+    def testDateMarksKeepMilliseconds(self):
+        low = datetime.datetime(2020, 3, 1, 8, 30, 0, 123456)
+        self.assertEqual(
+            GWRutils.buildWatermarkClause('T', 'EDITED', low,
+                                          '2020-03-02 00:00:00.000'),
+            "EDITED > '2020-03-01 08:30:00.123' AND "
+            "EDITED <= '2020-03-02 00:00:00.000'")
+
+
+class IncrementalSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='gwr_test_')
+        self.guids = BenchData.buildSyncData(20, seed=5)
+        pyodbc.reset()
+        self.config = BenchData.writeConfig(
+            self.work_dir, sync_options={'incremental': True})
+        self.chem_count = len(arcpy.TABLES[mobile_che].rows)
+
+    def tearDown(self):
+        GWRutils.closeConnectionPools()
+        GWRutils.writeMetrics()
+        GWRutils.flushLogs()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def runSync(self):
+        os.environ['GWR_CONFIG'] = self.config
+        os.environ['GWR_LOG_DIR'] = self.work_dir
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                runpy.run_path(os.path.join(scripts_dir, 'MobileSyncLRM.py'),
+                               run_name='__main__')
+        except SystemExit:
+            pass
+
+    def addActivity(self, guid):
+        arcpy.TABLES[mobile_act].insert({
+            'Parent_GUID': guid, 'PropertyOID': 1, 'Category': 'Property',
+            'Type': 1, 'SubType': 1, 'Status': 'Planned',
+            'PlannedDate': '2020-03-02', 'Acres': 1.0,
+            'prop_or_stand': 'prop',
+            'last_edited_date': '2020-03-02 00:00:00'})
+        self.guids.append(guid)
+
+    def addChemical(self, guid):
+        arcpy.TABLES[mobile_che].insert({
+            'Child_GUID': guid, 'PropertyOID': 1, 'MasterChemOID': 1,
+            'Activity_ContextID': 1430, 'Rate': 1.0, 'RateUOM': 'oz/ac',
+            'last_edited_date': '2020-03-02 00:00:00'})
+        self.chem_count += 1
+
+    def assertSynced(self):
+        activities = arcpy.TABLES[target_act].rows
+        self.assertEqual(sorted(row['Parent_GUID'] for row in activities),
+                         sorted(self.guids))
+        chems = arcpy.TABLES[target_che].rows
+        self.assertEqual(len(chems), 2 * self.chem_count)
+        self.assertTrue(all(row['ActivityOID'] is not None for row in chems))
+
+    def testRunsDoNotResyncRows(self):
+        self.runSync()
+        self.addActivity('{NEW-1}')
+        self.addChemical('{NEW-1}')
+        with mock.patch('GWRutils.deleteRowsByOID', return_value=False):
+            self.runSync()
+        self.assertEqual(len(arcpy.TABLES[mobile_act].rows), 1)
+        self.addActivity('{NEW-2}')
+        self.runSync()
+        self.runSync()
+        self.assertSynced()
+        self.assertEqual(arcpy.TABLES[mobile_act].rows, [])
+        self.assertEqual(arcpy.TABLES[mobile_che].rows, [])
+
+    def testLinksChemicalSyncedBeforeActivity(self):
+        self.runSync()
+        self.addActivity('{NEW-1}')
+        self.addChemical('{LATE}')
+        self.runSync()
+        unlinked = [row for row in arcpy.TABLES[target_che].rows
+                    if row['ActivityOID'] is None]
+        self.assertEqual([row['Child_GUID'] for row in unlinked],
+                         ['{LATE}', '{LATE}'])
+        self.addActivity('{LATE}')
+        self.runSync()
+        self.assertSynced()
+
+    def testMaxBatchSyncsOldestRowsFirst(self):
+        self.config = BenchData.writeConfig(
+            self.work_dir, sync_options={'incremental': True,
+                                         'max_batch': 8})
+        mobile_guids = [row['Parent_GUID'] for row in
+                        arcpy.TABLES[mobile_act].rows]
+        self.runSync()
+        self.assertEqual([row['Parent_GUID'] for row in
+                          arcpy.TABLES[target_act].rows], mobile_guids[:8])
+        self.assertEqual(len(arcpy.TABLES[target_che].rows), 16)
+        self.runSync()
+        self.runSync()
+        self.assertSynced()
+        self.assertEqual(arcpy.TABLES[mobile_act].rows, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
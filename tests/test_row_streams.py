@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:        test_row_streams.py
+#
+# Purpose:     Tests the GWRutils generators the sync streams mobile rows
+#              through.
+#
+# Usage Notes: python -m pytest tests
+#
+# Author:      Dylan Harwell - Resource Data Inc
+#
+# Created:     10/18/2026
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import unittest
+
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+scripts_dir = os.path.dirname(tests_dir)
+sys.path.insert(0, os.path.join(scripts_dir, 'Benchmarks', 'stubs'))
+sys.path.insert(1, scripts_dir)
+
+import GWRutils
+
+
+class RowStreamTest(unittest.TestCase):
+
+    def testSplitRowsKeepsKeys(self):
+        keys = []
+        rows = GWRutils.splitRows(iter([(1, 'a', 'x', 'y'),
+                                        (2, 'b', 'z', 'w')]), 2, keys)
+        self.assertEqual(keys, [])
+        self.assertEqual(next(rows), ('x', 'y'))
+        self.assertEqual(keys, [(1, 'a')])
+        self.assertEqual(list(rows), [('z', 'w')])
+        self.assertEqual(keys, [(1, 'a'), (2, 'b')])
+
+    def testPairRowsYieldsCopyWithValue(self):
+        rows = list(GWRutils.pairRows([('g1', 1430, 5), ('g2', 1430, 6)], 1,
+                                      1440))
+        self.assertEqual(rows, [['g1', 1430, 5], ['g1', 1440, 5],
+                                ['g2', 1430, 6], ['g2', 1440, 6]])
+        rows[0][2] = 0
+        self.assertEqual(rows[1][2], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:        test_stand_overlay.py
+#
+# Purpose:     Tests the batched and pooled stand overlay calls against the
+#              pyodbc stand-in in Benchmarks\stubs: per OID commits, failed
+#              OIDs and resuming a partly failed overlay stage.
+#
+# Usage Notes: python -m pytest tests
+#
+# Author:      Dylan Harwell - Resource Data Inc
+#
+# Created:     10/18/2026
+# -----------------------------------------------------------------------------
+
+import contextlib
+import io
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+scripts_dir = os.path.dirname(tests_dir)
+sys.path.insert(0, os.path.join(scripts_dir, 'Benchmarks', 'stubs'))
+sys.path.insert(1, scripts_dir)
+sys.path.insert(2, os.path.join(scripts_dir, 'Benchmarks'))
+
+import pyodbc
+import BenchData
+import GWRutils
+
+cnxn_info = {'driver': 'ODBC Driver 17 for SQL Server', 'server': 'test',
+             'database': 'LRM', 'username': 'test', 'password': 'test'}
+
+
+class OverlayPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        pyodbc.reset()
+        self.events = []
+
+        def overlay(oid):
+            self.events.append(oid)
+            if oid % 2 == 0:
+                raise pyodbc.Error('overlay failed for {0}'.format(oid))
+            return ['result'], []
+        pyodbc.PROCEDURES['LRM_StandOverlay'] = overlay
+
+    def tearDown(self):
+        GWRutils.closeConnectionPools()
+
+    def record(self, event):
+        def method(connection):
+            self.events.append(event)
+        return method
+
+    def testCommitsEachOIDAndRollsBackFailures(self):
+        with mock.patch.object(pyodbc.Connection, 'commit',
+                               self.record('commit')), \
+                mock.patch.object(pyodbc.Connection, 'rollback',
+                                  self.record('rollback')):
+            failed = GWRutils.executeSQLProcStandOverlayPool(
+                         cnxn_info, 'LRM_StandOverlay', [1, 2, 3, 4], 1)
+        self.assertEqual(failed, [2, 4])
+        self.assertEqual(self.events, [1, 'commit', 2, 'rollback',
+                                       3, 'commit', 4, 'rollback',
+                                       'commit'])
+
+    def testFailedCommitReportsOID(self):
+        def commit(connection):
+            if self.events[-1] == 3:
+                raise pyodbc.Error('commit failed')
+        with mock.patch.object(pyodbc.Connection, 'commit', commit):
+            failed = GWRutils.executeSQLProcStandOverlayPool(
+                         cnxn_info, 'LRM_StandOverlay', [1, 3, 5], 1)
+        self.assertEqual(failed, [3])
+
+
+class OverlayResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='gwr_test_')
+        BenchData.buildSyncData(60, seed=7)
+        pyodbc.reset()
+        self.config = BenchData.writeConfig(
+            self.work_dir,
+            sql_procs={'stand_overlay_proc': 'LRM_StandOverlay',
+                       'stand_overlay_batch_proc':
+                           'dbo.MOBILE_StandOverlay_OIDList'})
+        self.journal_path = os.path.join(self.work_dir,
+                                         'MobileSyncLRM_journal.json')
+
+    def tearDown(self):
+        GWRutils.closeConnectionPools()
+        GWRutils.writeMetrics()
+        GWRutils.flushLogs()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def runSync(self):
+        os.environ['GWR_CONFIG'] = self.config
+        os.environ['GWR_LOG_DIR'] = self.work_dir
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                runpy.run_path(os.path.join(scripts_dir, 'MobileSyncLRM.py'),
+                               run_name='__main__')
+        except SystemExit:
+            pass
+
+    def testRetriesOnlyFailedOIDs(self):
+        batches = []
+
+        def overlay(oid_list, fail=True):
+            oids = [int(oid) for oid in oid_list.split(',')]
+            batches.extend(oids)
+            return (['FailedOBJECTID', 'ErrorMessage'],
+                    [(oid, 'failed') for oid in oids if fail and oid % 3 == 0])
+        pyodbc.PROCEDURES['dbo.MOBILE_StandOverlay_OIDList'] = overlay
+        self.runSync()
+        failed = set(oid for oid in batches if oid % 3 == 0)
+        self.assertTrue(failed)
+        self.assertTrue(os.path.exists(self.journal_path))
+
+        del batches[:]
+        pyodbc.PROCEDURES['dbo.MOBILE_StandOverlay_OIDList'] = \
+            lambda oid_list: overlay(oid_list, False)
+        self.runSync()
+        self.assertEqual(set(batches), failed)
+        self.assertFalse(os.path.exists(self.journal_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:        test_sync_metrics.py
+#
+# Purpose:     Runs MobileSyncLRM.py against the stand-ins in Benchmarks\stubs
+#              and checks the rows in and rows out each stage records in the
+#              metrics file.
+#
+# Usage Notes: python -m pytest tests
+#
+# Author:      Dylan Harwell - Resource Data Inc
+#
+# Created:     10/18/2026
+# -----------------------------------------------------------------------------
+
+import contextlib
+import io
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import unittest
+
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+scripts_dir = os.path.dirname(tests_dir)
+sys.path.insert(0, os.path.join(scripts_dir, 'Benchmarks', 'stubs'))
+sys.path.insert(1, scripts_dir)
+sys.path.insert(2, os.path.join(scripts_dir, 'Benchmarks'))
+
+import arcpy
+import pyodbc
+import BenchData
+import GWRutils
+
+mobile_act = BenchData.mobile_datasets['activity_mobile_copy']
+
+
+class SyncMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='gwr_test_')
+        BenchData.buildSyncData(60, seed=11)
+        self.prop_count = len([row for row in arcpy.TABLES[mobile_act].rows
+                               if row['prop_or_stand'] == 'prop'])
+        pyodbc.reset()
+        self.config = BenchData.writeConfig(self.work_dir)
+
+    def tearDown(self):
+        GWRutils.closeConnectionPools()
+        GWRutils.writeMetrics()
+        GWRutils.flushLogs()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def runSync(self):
+        os.environ['GWR_CONFIG'] = self.config
+        os.environ['GWR_LOG_DIR'] = self.work_dir
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                runpy.run_path(os.path.join(scripts_dir, 'MobileSyncLRM.py'),
+                               run_name='__main__')
+        except SystemExit:
+            pass
+
+    def testStagesRecordRowsInAndOut(self):
+        self.runSync()
+        stages = GWRutils.writeMetrics()['stages']
+        expected = {'route': 60, 'stage': self.prop_count, 'geometry': 60,
+                    'append': 60}
+        for stage in expected:
+            with self.subTest(stage=stage):
+                self.assertEqual(stages[stage]['rows_in'], expected[stage])
+                self.assertEqual(stages[stage]['rows_out'], expected[stage])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:        test_sync_resume.py
+#
+# Purpose:     Runs MobileSyncLRM.py against the stand-ins in Benchmarks\stubs,
+#              killing it after each stage has written but before the journal
+#              records it, and checks the rerun finishes the sync without
+#              losing or duplicating activities and chemicals.
+#
+# Usage Notes: python -m pytest tests
+#
+# Author:      Dylan Harwell - Resource Data Inc
+#
+# Created:     10/18/2026
+# -----------------------------------------------------------------------------
+
+import contextlib
+import io
+import json
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+scripts_dir = os.path.dirname(tests_dir)
+sys.path.insert(0, os.path.join(scripts_dir, 'Benchmarks', 'stubs'))
+sys.path.insert(1, scripts_dir)
+sys.path.insert(2, os.path.join(scripts_dir, 'Benchmarks'))
+
+import arcpy
+import pyodbc
+import BenchData
+import GWRutils
+
+datasets = BenchData.datasets
+mobile_datasets = BenchData.mobile_datasets
+stages = ['route', 'stage', 'geometry', 'append', 'chem_append',
+          'chem_link', 'overlay']
+
+
+class SyncResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='gwr_test_')
+        self.guids = BenchData.buildSyncData(60, seed=7)
+        self.chem_count = len(arcpy.TABLES[
+                              mobile_datasets['chem_app_mobile_copy']].rows)
+        self.stand_guids = set(
+            row['Parent_GUID'] for row in
+            arcpy.TABLES[mobile_datasets['activity_mobile_copy']].rows
+            if row['prop_or_stand'] == 'stand')
+        pyodbc.reset()
+        self.config = BenchData.writeConfig(self.work_dir)
+        self.journal_path = os.path.join(self.work_dir,
+                                         'MobileSyncLRM_journal.json')
+        self.complete_stage = GWRutils.completeStage
+
+    def tearDown(self):
+        GWRutils.completeStage = self.complete_stage
+        GWRutils.closeConnectionPools()
+        GWRutils.writeMetrics()
+        GWRutils.flushLogs()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def runSync(self):
+        os.environ['GWR_CONFIG'] = self.config
+        os.environ['GWR_LOG_DIR'] = self.work_dir
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                runpy.run_path(os.path.join(scripts_dir, 'MobileSyncLRM.py'),
+                               run_name='__main__')
+        except SystemExit:
+            pass
+
+    def crashAt(self, stage):
+        """Makes the next journal write for stage kill the run"""
+        complete_stage = self.complete_stage
+
+        def crash(journal_path, journal, done_stage, guids=None):
+            if done_stage == stage:
+                GWRutils.completeStage = complete_stage
+                raise SystemExit('killed after {0}'.format(stage))
+            return complete_stage(journal_path, journal, done_stage, guids)
+        GWRutils.completeStage = crash
+
+    def overlaidOIDs(self):
+        return set(params[0] for sql, params in pyodbc.CALLS
+                   if 'LRM_StandOverlay' in sql)
+
+    def assertSynced(self):
+        activities = arcpy.TABLES[datasets['activity_fc']].rows
+        self.assertEqual(sorted(row['Parent_GUID'] for row in activities),
+                         sorted(self.guids))
+        for row in activities:
+            if row['Parent_GUID'] in self.stand_guids:
+                self.assertIsNotNone(row['Parent_OID'])
+            else:
+                self.assertIsNotNone(row['TFM_CMN_PROPERTY_GlobalID'])
+        chems = arcpy.TABLES[datasets['chem_app_table']].rows
+        self.assertEqual(len(chems), 2 * self.chem_count)
+        self.assertEqual(sorted(row['Activity_ContextID'] for row in chems),
+                         [1430] * self.chem_count + [1440] * self.chem_count)
+        self.assertTrue(all(row['ActivityOID'] is not None for row in chems))
+        stand_oids = set(row['OBJECTID'] for row in activities
+                         if row['Parent_GUID'] in self.stand_guids)
+        self.assertEqual(self.overlaidOIDs(), stand_oids)
+        for name in mobile_datasets.values():
+            self.assertEqual(arcpy.TABLES[name].rows, [])
+        self.assertFalse(os.path.exists(self.journal_path))
+
+    def testCleanRun(self):
+        self.runSync()
+        self.assertSynced()
+
+    def testResumeAfterEachStage(self):
+        for stage in stages:
+            with self.subTest(stage=stage):
+                self.setUp()
+                self.crashAt(stage)
+                self.runSync()
+                # Killed before the first journal write, the rerun starts over
+                if os.path.exists(self.journal_path):
+                    with open(self.journal_path) as journal_file:
+                        journal = json.load(journal_file)
+                    self.assertNotIn(stage, journal['completed'])
+                self.runSync()
+                self.assertSynced()
+                self.tearDown()
+
+    def testRetryKeepsChemicalOfUnlinkedGUID(self):
+        # An earlier run left chemicals waiting for activity {LATE}, this
+        # run fails before writing its own chemical for {LATE}
+        target_che = arcpy.TABLES[datasets['chem_app_table']]
+        for context in (1430, 1440):
+            target_che.insert({'Child_GUID': '{LATE}',
+                               'Activity_ContextID': context})
+        arcpy.TABLES[mobile_datasets['chem_app_mobile_copy']].insert({
+            'Child_GUID': '{LATE}', 'Activity_ContextID': 1430})
+        with mock.patch('GWRutils.pairRows',
+                        side_effect=RuntimeError('write failed')):
+            self.runSync()
+        self.assertTrue(os.path.exists(self.journal_path))
+        self.runSync()
+        self.assertEqual(len([row for row in target_che.rows
+                              if row['Child_GUID'] == '{LATE}']), 4)
+        self.assertEqual(len(target_che.rows), 2 * self.chem_count + 4)
+        self.assertFalse(os.path.exists(self.journal_path))
+
+
+if __name__ == '__main__':
+    unittest.main()